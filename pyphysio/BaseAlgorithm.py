@@ -1,5 +1,14 @@
 # coding=utf-8
 from abc import abstractmethod as _abstract, ABCMeta as _ABCMeta
+from collections import OrderedDict as _OrderedDict
+from hashlib import sha1 as _sha1
+from sys import getsizeof as _getsizeof
+from threading import RLock as _RLock, local as _local
+from time import time as _time
+from timeit import default_timer as _timer
+import os as _os
+import pickle as _pickle
+import tempfile as _tempfile
 from pyphysio.Signal import Signal, EvenlySignal
 from pyphysio.Utility import PhUI as _PhUI
 import numpy as _np
@@ -13,6 +22,11 @@ class Algorithm(object):
     __metaclass__ = _ABCMeta
 
     _log = None
+    # Whether the results can be stored in the DiskCache (opt-in, for the expensive algorithms)
+    _persistent = False
+    # Whether the algorithm processes all the channels of a multi-channel signal (along axis 0) in a single call,
+    # returning what the per-channel loop of run_uncached would return
+    _axis_aware = False
 
     def __init__(self, **kwargs):
         """
@@ -39,6 +53,14 @@ class Algorithm(object):
     def __repr__(self):
         return self.__class__.__name__ + str(self._params) if 'name' not in self._params else self._params['name']
 
+    def get_output_names(self):
+        """
+        Names of the outputs of the algorithms that return many named values at once (e.g. HRVTimeDomain), one column
+        each in fmap.
+        @return: The list of the names, None for the algorithms with a single output
+        """
+        return None
+
     def set_unchecked(self, **kwargs):
         self._params.update(kwargs)
 
@@ -58,44 +80,71 @@ class Algorithm(object):
             return self._params[param]
 
     @classmethod
-    def run(cls, data, params=None, use_cache=False, **kwargs):
+    def run(cls, data, params=None, use_cache=None, executor=None, **kwargs):
         """
         Gets the data from the cache or calculates, caches and returns it.
         @param data: Source data
         @type data: TimeSeries
         @param params: Parameters for the calculator
         @type params: dict
-        @param use_cache: Whether to use the cache memory or not
+        @param use_cache: Whether to use the cache memory or not (None: use the global settings, see Cache.enable and
+        DiskCache.enable). False also bypasses the active Dedup scope.
         @type use_cache: bool
+        @param executor: Executor of the per-channel loop for multi-channel signals (None: use the active one, see
+        Executor; False: one channel at a time)
+        @type executor: Executor
         @return: The value of the feature.
         """
+        if executor is not None:
+            with Executor.scope(executor if executor is not False else None):
+                return cls.run(data, params, use_cache, **kwargs)
         if type(params) is dict:
             kwargs.update(params)
+        scope = Dedup.current() if use_cache is not False else None
+        if use_cache is None:
+            use_cache = Cache.is_enabled() or (cls._persistent and DiskCache.is_enabled())
         if not isinstance(data.get_values(), _np.ndarray):
             _PhUI.w("The data must be a Signal (see class EvenlySignal and UnevenlySignal).")
             use_cache = False
-        if use_cache is True:
-            Cache.cache_check(data)
+        if scope is not None:
+            return scope.run_scoped(data, cls, kwargs, use_cache)
+        elif use_cache is True:
             # noinspection PyTypeChecker
             return Cache.run_cached(data, cls, kwargs)
-        else:            
-            if not data.is_multi():
-                return cls.algorithm(data, kwargs)
-            else:
-                data_values = data.get_values()
-                values_out = []
-                for i_ch in range(data.get_nchannels()):
-                    channel_ph = EvenlySignal(data_values[:,i_ch], data.get_sampling_freq(), data.get_start_time())
-                    output_ph = cls.algorithm(channel_ph, kwargs)
-                    values_out.append(output_ph)
-        
-                # if output are signals, compose a multimodal instance
-                if isinstance(values_out[0], EvenlySignal):
-                    values_out_np = _np.stack([x.get_values() for x in values_out], axis=1)
-                    output = data.clone_properties(values_out_np)
-                    return(output)
-                else:
-                    return(values_out)
+        else:
+            return cls.run_uncached(data, kwargs)
+
+    @classmethod
+    def run_uncached(cls, data, params):
+        """
+        Calculates the result, one channel at a time for multi-channel signals unless the algorithm is axis aware.
+        The channels are computed in parallel if an Executor is active.
+        @param data: Source data
+        @type data: TimeSeries
+        @param params: Parameters for the calculator
+        @type params: dict
+        @return: The value of the feature.
+        """
+        if not data.is_multi() or cls._axis_aware:
+            return cls.algorithm(data, params)
+        executor = Executor.current()
+        if executor is not None and executor.get_n_jobs() > 1:
+            values_out = executor.map_channels(cls, data, params)
+        else:
+            data_values = data.get_values()
+            values_out = []
+            for i_ch in range(data.get_nchannels()):
+                channel_ph = EvenlySignal(data_values[:,i_ch], data.get_sampling_freq(), data.get_start_time())
+                output_ph = cls.algorithm(channel_ph, params)
+                values_out.append(output_ph)
+
+        # if output are signals, compose a multimodal instance
+        if isinstance(values_out[0], EvenlySignal):
+            values_out_np = _np.stack([x.get_values() for x in values_out], axis=1)
+            output = data.clone_properties(values_out_np)
+            return(output)
+        else:
+            return(values_out)
 
     @classmethod
     @_abstract
@@ -122,13 +171,18 @@ class Algorithm(object):
     def cache_key(cls, params):
         """
         This method computes an hash to use as a part of the key in the cache starting from the parameters used by the
-        feature.
-        @return: The hash of the parameters used by the feature.
+        feature. Array parameters are hashed by content.
+        @return: The hash of the parameters used by the feature, None if a parameter has no content representation
+        (the results are not cached).
         :param params:
         """
-        p = params.copy()
-        p.update({'': str(cls)})
-        return str(p).replace('\'', '')
+        h = _sha1()
+        try:
+            _digest_update(h, cls.__module__ + '.' + cls.__name__)
+            _digest_update(h, params)
+        except _NoDigest:
+            return None
+        return h.hexdigest()
 
     @classmethod
     def log(cls, message):
@@ -167,34 +221,425 @@ class Algorithm(object):
         map(lambda f_m: f_m[0](f_m[1]), log)
 
 
+class _NoDigest(Exception):
+    """
+    Raised by _digest_update for the objects that have no content representation
+    """
+
+
+def _digest_update(h, x):
+    """
+    Feeds the content of x to the hash object h: arrays are hashed by dtype, shape and bytes, signals also by their
+    metadata, containers recursively. Objects that have no content representation (e.g. functions) raise _NoDigest:
+    their identity could be reused by a new object after they are collected, so the results computed with them are not
+    cached.
+    """
+    if isinstance(x, Signal):
+        h.update(b'S' + type(x).__name__.encode())
+        _digest_update(h, x.ph)
+        x = x.get_values()
+    if isinstance(x, (_np.ndarray, _np.generic)):
+        x = _np.asarray(x)
+        h.update(('A%s%s' % (x.dtype.str, x.shape)).encode())
+        if x.dtype.hasobject:
+            for v in x.ravel():
+                _digest_update(h, v)
+        else:
+            h.update(_np.ascontiguousarray(x).reshape(-1).view(_np.uint8))
+    elif isinstance(x, dict):
+        h.update(('D%d' % len(x)).encode())
+        for k in sorted(x, key=repr):
+            _digest_update(h, k)
+            _digest_update(h, x[k])
+    elif isinstance(x, (list, tuple)):
+        h.update(('L%d' % len(x)).encode())
+        for v in x:
+            _digest_update(h, v)
+    elif isinstance(x, Algorithm):
+        h.update(b'G' + type(x).__name__.encode())
+        _digest_update(h, x.get())
+    elif x is None or isinstance(x, (bool, int, float, complex, str, bytes)):
+        r = repr(x).encode()
+        h.update(('V%d' % len(r)).encode() + r)
+    else:
+        raise _NoDigest(type(x).__name__)
+
+
+def _sizeof(x):
+    """
+    Approximate memory footprint of a cached value, in bytes.
+    """
+    if isinstance(x, _np.ndarray):
+        return x.nbytes + _getsizeof(x)
+    elif isinstance(x, (list, tuple)):
+        return _getsizeof(x) + sum(_sizeof(v) for v in x)
+    elif isinstance(x, dict):
+        return _getsizeof(x) + sum(_sizeof(v) for v in x.values())
+    else:
+        return _getsizeof(x)
+
+
+class Dedup(object):
+    """
+    Scope in which identical calls (same algorithm, same parameters, same input object) are computed once: e.g. the
+    PeakDetection run by each of PeaksMax, PeaksMin, PeaksMean and PeaksNum on the same segment.
+
+    Usage:
+        with Dedup() as scope:
+            results = [alg(segment) for alg in algorithms]
+        print(scope.get_report())
+
+    Inputs are matched by identity (a reference is kept until the end of the scope), so they should not be modified in
+    place within the scope. Scopes are per thread and the results are released when the scope exits; the report is
+    kept.
+    """
+
+    _state = _local()
+
+    def __init__(self):
+        self._results = {}
+        self._report = {}
+
+    @staticmethod
+    def current():
+        """
+        :return: The innermost active scope of this thread, or None
+        """
+        stack = getattr(Dedup._state, 'stack', None)
+        return stack[-1] if stack else None
+
+    def __enter__(self):
+        if getattr(Dedup._state, 'stack', None) is None:
+            Dedup._state.stack = []
+        Dedup._state.stack.append(self)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        Dedup._state.stack.remove(self)
+        self._results = {}
+
+    def run_scoped(self, data, algorithm, params, use_cache=False):
+        """
+        Gets the result from the scope or calculates and stores it
+        :param data:
+        :type algorithm: Algorithm
+        :param params:
+        :param use_cache: Whether to compute through the Cache
+        :return: The result
+        """
+        params_key = algorithm.cache_key(params)
+        if params_key is None:
+            return Cache.run_cached(data, algorithm, params) if use_cache else algorithm.run_uncached(data, params)
+        key = (id(data), algorithm, params_key)
+        counts = self._report.setdefault(algorithm.__name__, {'calls': 0, 'reused': 0, 'time_saved': 0.})
+        counts['calls'] += 1
+
+        entry = self._results.get(key)
+        if entry is None:
+            t0 = _timer()
+            val = Cache.run_cached(data, algorithm, params) if use_cache else algorithm.run_uncached(data, params)
+            # data is referenced so that its id is not reused within the scope
+            self._results[key] = (val, _timer() - t0, data)
+        else:
+            val, t, data = entry
+            counts['reused'] += 1
+            counts['time_saved'] += t
+        return val
+
+    def get_report(self):
+        """
+        :return: Dictionary algorithm name -> {'calls', 'reused', 'time_saved'}: number of calls, number of calls served
+        with a previous result and time (s) spent computing the reused results
+        """
+        return self._report
+
+    @staticmethod
+    def merge_reports(reports):
+        """
+        Sums a list of reports (see get_report).
+        """
+        total = {}
+        for report in reports:
+            for name, counts in report.items():
+                t = total.setdefault(name, {'calls': 0, 'reused': 0, 'time_saved': 0.})
+                for k in t:
+                    t[k] += counts[k]
+        return total
+
+
+def _init_channel_worker():
+    # the algorithms run by a worker process their channels serially
+    Executor._state.worker = True
+
+
+def _run_channel(task):
+    algorithm, params, values, fsamp, start_time = task
+    return algorithm.algorithm(EvenlySignal(values, fsamp, start_time), params)
+
+
+class Executor(object):
+    """
+    Computes the channels of multi-channel signals in parallel, for the algorithms that process one channel at a time
+    (e.g. PeakDetection, BeatFromECG, KalmanFilter). The results are in the order of the channels.
+
+    Usage:
+        Executor.set_default(Executor(n_jobs=4))  # global
+        with Executor(n_jobs=4, backend='process'):  # scope (per thread), the pool is closed at the end
+            beats = BeatFromECG()(ecgs)
+        PeakDetection.run(signal, params, executor=Executor(4))  # single call
+
+    The 'thread' backend shares the memory; the 'process' backend sends each channel (values, sampling frequency and
+    start time) once to one of the workers, together with the algorithm class and the parameters. The pool is created
+    at the first use and kept until close().
+    """
+
+    _state = _local()
+    _default = None
+    _lock = _RLock()
+
+    def __init__(self, n_jobs=-1, backend='thread'):
+        """
+        :param n_jobs: Number of workers (-1: all the cpus, see Parallel.get_n_jobs)
+        :param backend: 'thread' or 'process'
+        """
+        assert backend in ['thread', 'process'], "backend should be 'thread' or 'process'"
+        from .Parallel import get_n_jobs as _get_n_jobs
+        self._n_jobs = _get_n_jobs(n_jobs)
+        self._backend = backend
+        self._pool = None
+
+    def get_n_jobs(self):
+        return self._n_jobs
+
+    def get_backend(self):
+        return self._backend
+
+    @staticmethod
+    def current():
+        """
+        :return: The executor of the innermost scope of this thread, or the default one, or None (serial). Always None
+        within the workers.
+        """
+        if getattr(Executor._state, 'worker', False):
+            return None
+        stack = getattr(Executor._state, 'stack', None)
+        return stack[-1] if stack else Executor._default
+
+    @staticmethod
+    def set_default(executor):
+        """
+        Sets the global executor (None: one channel at a time). The previous one is not closed.
+        """
+        assert executor is None or isinstance(executor, Executor), "executor should be an Executor or None"
+        Executor._default = executor
+
+    @staticmethod
+    def get_default():
+        return Executor._default
+
+    @staticmethod
+    def scope(executor):
+        """
+        :return: Context in which the given executor (None: serial) is active in this thread, without closing it
+        """
+        return _ExecutorScope(executor)
+
+    def __enter__(self):
+        self.scope(self).__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        Executor._state.stack.pop()
+        self.close()
+
+    def _get_pool(self):
+        from multiprocessing import Pool as _ProcessPool
+        from multiprocessing.pool import ThreadPool as _ThreadPool
+        with Executor._lock:
+            if self._pool is None:
+                pool = _ThreadPool if self._backend == 'thread' else _ProcessPool
+                self._pool = pool(self._n_jobs, initializer=_init_channel_worker)
+            return self._pool
+
+    def close(self):
+        """
+        Terminates the workers. The pool is created again at the next use.
+        """
+        with Executor._lock:
+            if self._pool is not None:
+                self._pool.close()
+                self._pool.join()
+                self._pool = None
+
+    def map_channels(self, algorithm, data, params):
+        """
+        Runs algorithm.algorithm on each channel of data.
+        :type algorithm: Algorithm
+        :param data: The multi-channel signal
+        :param params: The parameters
+        :return: The list of the results, one per channel
+        """
+        values = data.get_values()
+        fsamp, start_time = data.get_sampling_freq(), data.get_start_time()
+        n_ch = values.shape[1]
+        pool = self._get_pool()
+        if self._backend == 'thread':
+            return pool.map(lambda i_ch: _run_channel((algorithm, params, values[:, i_ch], fsamp, start_time)),
+                            range(n_ch), 1)
+        else:
+            return pool.map(_run_channel, [(algorithm, params, _np.ascontiguousarray(values[:, i_ch]), fsamp,
+                                            start_time) for i_ch in range(n_ch)], 1)
+
+
+class _ExecutorScope(object):
+    def __init__(self, executor):
+        self._executor = executor
+
+    def __enter__(self):
+        if getattr(Executor._state, 'stack', None) is None:
+            Executor._state.stack = []
+        Executor._state.stack.append(self._executor)
+        return self._executor
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        Executor._state.stack.pop()
+
+
 # noinspection PyProtectedMember
 class Cache(object):
-    """ Class that gives cache support."""
+    """
+    Class that gives cache support.
+
+    Results are stored in a process-wide LRU store, keyed by the digest of the content of the signal (values and
+    metadata) and of the parameters, so equal signals share the cached results and array parameters are compared
+    by value. The store is bounded by a byte budget: the least recently used results are evicted first.
+
+    The cache is used by Algorithm.run when use_cache=True or, when use_cache is not specified, if it has been
+    enabled globally with Cache.enable(). On a miss the results of the persistent algorithms are also looked up in
+    the DiskCache, when enabled.
+    """
+
+    _store = _OrderedDict()
+    _nbytes = 0
+    _max_bytes = 256 * 1024 * 1024
+    _enabled = False
+    _lock = _RLock()
 
     def __init__(self):
         pass
 
-    # Field-checked methods
+    # Global settings
+
+    @staticmethod
+    def enable(max_bytes=None):
+        """
+        Enables the cache for all the algorithms (use_cache=False still bypasses it).
+        :param max_bytes: Memory budget of the cache in bytes (None: keep the current one, default 256 MB)
+        """
+        if max_bytes is not None:
+            Cache.set_max_bytes(max_bytes)
+        Cache._enabled = True
+
+    @staticmethod
+    def disable():
+        """
+        Disables the global cache, the stored results are kept (see Cache.clear).
+        """
+        Cache._enabled = False
+
+    @staticmethod
+    def is_enabled():
+        return Cache._enabled
+
+    @staticmethod
+    def set_max_bytes(max_bytes):
+        """
+        Sets the memory budget of the cache, evicting the least recently used results if needed.
+        :param max_bytes: Memory budget in bytes
+        """
+        assert max_bytes >= 0, "The memory budget should be >= 0"
+        with Cache._lock:
+            Cache._max_bytes = max_bytes
+            Cache._evict()
+
+    @staticmethod
+    def clear():
+        """
+        Removes all the stored results.
+        """
+        with Cache._lock:
+            Cache._store.clear()
+            Cache._nbytes = 0
+
+    @staticmethod
+    def info():
+        """
+        :return: Dictionary with the number of stored results, the bytes used and the budget
+        """
+        with Cache._lock:
+            return {'entries': len(Cache._store), 'bytes': Cache._nbytes, 'max_bytes': Cache._max_bytes}
+
+    @staticmethod
+    def data_key(obj):
+        """
+        Computes the digest of the content of the signal (values and metadata).
+        :param obj:
+        :return: The digest, None if the signal has no content representation (e.g. object values)
+        """
+        h = _sha1()
+        try:
+            _digest_update(h, obj)
+        except _NoDigest:
+            return None
+        return h.hexdigest()
+
+    @staticmethod
+    def _evict():
+        while Cache._nbytes > Cache._max_bytes and len(Cache._store) > 0:
+            key, (val, log, size) = Cache._store.popitem(last=False)
+            Cache._nbytes -= size
+
+    @staticmethod
+    def _get(key):
+        with Cache._lock:
+            entry = Cache._store.get(key)
+            if entry is not None:
+                Cache._store.move_to_end(key)
+            return entry
+
+    @staticmethod
+    def _put(key, val, log):
+        size = _sizeof(val)
+        with Cache._lock:
+            if key in Cache._store:
+                Cache._nbytes -= Cache._store.pop(key)[2]
+            if size <= Cache._max_bytes:
+                Cache._store[key] = (val, log, size)
+                Cache._nbytes += size
+                Cache._evict()
+
+    # Signal methods
 
     @staticmethod
     def cache_clear(obj):
         """
-        Clears the cache and frees memory (GC?)
+        Removes the stored results computed on the content of obj
         :param obj:
         """
-        obj._cache = {}
-        obj._mutated = False
+        data_key = Cache.data_key(obj)
+        if data_key is None:
+            return
+        with Cache._lock:
+            for key in [k for k in Cache._store if k[0] == data_key]:
+                Cache._nbytes -= Cache._store.pop(key)[2]
 
     @staticmethod
     def cache_check(obj):
         """
-        Checks the presence of the cache structure.
+        Kept for compatibility: the keys follow the content of the signal, so mutated signals need no check.
         :param obj:
         """
-        if not hasattr(obj, "_cache") or hasattr(obj, "_mutated") and obj._mutated:
-            Cache.cache_clear(obj)
-
-    # Field-unchecked methods
+        pass
 
     @staticmethod
     def invalidate(obj, algorithm, params):
@@ -204,27 +649,196 @@ class Cache(object):
         :param obj:
         :param params:
         """
-        key = algorithm.cache_key(params)
-        if key in obj._cache:
-            del obj._cache[key]
+        key = (Cache.data_key(obj), algorithm.cache_key(params))
+        if None in key:
+            return
+        with Cache._lock:
+            if key in Cache._store:
+                Cache._nbytes -= Cache._store.pop(key)[2]
 
     @staticmethod
     def run_cached(obj, algorithm, params):
         """
-        Gets data from the cache if valid
+        Gets data from the cache if valid, otherwise computes and stores it
         :param params:
         :param obj:
         :type algorithm: Algorithm
-        :return: The data or None
+        :return: The data
         """
-        key = algorithm.cache_key(params)
+        key = (Cache.data_key(obj), algorithm.cache_key(params))
+        if None in key:
+            # no content key: an identity based key could be reused by another object
+            return algorithm.run_uncached(obj, params)
+        entry = Cache._get(key)
+
+        if entry is None and algorithm._persistent and DiskCache.is_enabled():
+            entry = DiskCache.load(key)
+            if entry is not None:
+                Cache._put(key, *entry)
 
-        if key not in obj._cache:
+        if entry is None:
             algorithm.set_logger()
-            val = algorithm.algorithm(obj, params)
+            val = algorithm.run_uncached(obj, params)
             log = algorithm.unset_logger()
-            obj._cache[key] = (val, log)
+            Cache._put(key, val, log)
+            if algorithm._persistent and DiskCache.is_enabled():
+                DiskCache.store(key, val, log)
         else:
-            val, log = obj._cache[key]
+            val, log = entry[:2]
             algorithm.emulate_log(log)
         return val
+
+
+class DiskCache(object):
+    """
+    Persistent cache of the results of the expensive algorithms (the ones with _persistent = True), shared across
+    processes and runs.
+
+    The results are pickled in a directory, one file per result, named by the digest of the signal content and of
+    the algorithm parameters (see Cache). Files are written atomically (temporary file, then rename), so several
+    processes can share the same directory. When the size of the directory exceeds the budget the least recently
+    used files are removed.
+
+    The size of the directory is scanned when the cache is enabled and then tracked by adding the size of each stored
+    file: the directory is scanned again (and the counter synchronized with the files written by the other processes)
+    only when the counter exceeds the budget.
+    """
+
+    _SUFFIX = '.pkl'
+    _TMP_SUFFIX = '.tmp'
+    _TMP_MAX_AGE = 3600
+
+    _path = None
+    _max_bytes = 1024 * 1024 * 1024
+    _nbytes = 0
+    _lock = _RLock()
+
+    def __init__(self):
+        pass
+
+    @staticmethod
+    def enable(path, max_bytes=None):
+        """
+        Enables the disk cache.
+        :param path: Directory of the cache (created if missing)
+        :param max_bytes: Size budget of the directory in bytes (None: keep the current one, default 1 GB)
+        """
+        if max_bytes is not None:
+            assert max_bytes >= 0, "The size budget should be >= 0"
+            DiskCache._max_bytes = max_bytes
+        _os.makedirs(path, exist_ok=True)
+        DiskCache._path = path
+        DiskCache._evict()
+
+    @staticmethod
+    def disable():
+        """
+        Disables the disk cache, the stored results are kept on disk (see DiskCache.clear).
+        """
+        DiskCache._path = None
+
+    @staticmethod
+    def is_enabled():
+        return DiskCache._path is not None
+
+    @staticmethod
+    def _file(key):
+        return _os.path.join(DiskCache._path, '-'.join(key) + DiskCache._SUFFIX)
+
+    @staticmethod
+    def _entries():
+        entries = []
+        for e in _os.scandir(DiskCache._path):
+            if e.name.endswith(DiskCache._SUFFIX) or e.name.endswith(DiskCache._TMP_SUFFIX):
+                try:
+                    st = e.stat()
+                    entries.append((st.st_mtime, st.st_size, e.path))
+                except OSError:  # removed by another process
+                    pass
+        return entries
+
+    @staticmethod
+    def _remove(path):
+        try:
+            _os.remove(path)
+        except OSError:  # already removed by another process
+            pass
+
+    @staticmethod
+    def clear():
+        """
+        Removes all the stored results.
+        """
+        for mtime, size, path in DiskCache._entries():
+            DiskCache._remove(path)
+        with DiskCache._lock:
+            DiskCache._nbytes = 0
+
+    @staticmethod
+    def load(key):
+        """
+        Loads a stored result.
+        :param key: Key of the result (see Cache.run_cached)
+        :return: Tuple (value, log) or None if missing or unreadable
+        """
+        path = DiskCache._file(key)
+        try:
+            with open(path, 'rb') as f:
+                entry = _pickle.load(f)
+        except (OSError, EOFError, _pickle.UnpicklingError, AttributeError, ImportError):
+            return None
+        try:
+            _os.utime(path)  # recently used
+        except OSError:
+            pass
+        return entry
+
+    @staticmethod
+    def store(key, val, log):
+        """
+        Stores a result, evicting the least recently used ones if the size counter exceeds the budget.
+        :param key: Key of the result (see Cache.run_cached)
+        :param val: The result
+        :param log: The log produced computing the result
+        """
+        fd, tmp = _tempfile.mkstemp(suffix=DiskCache._TMP_SUFFIX, dir=DiskCache._path)
+        try:
+            with _os.fdopen(fd, 'wb') as f:
+                _pickle.dump((val, log), f, protocol=_pickle.HIGHEST_PROTOCOL)
+                size = f.tell()
+            _os.replace(tmp, DiskCache._file(key))
+        except (OSError, _pickle.PicklingError, TypeError, AttributeError):
+            DiskCache._remove(tmp)
+            return
+        with DiskCache._lock:
+            # replacing an existing file over-counts, the next scan corrects it
+            DiskCache._nbytes += size
+            full = DiskCache._nbytes > DiskCache._max_bytes
+        if full:
+            DiskCache._evict()
+
+    @staticmethod
+    def _evict():
+        """
+        Scans the directory: removes the stale temporary files and the least recently used results exceeding the
+        budget, then synchronizes the size counter.
+        """
+        now = _time()
+        entries = []
+        for mtime, size, path in DiskCache._entries():
+            if path.endswith(DiskCache._TMP_SUFFIX):
+                # left by a crashed writer
+                if now - mtime > DiskCache._TMP_MAX_AGE:
+                    DiskCache._remove(path)
+            else:
+                entries.append((mtime, size, path))
+
+        total = sum(e[1] for e in entries)
+        entries.sort()
+        for mtime, size, path in entries:
+            if total <= DiskCache._max_bytes:
+                break
+            DiskCache._remove(path)
+            total -= size
+        with DiskCache._lock:
+            DiskCache._nbytes = total
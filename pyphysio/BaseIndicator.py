@@ -7,6 +7,10 @@ __author__ = 'AleB'
 class Indicator(Algorithm):
     """
     Algorithms that take as input a signal and return a scalar value.
+
+    The indicators that can be computed on many windows of an EvenlySignal at once also define the classmethod
+    algorithm_batch(windows, params, fsamp): windows is the 2D array (window x sample) of the values of the windows,
+    fsamp the sampling frequency of the signal; it returns the 1D array of the results, one per window.
     """
     __metaclass__ = _ABCMeta
     pass
@@ -0,0 +1,195 @@
+# coding=utf-8
+from __future__ import division
+from copy import copy as _cpy
+from multiprocessing import Pool as _ProcessPool, cpu_count as _cpu_count
+from multiprocessing.pool import ThreadPool as _ThreadPool
+from numpy import asarray as _asarray, array as _array
+from .BaseAlgorithm import Dedup as _Dedup
+from .BaseSegmentation import SegmentsGenerator as _SegmentsGenerator
+from .segmentation.Windows import batch_columns as _batch_columns
+
+__author__ = 'AleB'
+
+# State of the worker (process backend): the signals and the algorithms are sent once by the pool initializer
+_worker_signals = None
+_worker_algorithms = None
+_worker_dedup = False
+
+
+def _init_worker(signals, algorithms, dedup):
+    global _worker_signals, _worker_algorithms, _worker_dedup
+    _worker_signals = signals
+    _worker_algorithms = algorithms
+    _worker_dedup = dedup
+
+
+def _segment_row(seg, signal, algorithms, dedup):
+    """
+    :param seg: The segment, as generated (custom Segment subclasses and their attributes are kept)
+    :param signal: The signal to segment (alt_signal or the signal of the segment)
+    :return: The row of results and the Dedup report of the segment (None if dedup is False)
+    """
+    begin, end, label = seg.get_begin_time(), seg.get_end_time(), seg.get_label()
+    data = seg(signal)
+    if dedup:
+        with _Dedup() as scope:
+            row = [begin, end, label] + [alg(data) for alg in algorithms]
+        return row, scope.get_report()
+    else:
+        return [begin, end, label] + [alg(data) for alg in algorithms], None
+
+
+def _merge_row(row, columns, k, n_algorithms):
+    """
+    Inserts the results of the batched algorithms (columns) in the row of the k-th segment
+    """
+    results = iter(row[3:])
+    return row[:3] + [columns[i][k] if i in columns else next(results) for i in range(n_algorithms)]
+
+
+def _expand_row(row, algorithms):
+    """
+    Spreads the results of the algorithms with many outputs (see Algorithm.get_output_names) in one column each
+    """
+    out = row[:3]
+    for alg, result in zip(algorithms, row[3:]):
+        if alg.get_output_names() is None:
+            out.append(result)
+        else:
+            out.extend(result)
+    return out
+
+
+def _run_task(task):
+    i_signal, seg = task
+    # the segment is sent without the signal, sent once by the initializer
+    seg._signal = _worker_signals[i_signal]
+    return _segment_row(seg, seg._signal, _worker_algorithms, _worker_dedup)
+
+
+def _strip_signal(seg):
+    """
+    Copy of the segment without the reference to the signal (not pickled with each segment)
+    """
+    seg = _cpy(seg)
+    seg._signal = None
+    return seg
+
+
+def get_n_jobs(n_jobs):
+    """
+    Number of workers to use: n_jobs < 0 means all the cpus but (-n_jobs - 1), e.g. -1 for all the cpus.
+    """
+    assert n_jobs != 0, "n_jobs should be != 0"
+    return n_jobs if n_jobs > 0 else max(1, _cpu_count() + 1 + n_jobs)
+
+
+def fmap(segments, algorithms, alt_signal=None, n_jobs=1, backend='thread', chunksize=None, dedup=False,
+         report=False, batch=False):
+    """
+    Generates a list composed of a list of results for each segment, computing the segments in parallel.
+
+    [[result for each algorithm] for each segment]
+
+    Parameters
+    ----------
+    segments : iterable
+        An iterable of segments (e.g. an initialized SegmentGenerator)
+    algorithms : list
+        A list of algorithms
+
+    Optional parameters
+    -------------------
+    alt_signal : Signal
+        The signal that will be used instead of the one referenced in the segments
+    n_jobs : int, >0 or <0, default=1
+        Number of workers. Negative values count from the number of cpus (-1: all the cpus)
+    backend : 'thread' or 'process', default='thread'
+        'thread' shares the memory; 'process' sends the signals and the algorithms once to each worker
+        (with the 'spawn' start method the algorithms must be pickleable, e.g. not built with `algo`)
+    chunksize : int, >0, default=None
+        Number of segments sent to a worker at once. If None it is computed from the number of segments and workers
+    dedup : bool, default=False
+        Whether to compute once, within each segment, the identical sub-calls of the algorithms (e.g. the
+        PeakDetection shared by the Peaks* indicators), see Dedup
+    report : bool, default=False
+        Whether to return also the report of the deduplicated calls
+    batch : bool, default=False
+        Whether to compute the indicators that support it (defining algorithm_batch, see Indicator) on all the
+        segments at once, using a matrix of windows (strided views of the signal). Only for single channel
+        EvenlySignals, the other algorithms are computed segment by segment
+
+    Returns
+    -------
+    values : numpy.array
+        Matrix (segment x algorithms) containing a value for each algorithm, in the order of the segments. The
+        algorithms with many outputs (see Algorithm.get_output_names) have a column for each output
+    col_names : numpy.array
+        The list of the algorithm names (output names for the algorithms with many outputs).
+    report : dict
+        Only if report is True. Algorithm name -> {'calls', 'reused', 'time_saved'}, summed over the segments
+        (see Dedup.get_report)
+    """
+    assert backend in ['thread', 'process'], "backend should be 'thread' or 'process'"
+    assert chunksize is None or chunksize > 0, "chunksize should be > 0"
+    n_jobs = get_n_jobs(n_jobs)
+
+    if isinstance(segments, _SegmentsGenerator):
+        segments = segments(alt_signal)
+
+    # the distinct signals, each sent once, and the segments as (signal, begin, end, label)
+    signals = []
+    signals_idx = {}
+    segments = list(segments)
+    tasks = []
+    for seg in segments:
+        signal = alt_signal if alt_signal is not None else seg._signal
+        if id(signal) not in signals_idx:
+            signals_idx[id(signal)] = len(signals)
+            signals.append(signal)
+        tasks.append((signals_idx[id(signal)], seg.get_begin_time(), seg.get_end_time(), seg.get_label()))
+
+    columns = _batch_columns(signals, tasks, algorithms) if batch else {}
+    all_algorithms = algorithms
+    algorithms = [alg for i, alg in enumerate(all_algorithms) if i not in columns]
+
+    if len(algorithms) == 0:
+        rows = [([b, e, l], None) for i, b, e, l in tasks]
+    elif n_jobs == 1 or len(tasks) <= 1:
+        rows = [_segment_row(seg, signals[task[0]], algorithms, dedup) for seg, task in zip(segments, tasks)]
+    elif backend == 'thread':
+        def run_task(seg_task):
+            seg, task = seg_task
+            return _segment_row(seg, signals[task[0]], algorithms, dedup)
+
+        pool = _ThreadPool(n_jobs)
+        try:
+            rows = pool.map(run_task, list(zip(segments, tasks)), chunksize)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        pool = _ProcessPool(n_jobs, initializer=_init_worker, initargs=(signals, algorithms, dedup))
+        try:
+            rows = pool.map(_run_task, [(task[0], _strip_signal(seg)) for seg, task in zip(segments, tasks)],
+                            chunksize)
+        finally:
+            pool.close()
+            pool.join()
+
+    if len(columns) > 0:
+        rows = [(_merge_row(row, columns, k, len(all_algorithms)), rep) for k, (row, rep) in enumerate(rows)]
+
+    col_names = ["begin", "end", "label"]
+    for alg in all_algorithms:
+        names = alg.get_output_names()
+        col_names.extend([alg.__repr__()] if names is None else names)
+    if len(col_names) > len(all_algorithms) + 3:
+        rows = [(_expand_row(row, all_algorithms), rep) for row, rep in rows]
+
+    values = _asarray([r[0] for r in rows])
+    col_names = _array(col_names)
+    if report:
+        return values, col_names, _Dedup.merge_reports([r[1] for r in rows if r[1] is not None])
+    else:
+        return values, col_names
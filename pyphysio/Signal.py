@@ -1,9 +1,6 @@
 # coding=utf-8
 from __future__ import division
 import numpy as _np
-from scipy import interpolate as _interp
-from matplotlib.pyplot import plot as _plot, vlines as _vlines, xlabel as _xlabel, ylabel as _ylabel, grid as _grid 
-from matplotlib.pyplot import subplot as _subplot, tight_layout as _tight_layout, subplots_adjust as _subplots_adjust, xlim as _xlim
 from numbers import Number as _Number
 from pyphysio.Utility import abstractmethod as _abstract, PhUI as _PhUI
 import copy
@@ -40,6 +37,28 @@ def from_pickle(path):
     return from_pickleable(p)
 
 
+def from_memmap(path, mode='r'):
+    """
+    Opens a Signal saved with EvenlySignal.to_memmap, without loading the samples: the values are a numpy.memmap of
+    the file, so segments (segment_time, segment_idx) only read the touched range from disk.
+    :param path: File system path to the samples file (the header is in path + '.json').
+    :param mode: 'r' read-only or 'c' copy-on-write (changes are kept in memory, never written to the file). Use
+     to_memmap to write the results to a separate file.
+    :return: An EvenlySignal or MultiEvenly.
+    """
+    from json import load
+    assert mode in ['r', 'c'], "mode should be 'r' or 'c'"
+    with open(path + '.json') as f:
+        header = load(f)
+    cls = {'EvenlySignal': EvenlySignal, 'MultiEvenly': MultiEvenly}[header['class']]
+    values = _np.memmap(path, dtype=_np.dtype(header['dtype']), mode=mode, shape=tuple(header['shape']))
+    return cls._view(values, {
+        Signal._MT_SAMPLING_FREQ: header[Signal._MT_SAMPLING_FREQ],
+        Signal._MT_START_TIME: header[Signal._MT_START_TIME],
+        Signal._MT_NATURE: header[Signal._MT_NATURE]
+    })
+
+
 class Signal(_np.ndarray):
     _MT_NATURE = "signal_type"
     _MT_START_TIME = "start_time"
@@ -66,7 +85,32 @@ class Signal(_np.ndarray):
         # __new__ called if obj is None
         if obj is not None and hasattr(obj, self._MT_INFO_ATTR):
             # The cache is not in MT_INFO_ATTR
-            self._pyphysio = getattr(obj, self._MT_INFO_ATTR).copy()
+            self._pyphysio = obj.ph.copy()
+
+    @classmethod
+    def _view(cls, values, ph):
+        """
+        Fast constructor for segments: no checks, the values (e.g. a slice of the parent's values) are not copied.
+        :param values: numpy.ndarray
+        :param ph: metadata dict, owned by the new Signal
+        """
+        obj = values.view(cls)
+        obj._pyphysio = ph
+        return obj
+
+    def __reduce__(self):
+        # Pickle also the metadata (the default ndarray pickling would lose them)
+        rebuild, args, state = _np.ndarray.__reduce__(self)
+        return rebuild, args, (state, self.ph)
+
+    def __setstate__(self, state):
+        if len(state) == 2 and isinstance(state[1], dict):
+            state, ph = state
+            _np.ndarray.__setstate__(self, state)
+            self._pyphysio = ph
+        else:
+            # pickled by a previous version, see from_pickleable
+            _np.ndarray.__setstate__(self, state)
 
     def __array_wrap__(self, out_arr, context=None):
         # Just call the parent's
@@ -168,6 +212,8 @@ class Signal(_np.ndarray):
         pass
 
     def plot(self, style="", vlines_height=1000):
+        from matplotlib.pyplot import plot as _plot, vlines as _vlines, xlabel as _xlabel, ylabel as _ylabel, \
+            grid as _grid
         _xlabel("time")
         _ylabel(self.get_signal_type())
         _grid()
@@ -268,6 +314,7 @@ class EvenlySignal(Signal):
         resampled_signal : EvenlySignal
             The resampled signal
         """
+        from scipy import interpolate as _interp
 
         ratio = self.get_sampling_freq() / fout
 
@@ -319,11 +366,10 @@ class EvenlySignal(Signal):
         if iidx_stop is None:
             iidx_stop = len(self)
 
-        values = signal_values[int(iidx_start):int(iidx_stop)]
-
-        out_signal = self.clone_properties(values)
-        out_signal.set_start_time(self.get_time(iidx_start))
-        return out_signal
+        # view on the same buffer
+        ph = self._pyphysio.copy()
+        ph[self._MT_START_TIME] = self.get_time(iidx_start)
+        return type(self)._view(signal_values[int(iidx_start):int(iidx_stop)], ph)
 
     # TRYME
     def segment_time(self, t_start, t_stop=None):
@@ -353,6 +399,31 @@ class EvenlySignal(Signal):
 
         _np.savetxt(filename, _np.c_[times, values], delimiter=',', header=header, comments='')
 
+    def to_memmap(self, path, chunk_size=1 << 20):
+        """
+        Saves the signal as raw little-endian samples (path) plus a JSON header (path + '.json'), to be opened with
+        from_memmap. The samples are written in chunks, so also signals backed by a memmap can be saved.
+        :param path: File system path to the samples file (create/overwrite).
+        :param chunk_size: Number of samples written at once.
+        """
+        from json import dump
+        values = self.get_values()
+        dtype = values.dtype.newbyteorder('<')
+        with open(path, 'wb') as f:
+            for i in range(0, len(values), chunk_size):
+                f.write(_np.ascontiguousarray(values[i:i + chunk_size], dtype=dtype).tobytes())
+
+        header = {
+            'class': 'MultiEvenly' if isinstance(self, MultiEvenly) else 'EvenlySignal',
+            'dtype': dtype.str,
+            'shape': list(values.shape),
+            self._MT_SAMPLING_FREQ: _np.asarray(self.get_sampling_freq()).item(),
+            self._MT_START_TIME: _np.asarray(self.get_start_time()).item(),
+            self._MT_NATURE: self.get_signal_type()
+        }
+        with open(path + '.json', 'w') as f:
+            dump(header, f)
+
     def __repr__(self):
         return Signal.__repr__(self)[:-1] + " freq:" + str(self.get_sampling_freq()) + "Hz>\n" + self.view(
             _np.ndarray).__repr__()
@@ -389,6 +460,9 @@ class UnevenlySignal(Signal):
     _MT_X_INDICES = "x_values"
     _MT_DURATION = "duration"
 
+    # Segments keep (parent's indices view, offset) and compute the x_values on the first access of the metadata
+    _x_lazy = None
+
     def __new__(cls, values, sampling_freq=1000, start_time=None, signal_type="", x_values=None, x_type='instants',
                 duration=None):
         assert x_values is not None, "x_values are missing"
@@ -439,6 +513,27 @@ class UnevenlySignal(Signal):
         # TODO: test clone properties
         return(x_new)
 
+    @property
+    def ph(self):
+        if self._x_lazy is not None:
+            x_parent, offset = self._x_lazy
+            self._pyphysio[self._MT_X_INDICES] = x_parent - offset
+            self._x_lazy = None
+        return self._pyphysio
+
+    def _segment_view(self, iidx_start, iidx_stop, idx_start, start_time, duration):
+        """
+        Segment sharing the values and the indices of this signal, the x_values are computed lazily (see ph).
+        """
+        x_values = self.get_indices()
+        ph = self._pyphysio.copy()
+        del ph[self._MT_X_INDICES]
+        ph[self._MT_START_TIME] = start_time
+        ph[self._MT_DURATION] = duration
+        obj = UnevenlySignal._view(self.get_values()[iidx_start:iidx_stop], ph)
+        obj._x_lazy = (x_values[iidx_start:iidx_stop], idx_start)
+        return obj
+
     def get_duration(self):
         return self.ph[UnevenlySignal._MT_DURATION]
 
@@ -446,7 +541,7 @@ class UnevenlySignal(Signal):
         return self.get_start_time() + self.get_duration()
 
     def get_times(self):
-        return self.ph[self._MT_X_INDICES] / self.get_sampling_freq() + self.get_start_time()
+        return self.get_indices() / self.get_sampling_freq() + self.get_start_time()
 
     def get_indices(self):
         return self.ph[self._MT_X_INDICES]
@@ -493,10 +588,11 @@ class UnevenlySignal(Signal):
         interpolated_signal: ndarray
             The interpolated signal
         """
+        from scipy import interpolate as _interp
 
         assert kind != 'cubic' or len(self) > 3, "At least 4 samples needed for cubic interpolation"
 
-        data_x = self.ph[self._MT_X_INDICES]  # From a constant freq range
+        data_x = self.get_indices()  # From a constant freq range
         data_y = self.get_values()
 
         # Cubic if needed
@@ -570,13 +666,8 @@ class UnevenlySignal(Signal):
             iidx_start = int(iib) if iib is not None else 0
             iidx_stop = int(iie) if iie is not None else -1
 
-        return UnevenlySignal(values=self.get_values()[iidx_start:iidx_stop],
-                              x_values=self.get_indices()[iidx_start:iidx_stop] - idx_start,
-                              sampling_freq=self.get_sampling_freq(),
-                              signal_type=self.get_signal_type(),
-                              start_time=self.get_time(idx_start),
-                              x_type='indices',
-                              duration=(idx_stop - idx_start) / self.get_sampling_freq())
+        return self._segment_view(iidx_start, iidx_stop, idx_start, self.get_time(idx_start),
+                                  (idx_stop - idx_start) / self.get_sampling_freq())
 
     def segment_iidx(self, iidx_start, iidx_stop=None):
         """
@@ -604,14 +695,8 @@ class UnevenlySignal(Signal):
             idx_stop = self.get_indices()[-1] + 1
         idx_start = self.get_indices()[int(iidx_start)]
 
-        return UnevenlySignal(values=self.get_values()[int(iidx_start):int(iidx_stop)],
-                              x_values=self.get_indices()[int(iidx_start):int(iidx_stop)]
-                              - self.get_indices()[int(iidx_start)],
-                              sampling_freq=self.get_sampling_freq(),
-                              signal_type=self.get_signal_type(),
-                              start_time=self.get_time_from_iidx(iidx_start),
-                              x_type='indices',
-                              duration=(idx_stop - idx_start) / self.get_sampling_freq())
+        return self._segment_view(int(iidx_start), int(iidx_stop), idx_start, self.get_time_from_iidx(iidx_start),
+                                  (idx_stop - idx_start) / self.get_sampling_freq())
 
     def __repr__(self):
         return Signal.__repr__(self)[:-1] + " time resolution:" + str(1 / self.get_sampling_freq()) + "s>\n" + \
@@ -661,6 +746,7 @@ class MultiEvenly(EvenlySignal):
         resampled_signal : EvenlySignal
             The resampled signal
         """
+        from scipy import interpolate as _interp
 
         ratio = self.get_sampling_freq() / fout
 
@@ -683,26 +769,12 @@ class MultiEvenly(EvenlySignal):
 
     # TRYME
     def segment_iidx(self, iidx_start, iidx_stop=None):
+        # the rows of the parent's values: a view (of the file for memmap-backed signals) with cloned properties
+        return EvenlySignal.segment_iidx(self, iidx_start, iidx_stop)
 
-        signal_values = self.get_values()
-
-        if iidx_start is None:
-            iidx_start = 0
-        if iidx_stop is None:
-            iidx_stop = len(self)
-
-        values = signal_values[int(iidx_start):int(iidx_stop),:]
-
-        out_signal = self.clone_properties(values)
-        out_stim = self.get_stim().clone()
-        out_stim = out_stim.segment_iidx(iidx_start, iidx_stop)
-        out_signal.set_stim(out_stim)
-        
-        out_signal.set_start_time(self.get_time(iidx_start))
-        return out_signal
-    
-    
     def plot(self, style=""):
+        from matplotlib.pyplot import vlines as _vlines, ylabel as _ylabel, grid as _grid, subplot as _subplot, \
+            tight_layout as _tight_layout, subplots_adjust as _subplots_adjust, xlim as _xlim
         _grid()
         n_ch = self.get_nchannels()
     
@@ -1,6 +1,5 @@
 # coding=utf-8
 import numpy as np
-from scipy import interpolate
 __author__ = 'AleB'
 
 
@@ -65,6 +64,7 @@ def interpolate_ibi(rr, interp_freq):
     :param interp_freq:
     :param rr:
     """
+    from scipy import interpolate
     step = 1.0 / interp_freq
     rr /= 1000
     rr = np.array(rr)
@@ -82,6 +82,7 @@ def interpolate_ibi(rr, interp_freq):
 
 
 def template_interpolation(x, t, step, template=None):
+    from scipy import interpolate
     if template is None:
         template = np.square(np.cos(np.arange(0, 0.505, 0.005) * np.pi))
 
@@ -1,28 +1,84 @@
 # coding=utf-8
 from __future__ import division
 
+import sys as _sys
 from numpy import array as _array
-from .tools.Tools import *
-
-from .filters import Filters
-from .segmentation import SegmentsGenerators
-from .indicators import FrequencyDomain
-from .indicators import NonLinearDomain
-from .indicators import PeaksDescription
-from .indicators import TimeDomain
+
+from .BaseAlgorithm import Cache, DiskCache, Dedup, Executor
 from .BaseSegmentation import Segment
-from .Signal import EvenlySignal, UnevenlySignal, MultiEvenly, from_pickle, from_pickleable
-from .interactive import Annotate
-# BE CAREFUL with NAMES!!!
-from .estimators.Estimators import *
-from .filters.Filters import *
-from .indicators.FrequencyDomain import *
-from .indicators.NonLinearDomain import *
-from .indicators.PeaksDescription import *
-from .indicators.TimeDomain import *
-from .sqi.SignalQuality import *
-#from .tests import TestData
-from .segmentation.SegmentsGenerators import *
+from .Signal import EvenlySignal, UnevenlySignal, MultiEvenly, from_pickle, from_pickleable, from_memmap
+
+# The algorithms are loaded on first access (PEP 562), see __getattr__.
+# BE CAREFUL with NAMES!!! As with the former star imports, the later modules override the former ones.
+_ALGORITHM_MODULES = [
+    '.tools.Tools',
+    '.estimators.Estimators',
+    '.estimators.Streaming',
+    '.filters.Filters',
+    '.filters.Streaming',
+    '.indicators.FrequencyDomain',
+    '.indicators.NonLinearDomain',
+    '.indicators.PeaksDescription',
+    '.indicators.TimeDomain',
+    '.sqi.SignalQuality',
+    '.segmentation.SegmentsGenerators',
+]
+_SUBMODULES = {
+    'Filters': '.filters.Filters',
+    'SegmentsGenerators': '.segmentation.SegmentsGenerators',
+    'FrequencyDomain': '.indicators.FrequencyDomain',
+    'NonLinearDomain': '.indicators.NonLinearDomain',
+    'PeaksDescription': '.indicators.PeaksDescription',
+    'TimeDomain': '.indicators.TimeDomain',
+}
+_algorithms_loaded = False
+
+
+def _load_algorithms():
+    """
+    Imports the algorithm modules and binds their public classes in the package, as 'from module import *' did
+    (without the helper functions and the names imported from other packages).
+    """
+    global _algorithms_loaded
+    from importlib import import_module
+    names = {}
+    for module_name in _ALGORITHM_MODULES:
+        module = import_module(module_name, __name__)
+        names.update((k, v) for k, v in vars(module).items()
+                     if not k.startswith('_') and isinstance(v, type) and v.__module__.startswith(__name__ + '.'))
+    for name, module_name in _SUBMODULES.items():
+        names[name] = import_module(module_name, __name__)
+
+    g = globals()
+    for k, v in names.items():
+        if k not in g:
+            g[k] = v
+    _algorithms_loaded = True
+
+
+def __getattr__(name):
+    if name == 'Annotate':
+        # plotting and GUI only when needed
+        from .interactive import Annotate
+        globals()['Annotate'] = Annotate
+        return Annotate
+    if not _algorithms_loaded and not name.startswith('__'):
+        _load_algorithms()
+        if name in globals():
+            return globals()[name]
+    raise AttributeError("module '%s' has no attribute '%s'" % (__name__, name))
+
+
+def __dir__():
+    if not _algorithms_loaded:
+        _load_algorithms()
+    return sorted(list(globals().keys()) + ['Annotate'])
+
+
+if _sys.version_info < (3, 7):
+    # no module __getattr__ (PEP 562)
+    _load_algorithms()
+    from .interactive import Annotate
 
 print("Please cite:")
 print("Bizzego et al. (2019) 'pyphysio: A physiological signal processing library for data science approaches in physiology', SoftwareX")
@@ -38,6 +94,7 @@ def nature2type(data):
     return(data)
     
 def preset_sqi_ecg(prefix="SQI_", method='ar'):
+    from .sqi.SignalQuality import Kurtosis, SpectralPowerRatio, DerivativeEnergy
     K = Kurtosis(name='kurtosis')
     SPR = SpectralPowerRatio(method, name='SPR')
     DE = DerivativeEnergy(name='DE')
@@ -51,6 +108,7 @@ def preset_sqi_ecg(prefix="SQI_", method='ar'):
     return t
 
 def preset_hrv_fd(prefix="IBI_", method='ar'):
+    from .indicators.FrequencyDomain import PowerInBand
     VLF = PowerInBand(interp_freq=4, freq_max=0.04, freq_min=0.00001, method=method, name="VLF_Pow")
     LF = PowerInBand(interp_freq=4, freq_max=0.15, freq_min=0.04, method=method, name="LF_Pow")
     HF = PowerInBand(interp_freq=4, freq_max=0.4, freq_min=0.15, method=method, name="HF_Pow")
@@ -65,7 +123,14 @@ def preset_hrv_fd(prefix="IBI_", method='ar'):
     return t
 
 
-def preset_hrv_td(prefix="IBI_"):
+def preset_hrv_td(prefix="IBI_", fused=False):
+    from .indicators.TimeDomain import RMSSD, SDSD, Mean, StDev, Median, Min, Max, HRVTimeDomain
+    from .indicators.NonLinearDomain import PNNx, PoincareSD1, PoincareSD2, PoincareSD1SD2, PoinEll, DFAShortTerm, \
+        DFALongTerm
+    if fused:
+        # a single indicator computing all of them in one pass, one output column each in fmap
+        return [HRVTimeDomain(prefix=prefix if prefix is not None else "")]
+
     rmssd = RMSSD(name="RMSSD")
     sdsd = SDSD(name="SDSD")
     RRmean = Mean(name="Mean")
@@ -94,6 +159,8 @@ def preset_hrv_td(prefix="IBI_"):
 
 
 def preset_phasic(delta, prefix="pha_"):
+    from .indicators.TimeDomain import Mean, StDev, Range, AUC
+    from .indicators.PeaksDescription import PeaksMax, PeaksMin, PeaksMean, PeaksNum, DurationMean, SlopeMean
     mean = Mean()
     std = StDev()
     rng = Range()
@@ -115,6 +182,7 @@ def preset_phasic(delta, prefix="pha_"):
 
 
 def preset_tonic(prefix="ton_"):
+    from .indicators.TimeDomain import Mean, StDev, Range, AUC
     mean = Mean()
     std = StDev()
     rng = Range()
@@ -129,6 +197,7 @@ def preset_tonic(prefix="ton_"):
     return t
 
 def preset_eeg(prefix="eeg_", method='welch'):
+    from .indicators.FrequencyDomain import PowerInBand
     delta = PowerInBand(freq_min=0, freq_max=3, method=method, name="delta")
     theta = PowerInBand(freq_min=3.5, freq_max=7.5, method=method, name="theta")
     alpha = PowerInBand(freq_min=7.5, freq_max=13, method=method, name="alpha")
@@ -145,6 +214,8 @@ def preset_eeg(prefix="eeg_", method='welch'):
 
 
 def preset_emg(prefix='emg_', method = 'welch'):
+    from .indicators.TimeDomain import Max, Min, Mean, Range, StDev, AUC
+    from .indicators.FrequencyDomain import PowerInBand
     mx = Max(name='maximum')
     mn = Min(name='minimum')
     mean = Mean(name='mean')
@@ -163,6 +234,7 @@ def preset_emg(prefix='emg_', method = 'welch'):
 
 
 def preset_resp(prefix='resp', method='welch'):
+    from .indicators.FrequencyDomain import PowerInBand, PeakInBand
     e_low = PowerInBand(freq_min=0, freq_max=0.25, method=method, name="energy_low")
     e_high = PowerInBand(freq_min=0.25, freq_max=5, method=method, name="energy_high")
     resp_rate = PeakInBand(freq_min=0.25, freq_max=5, method=method, name="resp_rate")
@@ -176,6 +248,8 @@ def preset_resp(prefix='resp', method='welch'):
     return t
 
 def preset_activity(prefix='activity', method='welch'):
+    from .indicators.TimeDomain import Max, Min, Mean, Range, StDev, AUC
+    from .indicators.FrequencyDomain import PowerInBand
     mx = Max(name='maximum')
     mn = Min(name='minimum')
     mean = Mean(name='mean')
@@ -192,7 +266,8 @@ def preset_activity(prefix='activity', method='welch'):
 
     return t
     
-def fmap(segments, algorithms, alt_signal=None):
+def fmap(segments, algorithms, alt_signal=None, n_jobs=1, backend='thread', chunksize=None, dedup=False, report=False,
+         batch=False):
     # TODO : rename extract_indicators
     """
     Generates a list composed of a list of results for each segment.
@@ -201,17 +276,19 @@ def fmap(segments, algorithms, alt_signal=None):
     :param segments: An iterable of segments (e.g. an initialized SegmentGenerator)
     :param algorithms: A list of algorithms
     :param alt_signal: The signal that will be used instead of the one referenced in the segments
+    :param n_jobs: Number of parallel workers (-1: all the cpus), see Parallel.fmap
+    :param backend: 'thread' or 'process'
+    :param chunksize: Number of segments sent to a worker at once (None: automatic)
+    :param dedup: Whether to compute once the identical sub-calls within each segment, see Dedup
+    :param report: Whether to return also the report of the deduplicated calls (values, col_names, report)
+    :param batch: Whether to compute the supported indicators on all the segments at once, see Parallel.fmap
 
     :return: values, col_names A tuple: matrix (segment x algorithms) containing a value for each
      algorithm, the list of the algorithm names.
     """
-    from numpy import asarray as _asarray
-    values = _asarray([[seg.get_begin_time(), seg.get_end_time(), seg.get_label()] +
-                       [alg(seg(alt_signal)) for alg in algorithms] for seg in (
-        segments(alt_signal) if isinstance(segments, SegmentsGenerator) else segments
-    )])
-    col_names = ["begin", "end", "label"] + [x.__repr__() for x in algorithms]
-    return values, _array(col_names)
+    from .Parallel import fmap as _fmap
+    return _fmap(segments, algorithms, alt_signal, n_jobs=n_jobs, backend=backend, chunksize=chunksize, dedup=dedup,
+                 report=report, batch=batch)
 
 
 def algo(function, **kwargs):
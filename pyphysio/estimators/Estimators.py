@@ -216,6 +216,8 @@ class DriverEstim(_Estimator):
     """
     #TODO: add citation
 
+    _persistent = True
+
     def __init__(self, t1=.75, t2=2):
         assert t1 > 0, "t1 value has to be positive"
         assert t2 > 0, "t2 value has to be positive"
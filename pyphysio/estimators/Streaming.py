@@ -0,0 +1,411 @@
+# coding=utf-8
+from __future__ import division
+import numpy as _np
+from timeit import default_timer as _timer
+from ..Signal import EvenlySignal as _EvenlySignal
+from ..tools.Rolling import rolling_max as _rolling_max, rolling_min as _rolling_min
+from ..tools.Tools import _peaks_init, _peaks_scan
+
+__author__ = 'AleB'
+
+
+class StreamingBeatFromECG(object):
+    """
+    Incremental version of BeatFromECG for live streams: takes successive chunks of an ECG signal and returns the
+    beats as soon as they are confirmed by the peak detector.
+
+    Parameters
+    ----------
+    fsamp : float, >0
+        Sampling frequency of the stream
+
+    Optional parameters
+    -------------------
+    bpm_max : int, (1, 400], default=120
+        Maximal expected heart rate (in beats per minute)
+    delta : float, >=0, default=0
+        Threshold for the peak detection. By default it is computed from the signal (adaptive thresholding)
+    k : float, (0,1), default=0.7
+        Ratio at which the signal range is multiplied (when delta = 0)
+
+    Returns
+    -------
+    idx_beats : numpy.array
+        Indices (from the start of the stream) of the beats confirmed with the chunk
+    ibi : numpy.array
+        Inter beat interval values (seconds) of the beats. The first beat is returned together with the second one,
+        with the same IBI (as in BeatFromECG)
+
+    Notes
+    -----
+    The beats are the same of BeatFromECG on the whole signal (see flush for the end of the stream), except that the
+    zero values of the adaptive threshold are replaced by the minimum non zero value seen so far, instead of the
+    minimum on the whole signal.
+
+    Latency: a beat is returned at the end of the first chunk in which
+        1. the adaptive threshold is known for the samples following the peak: the threshold of a sample is the range
+           of the window of 2/fmax seconds starting at most 0.5/fmax seconds before it, so it waits at most
+           get_lookahead() = 2/fmax seconds (0 when delta is given);
+        2. the signal falls below the peak by more than the threshold, which depends on the signal (for the R peak a
+           few tens of milliseconds).
+    So the worst case latency is the chunk duration + get_lookahead() + the time of the R-S descent.
+
+    Memory: the buffer holds at most the last chunk plus (2 + 0.5)/fmax seconds of samples; the state of the detector
+    has a constant size.
+    """
+
+    def __init__(self, fsamp, bpm_max=120, delta=0, k=0.7):
+        assert fsamp > 0, "The sampling frequency should be positive"
+        assert 10 < bpm_max < 400, "Parameter bpm_max out of reasonable range (10, 400)"
+        assert delta >= 0, "Delta value should be positive (or equal to 0 if automatically computed)"
+        assert 0 < k < 1, "K coefficient must be in the range (0,1)"
+        fmax = bpm_max / 60
+        self._fsamp = fsamp
+        self._delta = delta
+        self._k = k
+        # same parameters of BeatFromECG (SignalRange and PeakDetection)
+        self._win_len = int(2 / fmax * fsamp)
+        self._win_step = int(0.5 / fmax * fsamp)
+        self._refractory = 1 / fmax * fsamp
+        self.reset()
+
+    def reset(self):
+        """
+        Forgets the state: the next chunk starts a new stream.
+        """
+        self._buffer = _np.zeros(0)
+        self._buffer_start = 0  # index of buffer[0] in the stream
+        self._n = 0  # samples received
+        self._n_scanned = 0  # samples processed by the peak detector
+        self._state = None
+        self._min_delta = _np.inf
+        self._last_range = None
+        self._last_beat = None
+        self._first_beat = None
+
+    def get_lookahead(self):
+        """
+        :return: Seconds of signal needed after a sample to compute its threshold
+        """
+        return self._win_len / self._fsamp if self._delta == 0 else 0
+
+    def __call__(self, chunk):
+        """
+        Processes the next chunk of the stream.
+
+        Parameters
+        ----------
+        chunk : EvenlySignal or numpy.array
+            The next samples
+
+        Returns
+        -------
+        idx_beats : numpy.array
+            Indices of the beats confirmed with this chunk
+        ibi : numpy.array
+            Inter beat interval values (seconds) of the beats
+        """
+        values = _np.asarray(chunk.get_values() if isinstance(chunk, _EvenlySignal) else chunk, dtype=float)
+        assert values.ndim == 1, "Only single channel signals are supported"
+        self._buffer = _np.concatenate([self._buffer, values])
+        self._n += len(values)
+        return self._process(final=False)
+
+    def flush(self):
+        """
+        Ends the stream: the last samples are processed with the threshold of the last window, as BeatFromECG does at
+        the end of the signal.
+
+        Returns
+        -------
+        idx_beats : numpy.array
+            Indices of the last beats
+        ibi : numpy.array
+            Inter beat interval values (seconds) of the beats
+        """
+        return self._process(final=True)
+
+    def _thresholds(self, final):
+        """
+        Threshold of the samples from self._n_scanned to the ones with a complete window (all if final).
+        """
+        start = self._n_scanned
+        if self._delta > 0:
+            return _np.full(self._n - start, float(self._delta))
+
+        L, step = self._win_len, self._win_step
+        # last window (start) inside the received samples
+        if self._n >= L:
+            last_win = ((self._n - L) // step) * step
+            stop = self._n if final else min(self._n, last_win + step)
+        else:
+            last_win = None
+            stop = start if not final else self._n
+        if stop <= start:
+            return _np.zeros(0)
+
+        # windows covering the samples: one per block of step samples
+        first_win = (start // step) * step
+        wins = _np.arange(first_win, (stop - 1) // step * step + 1, step)
+        ranges = _np.empty(len(wins))
+        complete = wins <= (last_win if last_win is not None else -1)
+        if _np.any(complete):
+            i_end = wins[complete][-1] + L
+            buf = self._buffer[first_win - self._buffer_start:i_end - self._buffer_start]
+            rng = _rolling_max(buf, L)[::step] - _rolling_min(buf, L)[::step]
+            ranges[complete] = rng[:complete.sum()]
+            self._last_range = ranges[complete][-1]
+        if not _np.all(complete):
+            # end of the stream: the range of the last window
+            if self._last_range is None:
+                self._last_range = _np.max(self._buffer) - _np.min(self._buffer)
+            ranges[~complete] = self._last_range
+
+        deltas = self._k * ranges[(_np.arange(start, stop) - first_win) // step]
+        nonzero = deltas[deltas > 0]
+        if len(nonzero) > 0:
+            self._min_delta = min(self._min_delta, _np.min(nonzero))
+        if _np.isfinite(self._min_delta):
+            deltas[deltas == 0] = self._min_delta
+        return deltas
+
+    def _process(self, final):
+        start = self._n_scanned
+        deltas = self._thresholds(final)
+        stop = start + len(deltas)
+
+        maxp, minp, maxv, minv = [], [], [], []
+        if stop > start:
+            values = self._buffer[start - self._buffer_start:stop - self._buffer_start]
+            if self._state is None:
+                self._state = _peaks_init(values[0], True)
+                values, deltas, start = values[1:], deltas[1:], start + 1
+            _peaks_scan(values, deltas, self._refractory, self._state, start, maxp, minp, maxv, minv)
+            self._n_scanned = stop
+
+        # keep the samples of the next windows and the ones not scanned
+        keep_from = (self._n_scanned // self._win_step) * self._win_step if self._delta == 0 else self._n_scanned
+        self._buffer = self._buffer[keep_from - self._buffer_start:]
+        self._buffer_start = keep_from
+
+        idx_beats, ibis = [], []
+        for idx in maxp:
+            if idx == 0:  # as BeatFromECG
+                continue
+            if self._last_beat is None:
+                self._first_beat = idx
+            else:
+                ibi = (idx - self._last_beat) / self._fsamp
+                if self._first_beat is not None:
+                    idx_beats.append(self._first_beat)
+                    ibis.append(ibi)
+                    self._first_beat = None
+                idx_beats.append(idx)
+                ibis.append(ibi)
+            self._last_beat = idx
+        return _np.array(idx_beats, dtype=int), _np.array(ibis)
+
+
+def replay(stream, signal, chunk_len):
+    """
+    Replays a recorded signal in chunks through a streaming estimator (e.g. StreamingBeatFromECG), to measure the
+    latency of the results.
+
+    Parameters
+    ----------
+    stream : StreamingBeatFromECG
+        The streaming estimator (it is reset)
+    signal : EvenlySignal
+        The recorded signal
+    chunk_len : float, >0
+        Duration of the chunks in seconds
+
+    Returns
+    -------
+    idx_beats : numpy.array
+        Indices of the beats
+    ibi : numpy.array
+        Inter beat interval values (seconds) of the beats
+    latency : numpy.array
+        For each beat, seconds between the beat and the end of the chunk with which it was returned
+    times : numpy.array
+        Processing time (seconds) of each chunk (the last one is the flush)
+    """
+    fsamp = signal.get_sampling_freq()
+    values = signal.get_values()
+    n_chunk = max(1, int(round(chunk_len * fsamp)))
+    stream.reset()
+
+    idx_beats, ibis, latency, times = [], [], [], []
+    for i in range(0, len(values) + n_chunk, n_chunk):
+        t0 = _timer()
+        if i < len(values):
+            idx, ibi = stream(values[i:i + n_chunk])
+            end = min(i + n_chunk, len(values))
+        else:
+            idx, ibi = stream.flush()
+            end = len(values)
+        times.append(_timer() - t0)
+        idx_beats.extend(idx)
+        ibis.extend(ibi)
+        latency.extend((end - idx) / fsamp)
+    return _np.array(idx_beats, dtype=int), _np.array(ibis), _np.array(latency), _np.array(times)
+
+
+class StreamingDriverEstim(object):
+    """
+    Block-wise version of DriverEstim for live streams and long recordings: the EDA signal is deconvolved in blocks of
+    fixed size, each preceded by the last samples of the previous ones (the tail), then smoothed with the gaussian
+    filter of DriverEstim. Memory and time per block are constant.
+
+    The Bateman function is truncated at 10 * t2 seconds, so its inverse has echoes at multiples of that length
+    (decaying by ~1e-3 each): the tail is three times as long (30 * t2 seconds).
+
+    Parameters
+    ----------
+    fsamp : float, >0
+        Sampling frequency of the stream
+
+    Optional parameters
+    -------------------
+    t1 : float, >0, default = 0.75
+        Value of the T1 parameter of the bateman function
+    t2 : float, >0, default = 2
+        Value of the T2 parameter of the bateman function
+    block_len : float, >0, default = None
+        Duration of the blocks in seconds. If None it is the duration of the Bateman function (10 * t2)
+
+    Returns
+    -------
+    driver : numpy.array
+        The next samples of the driver: the outputs of the successive chunks (and of flush) concatenated are the
+        driver of the stream from its first sample, as DriverEstim (one sample shorter than the signal)
+
+    Notes
+    -----
+    The result matches DriverEstim on the whole signal, up to the rounding of the FFTs, except close to the start and
+    the end of the stream and for the (small) effect of the truncation of the Bateman function.
+    A sample of the driver is returned when the block containing it is complete and get_delay() seconds of the
+    following signal are available (one sample for the deconvolution and half of the gaussian window).
+    """
+
+    def __init__(self, fsamp, t1=.75, t2=2, block_len=None):
+        from .Estimators import DriverEstim as _DriverEstim
+        from ..filters.Streaming import StreamingConvolutionalFilter as _StreamingConvolutionalFilter
+        assert fsamp > 0, "The sampling frequency should be positive"
+        assert t1 > 0, "t1 value has to be positive"
+        assert t2 > 0, "t2 value has to be positive"
+        assert block_len is None or block_len > 0, "block_len should be positive"
+        bateman = _DriverEstim._gen_bateman(fsamp, [t1, t2])
+        self._fsamp = fsamp
+        self._bateman = bateman
+        self._irf = bateman / _np.sum(bateman)
+        self._n_tail = 3 * len(bateman)
+        self._n_block = max(1, int(block_len * fsamp)) if block_len is not None else len(bateman)
+        # same gaussian smoothing of DriverEstim
+        self._smoothing = _StreamingConvolutionalFilter('gauss', fsamp=fsamp, win_len=max(0.2, 1 / fsamp) * 8)
+        self._fft_irf = {}
+        self.reset()
+
+    def reset(self):
+        """
+        Forgets the state: the next chunk starts a new stream.
+        """
+        self._context = None  # the tail: input samples before the pending ones
+        self._pending = _np.zeros(0)  # input samples without driver
+        self._last_driver = None
+        self._smoothing.reset()
+        # the smoothed driver is delayed: samples to drop at the start
+        self._to_drop = self._smoothing.get_delay()
+
+    def get_delay(self):
+        """
+        :return: Seconds of signal needed after a sample of the driver, once its block is complete
+        """
+        return (1 + self._smoothing.get_delay()) / self._fsamp
+
+    def _half_bateman(self, value, first):
+        # padding of DriverEstim at the start (first) or at the end of the signal
+        i_max = _np.argmax(self._bateman)
+        half = self._bateman[:i_max + 1] if first else self._bateman[i_max:]
+        return value * (half - _np.min(half)) / (_np.max(half) - _np.min(half))
+
+    def _deconvolve(self, segment):
+        # same as DeConvolutionalFilter(deconv_method='fft'), on the real FFT
+        n = len(segment)
+        if n not in self._fft_irf:
+            # the blocks have the same size: only the last one is kept
+            self._fft_irf = {n: _np.fft.rfft(self._irf, n=n)}
+        return abs(_np.fft.irfft(_np.fft.rfft(segment) / self._fft_irf[n], n=n))
+
+    def _block(self, n_out, end_padding=None):
+        """
+        Deconvolves the context and the first n_out + 1 pending samples, returns the driver of n_out samples.
+        """
+        segment = [self._context, self._pending[:n_out + 1]]
+        if end_padding is not None:
+            segment.append(end_padding)
+        segment = _np.concatenate(segment)
+        driver = self._deconvolve(segment)[len(self._context):len(self._context) + n_out]
+
+        consumed = _np.concatenate([self._context, self._pending[:n_out]])
+        self._context = consumed[-self._n_tail:]
+        self._pending = self._pending[n_out:]
+        return driver
+
+    def __call__(self, chunk):
+        """
+        Processes the next chunk of the stream.
+
+        Parameters
+        ----------
+        chunk : EvenlySignal or numpy.array
+            The next samples of the EDA signal
+
+        Returns
+        -------
+        driver : numpy.array
+            The next samples of the driver
+        """
+        values = _np.asarray(chunk.get_values() if isinstance(chunk, _EvenlySignal) else chunk, dtype=float)
+        assert values.ndim == 1, "Only single channel signals are supported"
+        if len(values) == 0:
+            return _np.zeros(0)
+        if self._context is None:
+            self._context = self._half_bateman(values[0], True)
+        self._pending = _np.concatenate([self._pending, values])
+
+        drivers = []
+        # one more sample is needed to deconvolve the last one
+        while len(self._pending) > self._n_block:
+            drivers.append(self._block(self._n_block))
+        return self._smooth(drivers)
+
+    def flush(self):
+        """
+        Ends the stream: deconvolves the last samples with the padding of DriverEstim at the end of the signal.
+
+        Returns
+        -------
+        driver : numpy.array
+            The last samples of the driver
+        """
+        if self._context is None or len(self._pending) == 0:
+            return _np.zeros(0)
+        drivers = [self._block(len(self._pending) - 1, self._half_bateman(self._pending[-1], False))]
+        self._pending = _np.zeros(0)
+        out = self._smooth(drivers)
+        if self._last_driver is not None:
+            # the gaussian filter of DriverEstim is padded with the last value
+            out = _np.r_[out, self._smoothing(_np.repeat(self._last_driver, self._smoothing.get_delay()))]
+        return out
+
+    def _smooth(self, drivers):
+        driver = _np.concatenate(drivers) if len(drivers) > 0 else _np.zeros(0)
+        if len(driver) == 0:
+            return driver
+        self._last_driver = driver[-1]
+        out = self._smoothing(driver)
+        n_drop = min(self._to_drop, len(out))
+        self._to_drop -= n_drop
+        return out[n_drop:]
@@ -1,18 +1,72 @@
 # coding=utf-8
 from __future__ import division
 import numpy as _np
-import scipy.stats as _stats
-from scipy.signal import gaussian as _gaussian, filtfilt as _filtfilt, filter_design as _filter_design, \
-    deconvolve as _deconvolve, firwin as _firwin, convolve as _convolve
-from matplotlib.pyplot import plot as _plot
 from ..BaseFilter import Filter as _Filter
 from ..Signal import EvenlySignal as _EvenlySignal, UnevenlySignal as _UnevenlySignal
 from ..Utility import abstractmethod as _abstract
-from ..tools.Tools import SignalRange
+from ..tools.Tools import SignalRange, _signal_range
+from ..tools.Convolution import convolve as _convolve
 from collections import Sequence
+from functools import lru_cache as _lru_cache
 __author__ = 'AleB'
 
 
+# The kernels are cached (read-only) by their parameters, so that the calls on the segments of a signal do not rebuild
+# them
+@_lru_cache(maxsize=128)
+def _iir_sos(fsamp, fp, fs, loss, att, ftype):
+    from scipy.signal import iirdesign as _iirdesign
+    nyq = 0.5 * fsamp
+    wp = _np.array(fp) / nyq
+    ws = _np.array(fs) / nyq
+    sos = _iirdesign(wp, ws, loss, att, ftype=ftype, output="sos")
+    sos.setflags(write=False)
+    return sos
+
+
+def _key(x):
+    # hashable version of a frequency parameter (float or sequence)
+    x = _np.array(x, dtype=float)
+    return tuple(x.ravel()) if x.ndim > 0 else float(x)
+
+
+@_lru_cache(maxsize=128)
+def _fir_taps(N, wp, width, window, pass_zero):
+    from scipy.signal import firwin as _firwin
+    b = _firwin(N, _np.array(wp), width=width, window=window, pass_zero=pass_zero)
+    b.setflags(write=False)
+    return b
+
+
+@_lru_cache(maxsize=128)
+def _irf(irftype, n, normalize):
+    from scipy.signal import gaussian as _gaussian
+    if irftype == 'gauss':
+        std = _np.floor(n / 8)
+        irf = _gaussian(n, std)
+    elif irftype == 'rect':
+        irf = _np.ones(n)
+    elif irftype == 'triang':
+        irf_1 = _np.arange(n // 2)
+        irf_2 = irf_1[-1] - _np.arange(n // 2)
+        if n % 2 == 0:
+            irf = _np.r_[irf_1, irf_2]
+        else:
+            irf = _np.r_[irf_1, irf_1[-1] + 1, irf_2]
+    elif irftype == 'dgauss':
+        std = _np.round(n / 8)
+        g = _gaussian(n, std)
+        irf = _np.diff(g)
+    else:
+        return None
+
+    # NORMALIZE
+    if normalize:
+        irf = irf / _np.sum(irf)
+    irf.setflags(write=False)
+    return irf
+
+
 class Normalize(_Filter):
     """
     Normalized the input signal using the general formula: ( signal - BIAS ) / RANGE
@@ -46,12 +100,30 @@ class Normalize(_Filter):
             assert norm_range != 0, "norm_range must not be zero"
         _Filter.__init__(self, norm_method=norm_method, norm_bias=norm_bias, norm_range=norm_range)
 
+    _axis_aware = True
+
     @classmethod
     def algorithm(cls, signal, params):
         from ..indicators.TimeDomain import Mean as _Mean, StDev as _StDev
 
         method = params['norm_method']
-        if method == "mean":
+        if signal.ndim > 1:
+            # one bias and range per channel
+            values = signal.get_values()
+            bias, rng = 0, 1
+            if method == "mean":
+                bias = _np.nanmean(values, axis=0)
+            elif method == "standard":
+                bias, rng = _np.nanmean(values, axis=0), _np.nanstd(values, axis=0)
+            elif method == "min":
+                bias = _np.min(values, axis=0)
+            elif method == "maxmin":
+                bias = _np.min(values, axis=0)
+                rng = _np.max(values, axis=0) - bias
+            elif method == "custom":
+                bias, rng = params['norm_bias'], params['norm_range']
+            return signal.clone_properties((values - bias) / rng)
+        elif method == "mean":
             return signal - _Mean()(signal)
         elif method == "standard":
             return (signal - _Mean()(signal)) / _StDev()(signal)
@@ -92,7 +164,9 @@ class IIRFilter(_Filter):
     Notes
     -----
     This is a wrapper of *scipy.signal.filter_design.iirdesign*. Refer to `scipy.signal.filter_design.iirdesign`
-    for additional information
+    for additional information. The filter is designed as second-order sections (cached by the parameters and the
+    sampling frequency) and applied forward and backward with *scipy.signal.sosfiltfilt*, along axis 0 for
+    multi-channel signals.
     """
 
     def __init__(self, fp, fs, loss=.1, att=40, ftype='butter'):
@@ -103,8 +177,11 @@ class IIRFilter(_Filter):
             "Filter type must be in ['butter', 'cheby1', 'cheby2', 'ellip', 'bessel']"
         _Filter.__init__(self, fp=fp, fs=fs, loss=loss, att=att, ftype=ftype)
 
+    _axis_aware = True
+
     @classmethod
     def algorithm(cls, signal, params):
+        from scipy.signal import sosfiltfilt as _sosfiltfilt
         fsamp = signal.get_sampling_freq()
         fp, fs, loss, att, ftype = params["fp"], params["fs"], params["loss"], params["att"], params["ftype"]
 
@@ -112,22 +189,20 @@ class IIRFilter(_Filter):
             cls.warn('Filtering Unevenly signal is undefined. Returning original signal.')
             return signal
 
-        nyq = 0.5 * fsamp
-        fp = _np.array(fp)
-        fs = _np.array(fs)
-
-        wp = fp / nyq
-        ws = fs / nyq
-        # noinspection PyTupleAssignmentBalance
-        b, a = _filter_design.iirdesign(wp, ws, loss, att, ftype=ftype, output="ba")
+        sos = _iir_sos(float(fsamp), _key(fp), _key(fs), loss, att, ftype)
 
-        sig_filtered = signal.clone_properties(_filtfilt(b, a, signal.get_values()))
+        values = signal.get_values()
+        # channels along axis 1
+        # (copy of the cached design: some versions of scipy need a writeable array)
+        filtered = _sosfiltfilt(sos.copy(), values, axis=0)
 
-        if _np.isnan(sig_filtered[0]):
+        failed = _np.isnan(filtered[0])
+        if _np.any(failed):
             cls.warn('Filter parameters allow no solution. Returning original signal.')
-            return signal
-        else:
-            return sig_filtered
+            if values.ndim == 1:
+                return signal
+            filtered[:, failed] = values[:, failed]
+        return signal.clone_properties(filtered)
 
     @_abstract
     def plot(self):
@@ -211,7 +286,7 @@ class FIRFilter(_Filter):
         
         if N%2 ==0:
             N+=1
-        b = _firwin(N, wp, width=Dsamp, window=wtype, pass_zero=pass_zero)
+        b = _fir_taps(N, _key(wp), float(Dsamp), wtype, pass_zero)
         sig_filtered = signal.clone_properties(_convolve(signal.get_values(), b, mode='same'))
 
         if _np.isnan(sig_filtered[0]):
@@ -234,8 +309,14 @@ class KalmanFilter(_Filter):
         
         _Filter.__init__(self, R=R, ratio=ratio, win_len=win_len, win_step=win_step)
         
+    # Relative change of the gain between two samples under which the gain is considered steady and the recursion is
+    # replaced by lfilter. The gain converges geometrically, so the residual change of the gain after the switch is of
+    # the same order: the output does not match the recursion bit for bit, but within ~1e-10 relative (test_kalman)
+    _steady_rtol = 1e-13
+
     @classmethod
     def algorithm(cls, signal, params):
+        from scipy.signal import lfilter as _lfilter
         R = params['R']
         ratio = params['ratio']
         win_len = params['win_len']
@@ -243,20 +324,29 @@ class KalmanFilter(_Filter):
         
         sz = len(signal)
         
-        rr = SignalRange(win_len, win_step)(signal)
+        # O(n) estimate of the local range: rolling extrema
+        rr = _signal_range(signal.get_values(), signal.get_sampling_freq(), win_len, win_step)
         Q = _np.nanmedian(rr)/ratio
             
         P = 1
         
         x_out = signal.get_values().copy()
+        # Q and R are constant: the gain does not depend on the data and converges to the steady state value, after
+        # which the filter is x[k] = (1 - K) * x[k-1] + K * z[k]
+        steady = _np.issubdtype(x_out.dtype, _np.floating)
+        K_prev = None
         for k in range(1,sz):
                 x_ = x_out[k-1]
                 P_ = P + Q
             
                 # measurement update
                 K = P_ / (P_ + R)
+                if steady and K_prev is not None and abs(K - K_prev) <= cls._steady_rtol * K:
+                    x_out[k:] = _lfilter([K], [1, K - 1], x_out[k:], zi=[(1 - K) * x_])[0]
+                    break
                 x_out[k] = x_ + K * (x_out[k] - x_)
                 P = (1 - K ) * P_
+                K_prev = K
 
         x_out = signal.clone_properties(x_out)
         return(x_out)
@@ -270,6 +360,8 @@ class ImputeNAN(_Filter):
         
     @classmethod
     def algorithm(cls, signal, params):
+        import scipy.stats as _stats
+
         def group_consecutives(vals, step=1):
             """Return list of consecutive lists of numbers from vals (number list)."""
             run = []
@@ -474,6 +566,8 @@ class ConvolutionalFilter(_Filter):
         assert irftype == 'custom' or win_len > 0, "Window length value should be positive"
         _Filter.__init__(self, irftype=irftype, win_len=win_len, irf=irf, normalize=normalize)
 
+    _axis_aware = True
+
     # TODO (Andrea): TEST normalization and results
     @classmethod
     def algorithm(cls, signal, params):
@@ -490,6 +584,9 @@ class ConvolutionalFilter(_Filter):
             else:
                 irf = _np.array(params["irf"])
                 n = len(irf)
+                # NORMALIZE
+                if normalize:
+                    irf = irf / _np.sum(irf)
         else:
             if 'win_len' not in params:
                 cls.error("'win_len' parameter missing.")
@@ -497,34 +594,17 @@ class ConvolutionalFilter(_Filter):
             else:
                 n = int(params['win_len'] * fsamp)
 
-                if irftype == 'gauss':
-                    if n < 8:
-                        # TODO (Andrea): test, sometimes it returns nan
-                        cls.error(
-                            "'win_len' too short to generate a gaussian IRF, expected > " + str(_np.ceil(8 / fsamp)))
-                    std = _np.floor(n / 8)
-                    irf = _gaussian(n, std)
-                elif irftype == 'rect':
-                    irf = _np.ones(n)
-                elif irftype == 'triang':
-                    irf_1 = _np.arange(n // 2)
-                    irf_2 = irf_1[-1] - _np.arange(n // 2)
-                    if n % 2 == 0:
-                        irf = _np.r_[irf_1, irf_2]
-                    else:
-                        irf = _np.r_[irf_1, irf_1[-1] + 1, irf_2]
-                elif irftype == 'dgauss':
-                    std = _np.round(n / 8)
-                    g = _gaussian(n, std)
-                    irf = _np.diff(g)
-
-        # NORMALIZE
-        if normalize:
-            irf = irf / _np.sum(irf)
-
-        signal_ = _np.r_[_np.ones(n) * signal[0], signal, _np.ones(n) * signal[-1]]  # TESTME
+                if irftype == 'gauss' and n < 8:
+                    # TODO (Andrea): test, sometimes it returns nan
+                    cls.error(
+                        "'win_len' too short to generate a gaussian IRF, expected > " + str(_np.ceil(8 / fsamp)))
+                irf = _irf(irftype, n, normalize)
 
-        signal_f = _np.convolve(signal_, irf, mode='same')
+        # all the channels (along axis 1) at once
+        values = signal.get_values()
+        # TESTME
+        signal_ = _np.concatenate([_np.repeat(values[:1], n, axis=0), values, _np.repeat(values[-1:], n, axis=0)])
+        signal_f = _convolve(signal_, irf, mode='same')
 
         signal_out = signal.clone_properties(signal_f[n:-n])
         return signal_out
@@ -566,6 +646,7 @@ class DeConvolutionalFilter(_Filter):
 
     @classmethod
     def algorithm(cls, signal, params):
+        from scipy.signal import deconvolve as _deconvolve
         irf = params["irf"]
         normalize = params["normalize"]
         deconvolution_method = params["deconv_method"]
@@ -589,4 +670,5 @@ class DeConvolutionalFilter(_Filter):
         return out_signal
 
     def plot(self):
+        from matplotlib.pyplot import plot as _plot
         _plot(self._params['irf'])
@@ -0,0 +1,196 @@
+# coding=utf-8
+from __future__ import division
+import numpy as _np
+from abc import abstractmethod as _abstract, ABCMeta as _ABCMeta
+from ..Signal import EvenlySignal as _EvenlySignal
+from ..tools.Convolution import convolve as _convolve
+from .Filters import _iir_sos, _irf, _key
+
+__author__ = 'AleB'
+
+
+class _StreamingFilter(metaclass=_ABCMeta):
+    """
+    Stateful causal filter: the successive chunks of a stream are filtered carrying the state between the calls, so
+    that the concatenated outputs are equal to the output of the filter on the concatenated chunks (see filter).
+    """
+
+    def __init__(self):
+        self._state = None
+
+    def __call__(self, chunk):
+        """
+        Filters the next chunk of the stream.
+
+        Parameters
+        ----------
+        chunk : EvenlySignal or numpy.array
+            The next samples, 1D or 2D (samples x channels)
+
+        Returns
+        -------
+        filtered : EvenlySignal or numpy.array
+            The filtered samples, of the same type and with the same properties of the chunk
+        """
+        values = _np.asarray(chunk.get_values() if isinstance(chunk, _EvenlySignal) else chunk, dtype=float)
+        if len(values) == 0:
+            out = values.copy()
+        else:
+            if self._state is None:
+                self._state = self._init_state(values)
+            out, self._state = self._process(values, self._state)
+        return chunk.clone_properties(out) if isinstance(chunk, _EvenlySignal) else out
+
+    def reset(self):
+        """
+        Forgets the state: the next chunk starts a new stream.
+        """
+        self._state = None
+
+    def filter(self, signal):
+        """
+        Filters a whole signal at once, from a new state (the state of the stream is not modified). Reference for the
+        output of the stream.
+        """
+        state = self._state
+        self._state = None
+        try:
+            return self(signal)
+        finally:
+            self._state = state
+
+    @_abstract
+    def _init_state(self, values):
+        """
+        Placeholder for the subclasses
+        :param values: The first chunk of the stream
+        :return: The initial state
+        """
+        pass
+
+    @_abstract
+    def _process(self, values, state):
+        """
+        Placeholder for the subclasses
+        :param values: The chunk
+        :param state: The state after the previous chunk
+        :return: Tuple (filtered chunk, state after the chunk)
+        """
+        pass
+
+
+class StreamingIIRFilter(_StreamingFilter):
+    """
+    Causal Infinite Impulse Response filter for streams: second-order sections filtered with *scipy.signal.sosfilt*,
+    carrying the state of the sections between the chunks. Same design of IIRFilter, which is zero-phase instead.
+
+    Parameters
+    ----------
+    fsamp : float, >0
+        Sampling frequency of the stream
+    fp : list or float
+        The pass frequencies
+    fs : list or float
+        The stop frequencies
+
+    Optional parameters
+    -------------------
+    loss : float, >0, default = 0.1
+        Loss tolerance in the pass band
+    att : float, >0, default = 40
+        Minimum attenuation required in the stop band.
+    ftype : str, default = 'butter'
+        Type of filter. Available types: 'butter', 'cheby1', 'cheby2', 'ellip', 'bessel'
+    init : str, default = 'steady'
+        Initial state: 'steady' (the stream is assumed constant, equal to its first sample, before the start: no
+        transient) or 'zeros'
+
+    Returns
+    -------
+    signal : EvenlySignal or numpy.array
+        Filtered chunk
+    """
+
+    def __init__(self, fsamp, fp, fs, loss=.1, att=40, ftype='butter', init='steady'):
+        assert fsamp > 0, "The sampling frequency should be positive"
+        assert loss > 0, "Loss value should be positive"
+        assert att > 0, "Attenuation value should be positive"
+        assert att > loss, "Attenuation value should be greater than loss value"
+        assert ftype in ['butter', 'cheby1', 'cheby2', 'ellip', 'bessel'],\
+            "Filter type must be in ['butter', 'cheby1', 'cheby2', 'ellip', 'bessel']"
+        assert init in ['steady', 'zeros'], "init should be 'steady' or 'zeros'"
+        _StreamingFilter.__init__(self)
+        self._sos = _iir_sos(float(fsamp), _key(fp), _key(fs), loss, att, ftype).copy()
+        self._init = init
+
+    def _init_state(self, values):
+        from scipy.signal import sosfilt_zi as _sosfilt_zi
+        zi = _sosfilt_zi(self._sos)
+        # (sections, 2) + channels
+        zi = zi.reshape(zi.shape + (1,) * (values.ndim - 1))
+        return zi * values[0] if self._init == 'steady' else zi * _np.zeros_like(values[0])
+
+    def _process(self, values, state):
+        from scipy.signal import sosfilt as _sosfilt
+        return _sosfilt(self._sos, values, axis=0, zi=state)
+
+
+class StreamingConvolutionalFilter(_StreamingFilter):
+    """
+    Causal convolution with an impulse response function (IRF) for streams, with the overlap-save method: each chunk
+    is convolved together with the last len(irf) - 1 samples of the previous ones. The output is delayed by
+    get_delay() samples with respect to ConvolutionalFilter.
+
+    Parameters
+    ----------
+    irftype : str
+        Type of IRF to be generated. 'gauss', 'rect', 'triang', 'dgauss', 'custom'.
+    fsamp : float, >0
+        Sampling frequency of the stream (not needed for 'custom')
+    win_len : float, >0
+        Duration of the generated IRF in seconds (if irftype is not 'custom')
+
+    Optional parameters
+    -------------------
+    irf : numpy.array
+        IRF to be used if irftype is 'custom'
+    normalize : boolean, default = True
+        Whether to normalizes the IRF to have unitary area
+
+    Returns
+    -------
+    signal : EvenlySignal or numpy.array
+        Filtered chunk
+    """
+
+    def __init__(self, irftype, fsamp=None, win_len=None, irf=None, normalize=True):
+        assert irftype in ['gauss', 'rect', 'triang', 'dgauss', 'custom'],\
+            "IRF type must be in ['gauss', 'rect', 'triang', 'dgauss', 'custom']"
+        _StreamingFilter.__init__(self)
+        if irftype == 'custom':
+            assert irf is not None, "irf is needed when irftype is 'custom'"
+            irf = _np.array(irf, dtype=float)
+            if normalize:
+                irf = irf / _np.sum(irf)
+        else:
+            assert fsamp is not None and fsamp > 0, "The sampling frequency should be positive"
+            assert win_len is not None and win_len > 0, "Window length value should be positive"
+            irf = _irf(irftype, int(win_len * fsamp), normalize)
+        assert len(irf) > 0, "The IRF should not be empty"
+        self._irf = irf
+
+    def get_delay(self):
+        """
+        :return: Delay (samples) of the output with respect to the centered (zero-phase) convolution
+        """
+        return (len(self._irf) - 1) // 2
+
+    def _init_state(self, values):
+        # the stream is assumed constant, equal to its first sample, before the start (as the padding of
+        # ConvolutionalFilter)
+        return _np.repeat(values[:1], len(self._irf) - 1, axis=0)
+
+    def _process(self, values, state):
+        block = _np.concatenate([state, values])
+        out = _convolve(block, self._irf, mode='valid')
+        return out, block[len(block) - len(state):]
@@ -2,9 +2,8 @@
 from __future__ import division
 
 from ..BaseIndicator import Indicator as _Indicator
-from ..tools.Tools import Diff as _Diff
-from ..indicators.TimeDomain import Mean as _Mean, StDev as _StDev
-from scipy.spatial.distance import cdist as _cd
+from ..tools.Tools import Diff as _Diff, embed as _embed
+from ..indicators.TimeDomain import StDev as _StDev
 import numpy as _np
 
 __author__ = 'AleB'
@@ -31,7 +30,8 @@ class PoincareSD1(_Indicator):
         @return: (SD1, SD2)
         @rtype: (array, array)
         """
-        xd, yd = _np.array(list(data[:-1])), _np.array(list(data[1:]))
+        emb = _embed(_np.asarray(data, dtype=float), 2)
+        xd, yd = emb[:, 0], emb[:, 1]
         sd1 = _np.std((xd - yd) / _np.sqrt(2.0))
         return sd1
 
@@ -57,7 +57,8 @@ class PoincareSD2(_Indicator):
         @return: (SD1, SD2)
         @rtype: (array, array)
         """
-        xd, yd = _np.array(list(data[:-1])), _np.array(list(data[1:]))
+        emb = _embed(_np.asarray(data, dtype=float), 2)
+        xd, yd = emb[:, 0], emb[:, 1]
         sd2 = _np.std((xd + yd) / _np.sqrt(2.0))
         return sd2
 
@@ -154,28 +155,49 @@ class NNx(_Indicator):
         return sum(1.0 for x in diff * 1000 if x > th)
 
 
-class _Embed(_Indicator):
-    def __init__(self, dimension, **kwargs):
-        _Indicator.__init__(self, dimension=dimension, **kwargs)
+def _match_counts(values, dimensions, r):
+    """
+    Number of embedded vectors (sequences of consecutive samples) within Chebyshev distance r (<= r, including the
+    vector itself) from each embedded vector, as the rows of cdist(emb, emb, 'chebyshev') <= r counted without building
+    the matrix: the pairs at each lag k (vector i and vector i + k) are matched all at once on the array of the sample
+    distances |x[i] - x[i + k]|. O(N^2) time, O(N) memory.
 
-    @classmethod
-    def algorithm(cls, signal, params):
-        """
-        Calculates the the vector of the sequences of length 'subset_size' of the data
-        @return: Data array with shape (l - n + 1, n) having l=len(data) and n=subset_size
-        @rtype: array
-        """
-        n = params['dimension']
-        # t = params['delay']
-        num = len(signal) - n + 1
-        if num > 0:
-            emb = _np.zeros([num, n])
-            # 2>3 xrange>range
-            for i in range(num):
-                emb[i, :] = signal[i:i + n]
-            return emb
-        else:
-            return []
+    Parameters
+    ----------
+    values : numpy.array
+        The samples
+    dimensions : list
+        The embedding dimensions, e.g. [m, m + 1]
+    r : float
+        The radius
+
+    Returns
+    -------
+    counts : list
+        For each dimension d, the array of the len(values) - d + 1 counts
+    """
+    values = _np.asarray(values, dtype=float)
+    n = len(values)
+    counts = []
+    for d in dimensions:
+        # a vector matches itself if its distance is not NaN
+        counts.append(_np.all(_embed(_np.isfinite(values), d), axis=1).astype(_np.int64))
+
+    d_max = max(dimensions)
+    for k in range(1, n - min(dimensions) + 1):
+        close = _np.abs(values[:n - k] - values[k:]) <= r
+        ok = close
+        for d in range(1, d_max + 1):
+            if d > 1:
+                # vector i matches vector i + k in dimension d
+                ok = ok[:-1] & close[d - 1:]
+            if len(ok) == 0:
+                break
+            if d in dimensions:
+                c = counts[dimensions.index(d)]
+                c[:len(ok)] += ok
+                c[k:k + len(ok)] += ok
+    return counts
 
 
 class ApproxEntropy(_Indicator):
@@ -186,6 +208,8 @@ class ApproxEntropy(_Indicator):
     ----------
     radius : float, >0, default=0.5
         Radius to threshold the distance between the embedded vectors
+    dimension : int, >0, default=2
+        Embedding dimension (m): the vectors of m and m + 1 samples are compared
         
     Returns
     -------
@@ -193,36 +217,28 @@ class ApproxEntropy(_Indicator):
         Approximate Entropy
     """
 
-    def __init__(self, radius=.5, **kwargs):
+    _persistent = True
+
+    def __init__(self, radius=.5, dimension=2, **kwargs):
         assert radius > 0, "Parameter radius should be > 0"
-        _Indicator.__init__(self, radius=radius, **kwargs)
+        assert dimension > 0, "Parameter dimension should be > 0"
+        _Indicator.__init__(self, radius=radius, dimension=dimension, **kwargs)
 
     @classmethod
     def algorithm(cls, data, params):
-        if len(data) < 3:
+        m = params.get('dimension', 2)
+        if len(data) < m + 1:
             return _np.nan
         else:
             r = params['radius']
-            uj_m = _Embed(dimension=2, delay=1)(data)
-            uj_m1 = _Embed(dimension=3, delay=1)(data)
-            card_elem_m = uj_m.shape[0]
-            card_elem_m1 = uj_m1.shape[0]
-
             r = r * _np.std(data)
-            d_m = _cd(uj_m, uj_m, 'chebyshev')
-            d_m1 = _cd(uj_m1, uj_m1, 'chebyshev')
 
-            cmr_m_ap_en = _np.zeros(card_elem_m)
-            # 2>3 xrange>range
-            for i in range(card_elem_m):
-                vector = d_m[i]
-                cmr_m_ap_en[i] = float(sum(1 for i in vector if i <= r)) / card_elem_m
+            count_m, count_m1 = _match_counts(data, [m, m + 1], r)
+            card_elem_m = len(count_m)
+            card_elem_m1 = len(count_m1)
 
-            cmr_m1_ap_en = _np.zeros(card_elem_m1)
-            # 2>3 xrange>range
-            for i in range(card_elem_m1):
-                vector = d_m1[i]
-                cmr_m1_ap_en[i] = float(sum(1 for i in vector if i <= r)) / card_elem_m1
+            cmr_m_ap_en = count_m / card_elem_m
+            cmr_m1_ap_en = count_m1 / card_elem_m1
 
             phi_m = _np.sum(_np.log(cmr_m_ap_en)) / card_elem_m
             phi_m1 = _np.sum(_np.log(cmr_m1_ap_en)) / card_elem_m1
@@ -238,6 +254,8 @@ class SampleEntropy(_Indicator):
     ----------
     radius : float, >0, default=0.5
         Radius to threshold the distance between the embedded vectors
+    dimension : int, >0, default=2
+        Embedding dimension (m): the vectors of m and m + 1 samples are compared
         
     Returns
     -------
@@ -245,38 +263,28 @@ class SampleEntropy(_Indicator):
         Sample Entropy
     """
 
-    def __init__(self, radius=.5, **kwargs):
+    _persistent = True
+
+    def __init__(self, radius=.5, dimension=2, **kwargs):
         assert radius > 0, "Parameter radius should be > 0"
-        _Indicator.__init__(self, radius=radius, **kwargs)
+        assert dimension > 0, "Parameter dimension should be > 0"
+        _Indicator.__init__(self, radius=radius, dimension=dimension, **kwargs)
 
     @classmethod
     def algorithm(cls, data, params):
-        if len(data) < 4:
+        m = params.get('dimension', 2)
+        if len(data) < m + 2:
             return _np.nan
         else:
             r = params['radius']
-            uj_m = _Embed(dimension=2, delay=1)(data)
-            uj_m1 = _Embed(dimension=3, delay=1)(data)
-
-            num_elem_m = uj_m.shape[0]
-            num_elem_m1 = uj_m1.shape[0]
-
             r = r * _StDev()(data)
 
-            d_m = _cd(uj_m, uj_m, 'chebyshev')
-            d_m1 = _cd(uj_m1, uj_m1, 'chebyshev')
+            count_m, count_m1 = _match_counts(data, [m, m + 1], r)
+            num_elem_m = len(count_m)
+            num_elem_m1 = len(count_m1)
 
-            cmr_m_sa_mp_en = _np.zeros(num_elem_m)
-            # 2>3 xrange>range
-            for i in range(num_elem_m):
-                vector = d_m[i]
-                cmr_m_sa_mp_en[i] = (sum(1 for i in vector if i <= r) - 1) / (num_elem_m - 1)
-
-            cmr_m1_sa_mp_en = _np.zeros(num_elem_m1)
-            # 2>3 xrange>range
-            for i in range(num_elem_m1):
-                vector = d_m1[i]
-                cmr_m1_sa_mp_en[i] = (sum(1 for i in vector if i <= r) - 1) / (num_elem_m1 - 1)
+            cmr_m_sa_mp_en = (count_m - 1) / (num_elem_m - 1)
+            cmr_m1_sa_mp_en = (count_m1 - 1) / (num_elem_m1 - 1)
 
             cm = _np.sum(cmr_m_sa_mp_en) / num_elem_m
             cm1 = _np.sum(cmr_m1_sa_mp_en) / num_elem_m1
@@ -284,6 +292,92 @@ class SampleEntropy(_Indicator):
             return _np.log(cm / cm1)
 
 
+def _dfa_fluctuation(values, box_lengths):
+    """
+    Fluctuation function F(n) of the De-trended Fluctuation Analysis for each box length n, in one pass on the
+    integrated series: for each n the series is reshaped in a (boxes x n) matrix and the residuals of the linear fit of
+    all the boxes are computed at once from the (centered) moments of the boxes.
+
+    Parameters
+    ----------
+    values : numpy.array
+        The samples, along the last axis (e.g. a matrix of windows x samples)
+    box_lengths : numpy.array
+        The box lengths n, >1
+
+    Returns
+    -------
+    f : numpy.array
+        F(n) for each box length, along the last axis
+    """
+    values = _np.asarray(values, dtype=float)
+    n_samples = values.shape[-1]
+    y = _np.cumsum(values - _np.mean(values, axis=-1)[..., None], axis=-1)
+    f = _np.zeros(values.shape[:-1] + (len(box_lengths),))
+    for i, n in enumerate(box_lengths):
+        n = int(n)
+        # the boxes y[j:j + n] with j + n < len(values)
+        n_boxes = (n_samples - 1) // n
+        if n_boxes > 0:
+            boxes = y[..., :n_boxes * n].reshape(values.shape[:-1] + (n_boxes, n))
+            boxes = boxes - _np.mean(boxes, axis=-1)[..., None]
+            t = _np.arange(n) - (n - 1) / 2
+            # sum of squares minus the part explained by the slope of each box
+            f[..., i] = _np.sum(boxes * boxes, axis=(-2, -1)) - _np.sum(_np.dot(boxes, t) ** 2, axis=-1) / _np.dot(t, t)
+    return _np.sqrt(_np.maximum(f, 0) / n_samples)
+
+
+def _dfa_alpha(box_lengths, f):
+    # slope of the least squares line of log(F(n)) vs log(n), along the last axis
+    log_l = _np.log(box_lengths)
+    log_l = log_l - _np.mean(log_l)
+    with _np.errstate(divide='ignore', invalid='ignore'):
+        log_f = _np.log(f)
+        alpha = _np.dot(log_f, log_l) / _np.dot(log_l, log_l)
+    # no fit with the box lengths without boxes (F(n) = 0)
+    return _np.where(_np.all(_np.isfinite(log_f), axis=-1), alpha, _np.nan)[()]
+
+
+class DFA(_Indicator):
+    """
+    Calculate the scaling exponent (alpha) of the De-trended Fluctuation Analysis on the box lengths
+    box_min, box_min + box_step, ..., box_max, or the fluctuation function F(n) on the same box lengths. With the default
+    box lengths (4..64) F(n) covers both the short term (4..16, see DFAShortTerm) and the long term (16..64, see
+    DFALongTerm) scales.
+
+    Optional parameters
+    -------------------
+    box_min : int, >1, default=4
+        Shortest box length (samples)
+    box_max : int, >=box_min, default=64
+        Longest box length (samples)
+    box_step : int, >0, default=4
+        Step between the box lengths (samples)
+    fluctuation : boolean, default=False
+        Whether to return the fluctuation function F(n) instead of the scaling exponent
+
+    Returns
+    -------
+    alpha : float or numpy.array
+        Scaling exponent of the De-trended Fluctuation Analysis, or F(n) for each box length if fluctuation is True
+    """
+
+    def __init__(self, box_min=4, box_max=64, box_step=4, fluctuation=False, **kwargs):
+        assert box_min > 1, "Parameter box_min should be > 1"
+        assert box_max >= box_min, "Parameter box_max should be >= box_min"
+        assert box_step > 0, "Parameter box_step should be > 0"
+        _Indicator.__init__(self, box_min=box_min, box_max=box_max, box_step=box_step, fluctuation=fluctuation,
+                            **kwargs)
+
+    @classmethod
+    def algorithm(cls, data, params):
+        l = _np.arange(params['box_min'], params['box_max'] + 1, params['box_step'])
+        if len(data) < params['box_max']:
+            return _np.repeat(_np.nan, len(l)) if params['fluctuation'] else _np.nan
+        f = _dfa_fluctuation(data, l)
+        return f if params['fluctuation'] else _dfa_alpha(l, f)
+
+
 class DFAShortTerm(_Indicator):
     """
     Calculate the alpha1 (short term) component index of the De-trended Fluctuation Analysis.
@@ -299,29 +393,11 @@ class DFAShortTerm(_Indicator):
 
     @classmethod
     def algorithm(cls, data, params):
-
-        x = data
-        if len(x) < 16:
+        if len(data) < 16:
             return _np.nan
         else:
-            ave = float(_Mean()(x))
-            y = _np.cumsum(x).astype(float)
-            y -= ave
             l = _np.arange(4, 17, 4)
-            f = _np.zeros(len(l))  # f(n) of different given box length n
-            # 2>3 xrange>range
-            for i in range(0, len(l)):
-                n = int(l[i])  # for each box length l[i]
-                # 2>3 xrange>range
-                for j in range(0, len(x), n):  # for each box
-                    if j + n < len(x):
-                        c = range(j, j + n)
-                        c = _np.vstack([c, _np.ones(n)]).T  # coordinates of time in the box
-                        z = y[j:j + n]  # the value of example_data in the box
-                        f[i] += _np.linalg.lstsq(c, z)[1]  # add residue in this box
-                f[i] /= ((len(x) / n) * n)
-            f = _np.sqrt(f)
-            return _np.linalg.lstsq(_np.vstack([_np.log(l), _np.ones(len(l))]).T, _np.log(f))[0][0]
+            return _dfa_alpha(l, _dfa_fluctuation(data, l))
 
 
 class DFALongTerm(_Indicator):
@@ -339,27 +415,8 @@ class DFALongTerm(_Indicator):
 
     @classmethod
     def algorithm(cls, data, params):
-        x = data
-        if len(x) < 64:
+        if len(data) < 64:
             return _np.nan
         else:
-            ave = float(_Mean()(x))
-            y = _np.cumsum(x).astype(float)
-            y -= ave
-            l_max = _np.min([64, len(x)])
-            l = _np.arange(16, l_max + 1, 4)
-            f = _np.zeros(len(l))  # f(n) of different given box length n
-            # 2>3 xrange>range
-            for i in range(0, len(l)):
-                n = int(l[i])  # for each box length l[i]
-                # 2>3 xrange>range
-                for j in range(0, len(x), n):  # for each box
-                    if j + n < len(x):
-                        c = range(j, j + n)
-                        c = _np.vstack([c, _np.ones(n)]).T  # coordinates of time in the box
-                        z = y[j:j + n]  # the value of example_data in the box
-                        f[i] += _np.linalg.lstsq(c, z)[1]  # add residue in this box
-                f[i] /= ((len(x) / n) * n)
-            f = _np.sqrt(f)
-
-            return _np.linalg.lstsq(_np.vstack([_np.log(l), _np.ones(len(l))]).T, _np.log(f))[0][0]
+            l = _np.arange(16, 65, 4)
+            return _dfa_alpha(l, _dfa_fluctuation(data, l))
@@ -22,6 +22,10 @@ class Mean(_Indicator):
     def algorithm(cls, data, params):
         return _np.nanmean(data.get_values())
 
+    @classmethod
+    def algorithm_batch(cls, windows, params, fsamp):
+        return _np.nanmean(windows, axis=1)
+
 
 class Min(_Indicator):
     """
@@ -34,6 +38,10 @@ class Min(_Indicator):
     def algorithm(cls, data, params):
         return _np.nanmin(data.get_values())
 
+    @classmethod
+    def algorithm_batch(cls, windows, params, fsamp):
+        return _np.nanmin(windows, axis=1)
+
 
 class Max(_Indicator):
     """
@@ -46,6 +54,10 @@ class Max(_Indicator):
     def algorithm(cls, data, params):
         return _np.nanmax(data.get_values())
 
+    @classmethod
+    def algorithm_batch(cls, windows, params, fsamp):
+        return _np.nanmax(windows, axis=1)
+
 
 class Range(_Indicator):
     """
@@ -58,6 +70,10 @@ class Range(_Indicator):
     def algorithm(cls, data, params):
         return Max()(data) - Min()(data)
 
+    @classmethod
+    def algorithm_batch(cls, windows, params, fsamp):
+        return Max.algorithm_batch(windows, params, fsamp) - Min.algorithm_batch(windows, params, fsamp)
+
 
 class Median(_Indicator):
     """
@@ -70,6 +86,10 @@ class Median(_Indicator):
     def algorithm(cls, data, params):
         return _np.median(data.get_values())
 
+    @classmethod
+    def algorithm_batch(cls, windows, params, fsamp):
+        return _np.median(windows, axis=1)
+
 
 class StDev(_Indicator):
     """
@@ -82,6 +102,10 @@ class StDev(_Indicator):
     def algorithm(cls, data, params):
         return _np.nanstd(data.get_values())
 
+    @classmethod
+    def algorithm_batch(cls, windows, params, fsamp):
+        return _np.nanstd(windows, axis=1)
+
 
 class Sum(_Indicator):
     """
@@ -94,6 +118,10 @@ class Sum(_Indicator):
     def algorithm(cls, data, params):
         return _np.nansum(data.get_values())
 
+    @classmethod
+    def algorithm_batch(cls, windows, params, fsamp):
+        return _np.nansum(windows, axis=1)
+
 
 class AUC(_Indicator):
     """
@@ -109,6 +137,10 @@ class AUC(_Indicator):
         fsamp = signal.get_sampling_freq()
         return (1. / fsamp) * Sum()(signal)
 
+    @classmethod
+    def algorithm_batch(cls, windows, params, fsamp):
+        return (1. / fsamp) * Sum.algorithm_batch(windows, params, fsamp)
+
 
 class RMSSD(_Indicator):
     """
@@ -135,6 +167,72 @@ class SDSD(_Indicator):
         diff = _Diff()(signal)
         return StDev()(diff)
 
+
+class HRVTimeDomain(_Indicator):
+    """
+    Computes in one pass all the indicators of preset_hrv_td (RMSSD, SDSD, Mean, StDev, Median, pNNx with thresholds
+    10, 25 and 50 ms, Min, Max, Poincare' SD1, SD2, SD1/SD2 and ellipse area, DFA alpha1 and alpha2), sharing the
+    differences of the samples, as the named outputs of a single indicator (see get_output_names). Supports the batch
+    evaluation of fmap (on the windows of an EvenlySignal).
+
+    Optional parameters
+    -------------------
+    prefix : str, default=''
+        Prefix of the names of the outputs
+
+    Returns
+    -------
+    values : tuple
+        The value of each indicator, in the order of get_output_names
+    """
+
+    _outputs = ['RMSSD', 'SDSD', 'Mean', 'RRstd', 'Median', 'pnn10', 'pnn25', 'pnn50', 'Min', 'Max', 'sd1', 'sd2',
+                'sd12', 'sdell', 'DFA1', 'DFA2']
+
+    def __init__(self, prefix='', **kwargs):
+        _Indicator.__init__(self, prefix=prefix, **kwargs)
+
+    def get_output_names(self):
+        return [self._params['prefix'] + name for name in self._outputs]
+
+    @classmethod
+    def algorithm(cls, data, params):
+        return tuple(cls.algorithm_batch(_np.asarray(data.get_values(), dtype=float)[None, :], params, None)[0])
+
+    @classmethod
+    def algorithm_batch(cls, windows, params, fsamp):
+        from .NonLinearDomain import _dfa_fluctuation, _dfa_alpha
+        n = windows.shape[1]
+        diff = windows[:, 1:] - windows[:, :-1]
+        out = _np.empty((len(windows), len(cls._outputs)))
+
+        out[:, 0] = _np.sqrt(_np.mean(_np.power(diff, 2), axis=1))
+        out[:, 1] = _np.nanstd(diff, axis=1)
+        out[:, 2] = _np.nanmean(windows, axis=1)
+        out[:, 3] = _np.nanstd(windows, axis=1)
+        out[:, 4] = _np.median(windows, axis=1)
+        diff_ms = diff * 1000
+        for k, th in enumerate([10, 25, 50]):
+            out[:, 5 + k] = _np.count_nonzero(diff_ms > th, axis=1) / float(n)
+        out[:, 8] = _np.nanmin(windows, axis=1)
+        out[:, 9] = _np.nanmax(windows, axis=1)
+
+        # Poincare' plot of the pairs of consecutive samples
+        sd1 = _np.std(-diff / _np.sqrt(2.0), axis=1)
+        sd2 = _np.std((windows[:, :-1] + windows[:, 1:]) / _np.sqrt(2.0), axis=1)
+        out[:, 10:14] = _np.column_stack([sd1, sd2, sd1 / sd2, sd1 * sd2 * _np.pi])
+
+        # the short and the long term box lengths in one pass
+        out[:, 14:] = _np.nan
+        if n >= 16:
+            l = _np.arange(4, 65 if n >= 64 else 17, 4)
+            f = _dfa_fluctuation(windows, l)
+            out[:, 14] = _dfa_alpha(l[:4], f[:, :4])
+            if n >= 64:
+                out[:, 15] = _dfa_alpha(l[3:], f[:, 3:])
+        return out
+
+
 # TODO: FIX Histogram missing
 class Triang(_Indicator):
     """
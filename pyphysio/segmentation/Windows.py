@@ -0,0 +1,65 @@
+# coding=utf-8
+from __future__ import division
+import numpy as _np
+from ..BaseIndicator import Indicator as _Indicator
+from ..Signal import EvenlySignal as _EvenlySignal
+from ..tools.Rolling import window_matrix
+
+__author__ = 'AleB'
+
+
+def batch_columns(signals, tasks, algorithms):
+    """
+    Computes the results of the indicators that support the batched evaluation (the ones defining algorithm_batch,
+    see Indicator) on the segments of single channel EvenlySignals, grouping the segments with the same number of
+    samples.
+
+    Parameters
+    ----------
+    signals : list
+        The signals
+    tasks : list
+        The segments as tuples (index of the signal, begin time, end time, label)
+    algorithms : list
+        The algorithms
+
+    Returns
+    -------
+    columns : dict
+        Index of the algorithm -> array of the results, one (or one row, for the indicators with many outputs) per
+        segment. Only the algorithms that could be computed in batch on all the segments are included
+    """
+    batch_algs = [i for i, alg in enumerate(algorithms) if isinstance(alg, _Indicator) and
+                  getattr(alg, 'algorithm_batch', None) is not None]
+    if len(batch_algs) == 0 or len(tasks) == 0:
+        return {}
+
+    # same slicing of Segment.__call__ -> EvenlySignal.segment_time
+    groups = {}
+    for k, (i_signal, b, e, label) in enumerate(tasks):
+        signal = signals[i_signal]
+        if not isinstance(signal, _EvenlySignal) or signal.ndim != 1:
+            return {}
+        n = len(signal)
+        i_b = min(signal.get_idx(b), n)
+        i_e = min(signal.get_idx(e), n) if e is not None else n
+        if i_e <= i_b:
+            # empty segments: keep the behaviour of the indicators on empty signals
+            return {}
+        group = groups.setdefault((i_signal, i_e - i_b), ([], []))
+        group[0].append(k)
+        group[1].append(i_b)
+
+    columns = {}
+    for (i_signal, width), (ks, begins) in groups.items():
+        signal = signals[i_signal]
+        ks = _np.asarray(ks)
+        for rows, windows in window_matrix(signal.get_values(), begins, width):
+            for i in batch_algs:
+                alg = algorithms[i]
+                result = alg.algorithm_batch(windows, alg.get(), signal.get_sampling_freq())
+                if i not in columns:
+                    # one row of outputs per segment for the indicators with many outputs
+                    columns[i] = _np.empty((len(tasks),) + result.shape[1:], dtype=result.dtype)
+                columns[i][ks[rows]] = result
+    return columns
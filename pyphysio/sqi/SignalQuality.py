@@ -3,7 +3,6 @@ import numpy as _np
 
 from ..BaseIndicator import Indicator as _Indicator
 from ..indicators.FrequencyDomain import PowerInBand as _PowerInBand
-import scipy.stats as _sps
 from ..filters.Filters import ImputeNAN as _ImputeNAN
 
 __author__ = 'AleB'
@@ -18,6 +17,7 @@ class Kurtosis(_Indicator):
 
     @classmethod
     def algorithm(cls, data, params):
+        import scipy.stats as _sps
         k = _sps.kurtosis(data.get_values())
         return(k)
 
@@ -27,6 +27,7 @@ class Entropy(_Indicator):
     
     @classmethod
     def algorithm(cls, data, params):
+        import scipy.stats as _sps
         if _np.isnan(data).all():
             return(_np.nan)
         nbins=params['nbins']
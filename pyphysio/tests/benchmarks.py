@@ -0,0 +1,166 @@
+# coding=utf-8
+"""
+Timing benchmarks of the optimized engines against the reference implementations.
+Run with: python -m pyphysio.tests.benchmarks
+"""
+from __future__ import division, print_function
+
+from timeit import default_timer as _timer
+from . import ph, np, TestData
+
+__author__ = 'aleb'
+
+
+def _time(f, repeat=3):
+    best = np.inf
+    for i in range(repeat):
+        t0 = _timer()
+        f()
+        best = min(best, _timer() - t0)
+    return best
+
+
+def _report(name, t_new, t_ref):
+    print("%-40s %10.4fs %10.4fs %8.1fx" % (name, t_new, t_ref, t_ref / t_new))
+
+
+def _periodic_signal(duration=600, fsamp=1000, freq=1.2):
+    np.random.seed(1234)
+    t = np.arange(int(duration * fsamp)) / fsamp
+    x = np.sin(2 * np.pi * freq * t) ** 15 + 0.05 * np.random.randn(len(t))
+    return ph.EvenlySignal(x, sampling_freq=fsamp, signal_type='ECG')
+
+
+def bench_peak_detection():
+    s = _periodic_signal()
+    delta = 0.5 * ph.SignalRange(win_len=2, win_step=0.5, smooth=False)(s)
+    for name, d in [('PeakDetection scalar delta', 0.5), ('PeakDetection vector delta', delta)]:
+        t_new = _time(lambda: ph.PeakDetection(delta=d, refractory=0.3, engine='numpy')(s))
+        t_ref = _time(lambda: ph.PeakDetection(delta=d, refractory=0.3, engine='loop')(s), repeat=1)
+        _report(name, t_new, t_ref)
+
+
+def bench_fmap_batch():
+    s = _periodic_signal(duration=3600, fsamp=100)
+    algorithms = [ph.Mean(), ph.StDev(), ph.Min(), ph.Max(), ph.Range(), ph.Median(), ph.Sum(), ph.AUC()]
+    segmenter = ph.FixedSegments(step=1, width=10)
+    t_new = _time(lambda: ph.fmap(segmenter(s), algorithms, batch=True))
+    t_ref = _time(lambda: ph.fmap(segmenter(s), algorithms), repeat=1)
+    _report('fmap time domain batch (1h, 10s/1s)', t_new, t_ref)
+
+
+def bench_kalman():
+    from .test_kalman import kalman_reference
+    s = _periodic_signal(duration=1800, fsamp=1000)
+    t_new = _time(lambda: ph.KalmanFilter(R=10, ratio=10).run(s, {'R': 10, 'ratio': 10, 'win_len': 1,
+                                                                   'win_step': 0.5}, use_cache=False))
+    t_ref = _time(lambda: kalman_reference(s, 10, 10), repeat=1)
+    _report('KalmanFilter (30min, 1kHz)', t_new, t_ref)
+
+
+def bench_rolling():
+    from .test_kalman import signal_range_reference
+    from .test_rolling import maxima_windowing_reference
+    s = _periodic_signal(duration=600, fsamp=1000)
+    t_new = _time(lambda: ph.SignalRange(win_len=2, win_step=0.5)(s))
+    t_ref = _time(lambda: signal_range_reference(s, 2, 0.5), repeat=1)
+    _report('SignalRange (10min, 1kHz)', t_new, t_ref)
+    t_new = _time(lambda: ph.Maxima(method='windowing', win_len=1, win_step=0.01)(s))
+    t_ref = _time(lambda: maxima_windowing_reference(s, 1, 0.01), repeat=1)
+    _report('Maxima windowing (10min, 1kHz)', t_new, t_ref)
+
+
+def bench_convolution():
+    s = _periodic_signal(duration=600, fsamp=1000)
+    n = 2000
+    irf = np.ones(n) / n
+    t_new = _time(lambda: ph.ConvolutionalFilter(irftype='rect', win_len=2)(s))
+    t_ref = _time(lambda: np.convolve(np.r_[np.ones(n) * s[0], s, np.ones(n) * s[-1]], irf, mode='same'), repeat=1)
+    _report('ConvolutionalFilter rect 2s (10min, 1kHz)', t_new, t_ref)
+
+
+def bench_streaming(chunk=32):
+    # per-chunk latency: median and 99th percentile, against the duration of the chunk
+    s = _periodic_signal(duration=120, fsamp=1000)
+    x = s.get_values()
+    filters = [('StreamingIIRFilter', ph.StreamingIIRFilter(1000, fp=40, fs=50)),
+               ('StreamingConvolutionalFilter', ph.StreamingConvolutionalFilter('gauss', fsamp=1000, win_len=0.5))]
+    for name, f in filters:
+        latencies = []
+        for i in range(0, len(x), chunk):
+            t0 = _timer()
+            f(x[i:i + chunk])
+            latencies.append(_timer() - t0)
+        print("%-40s median %.1fus p99 %.1fus (chunk %d samples = %.1fms)" % (
+            name + ' latency', np.median(latencies) * 1e6, np.percentile(latencies, 99) * 1e6, chunk,
+            chunk / s.get_sampling_freq() * 1e3))
+
+
+def bench_streaming_beats(chunk_len=0.25):
+    # replay of the test ECG: latency of the beats and processing time of the chunks
+    from ..estimators.Streaming import replay
+    ecg = ph.EvenlySignal(TestData.ecg(), sampling_freq=2048, signal_type='ECG')
+    stream = ph.StreamingBeatFromECG(2048)
+    idx, ibi, latency, times = replay(stream, ecg, chunk_len)
+    print("%-40s %d beats, latency median %.3fs max %.3fs (lookahead %.3fs), chunk time p99 %.2fms" % (
+        'StreamingBeatFromECG (chunk %.2fs)' % chunk_len, len(idx), np.median(latency[:-1]), np.max(latency[:-1]),
+        stream.get_lookahead(), np.percentile(times, 99) * 1e3))
+
+
+def bench_entropy(n=3000):
+    from .test_entropy import sampen_reference
+    np.random.seed(0)
+    x = 0.8 + 0.05 * np.random.randn(n)
+    s = ph.EvenlySignal(x, 4)
+    t_new = _time(lambda: ph.SampleEntropy().run(s, {'radius': .5, 'dimension': 2}, use_cache=False))
+    t_ref = _time(lambda: sampen_reference(x, .5), repeat=1)
+    _report('SampleEntropy (%d IBIs)' % n, t_new, t_ref)
+
+
+def bench_dfa(n=1000):
+    from .test_dfa import dfa_reference
+    np.random.seed(0)
+    x = 0.8 + 0.05 * np.random.randn(n)
+    s = ph.EvenlySignal(x, 4)
+    t_new = _time(lambda: ph.DFA().run(s, ph.DFA().get(), use_cache=False))
+    t_ref = _time(lambda: dfa_reference(x, np.arange(4, 65, 4)), repeat=1)
+    _report('DFA (%d IBIs, 4..64)' % n, t_new, t_ref)
+
+
+def bench_hrv_td(hours=24):
+    np.random.seed(0)
+    n = int(hours * 3600 * 4)
+    s = ph.EvenlySignal(0.8 + 0.03 * np.random.randn(n), sampling_freq=4, signal_type='IBI')
+    segmenter = ph.FixedSegments(step=30, width=30)
+    t_ref = _time(lambda: ph.fmap(segmenter(s), ph.preset_hrv_td()), repeat=1)
+    t_new = _time(lambda: ph.fmap(segmenter(s), ph.preset_hrv_td(fused=True)), repeat=1)
+    _report('preset_hrv_td fused (%dh, 30s)' % hours, t_new, t_ref)
+    t_new = _time(lambda: ph.fmap(segmenter(s), ph.preset_hrv_td(fused=True), batch=True), repeat=1)
+    _report('preset_hrv_td fused batch (%dh, 30s)' % hours, t_new, t_ref)
+
+
+def bench_beat_outliers(n=100000):
+    from .test_beat_outliers import beat_outliers_reference, _ibi_signal
+    np.random.seed(0)
+    s = _ibi_signal(n)
+    t_new = _time(lambda: ph.BeatOutliers().run(s, ph.BeatOutliers().get(), use_cache=False))
+    t_ref = _time(lambda: beat_outliers_reference(s.get_values(), float(np.median(s)), 3, 0.25), repeat=1)
+    _report('BeatOutliers (%d beats)' % n, t_new, t_ref)
+    signals = [_ibi_signal(n // 100) for _ in range(100)]
+    t_new = _time(lambda: ph.BeatOutliers().batch(signals))
+    t_ref = _time(lambda: [ph.BeatOutliers().run(x, ph.BeatOutliers().get(), use_cache=False) for x in signals])
+    _report('BeatOutliers batch (100 x %d beats)' % (n // 100), t_new, t_ref)
+
+
+BENCHMARKS = [bench_peak_detection, bench_fmap_batch, bench_kalman, bench_rolling, bench_convolution, bench_streaming,
+              bench_streaming_beats, bench_entropy, bench_dfa, bench_hrv_td, bench_beat_outliers]
+
+
+def main():
+    print("%-40s %11s %11s %9s" % ("benchmark", "new", "reference", "speedup"))
+    for b in BENCHMARKS:
+        b()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+# coding=utf-8
+from __future__ import division
+
+import itertools
+from . import ph, np
+from pyphysio.tools.Tools import _beats_dp
+
+__author__ = 'aleb'
+
+
+def second_diff_cost(idx):
+    return np.sum(np.abs(np.diff(np.diff(idx))))
+
+
+def test_beats_dp():
+    # same cost of the exhaustive search on all the combinations
+    np.random.seed(1234)
+    for n in [3, 5, 8, 12]:
+        for _ in range(20):
+            beats = np.cumsum(np.random.randint(60, 100, n))
+            pairs = np.column_stack([beats, beats + np.random.randint(-20, 21, n) * (np.random.rand(n) < .5)])
+            best = np.inf
+            for choice in itertools.product([0, 1], repeat=n):
+                candidate = pairs[np.arange(n), choice]
+                if np.all(np.diff(candidate) > 0):
+                    best = min(best, second_diff_cost(candidate))
+            idx = _beats_dp(pairs)
+            assert np.all(np.diff(idx) > 0)
+            assert second_diff_cost(idx) == best
+
+
+def test_beat_optimizer():
+    np.random.seed(3)
+    fsamp = 100
+    idx_true = np.r_[0, np.cumsum(np.round((0.8 + 0.02 * np.random.randn(200)) * fsamp))].astype(int) + 50
+    # two missed and two spurious beats
+    idx = np.sort(np.r_[np.delete(idx_true, [40, 120]), idx_true[80] + 30, idx_true[150] + 25])
+    ibi = ph.UnevenlySignal(np.r_[0.8, np.diff(idx) / fsamp], sampling_freq=fsamp, signal_type='IBI', x_values=idx,
+                            x_type='indices')
+
+    ibi_opt = ph.BeatOptimizer()(ibi)
+    np.testing.assert_array_equal(ibi_opt.get_indices(), np.delete(idx_true, [40, 120]))
+    np.testing.assert_allclose(ibi_opt.get_values()[1:], np.diff(ibi_opt.get_indices()) / fsamp)
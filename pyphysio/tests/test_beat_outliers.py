@@ -0,0 +1,78 @@
+# coding=utf-8
+from __future__ import division
+
+from . import ph, np
+from pyphysio.tools.Tools import _beat_outliers, _RunningMedian
+
+__author__ = 'aleb'
+
+
+def beat_outliers_reference(ibi, ibi_expected, cache, sensitivity):
+    # median of the cache array at each beat
+    id_bad_ibi = []
+    ibi_cache = np.repeat(ibi_expected, cache)
+    counter_bad = 0
+    for i in range(1, len(ibi)):
+        curr_median = np.median(ibi_cache)
+        curr_ibi = ibi[i]
+        if curr_ibi > curr_median * (1 + sensitivity) or curr_ibi < curr_median * (1 - sensitivity):
+            id_bad_ibi.append(i)
+            counter_bad += 1
+        else:
+            ibi_cache = np.r_[ibi_cache[1:], curr_ibi]
+            counter_bad = 0
+        if counter_bad == cache:
+            ibi_cache = np.repeat(ibi_expected, cache)
+            counter_bad = 0
+    return id_bad_ibi
+
+
+def _ibi_signal(n, fsamp=100):
+    ibi = np.round(0.8 + 0.03 * np.random.randn(n), 2)
+    # missed and spurious beats, runs of outliers (cache resets)
+    ibi[np.random.rand(n) < 0.05] *= 2
+    ibi[np.random.rand(n) < 0.05] /= 2
+    ibi[n // 2: n // 2 + 5] = 1.5
+    idx = np.cumsum(np.round(ibi * fsamp)).astype(int)
+    return ph.UnevenlySignal(ibi, sampling_freq=fsamp, signal_type='IBI', x_values=idx, x_type='indices')
+
+
+def test_running_median():
+    # duplicates and NaNs, odd and even sizes
+    np.random.seed(0)
+    for size in [1, 2, 3, 4, 7, 10]:
+        values = np.random.randint(0, 6, 500).astype(float)
+        values[np.random.rand(500) < .05] = np.nan
+        median = _RunningMedian(size, 2.)
+        window = [2.] * size
+        for v in values:
+            median.push(v)
+            window = window[1:] + [v]
+            np.testing.assert_equal(median.median(), np.median(window))
+        median.reset(3.)
+        assert median.median() == 3
+
+
+def test_beat_outliers():
+    np.random.seed(1234)
+    for cache in [1, 2, 3, 4, 7]:
+        for ibi_median in [0, 0.8]:
+            s = _ibi_signal(500)
+            ibi_expected = ibi_median if ibi_median > 0 else float(np.median(s))
+            id_bad = ph.BeatOutliers(ibi_median=ibi_median, cache=cache)(s)
+            assert id_bad == beat_outliers_reference(s.get_values(), ibi_expected, cache, 0.25)
+
+    ibi = np.round(0.8 + 0.03 * np.random.randn(100), 2)
+    ibi[[10, 50, 51]] = np.nan
+    for cache in [2, 3]:
+        assert _beat_outliers(ibi, 0.8, cache, 0.25) == beat_outliers_reference(ibi, 0.8, cache, 0.25)
+
+
+def test_beat_outliers_batch():
+    np.random.seed(4321)
+    signals = [_ibi_signal(n) for n in [300, 1, 50, 1000]]
+    for alg in [ph.BeatOutliers(), ph.BeatOutliers(ibi_median=0.8, cache=4, sensitivity=0.3)]:
+        assert alg.batch(signals) == [alg(s) for s in signals]
+        for fixed, s in zip(alg.batch(signals, fix=True), signals):
+            np.testing.assert_array_equal(fixed.get_indices(), ph.FixIBI(alg(s))(s).get_indices())
+    assert ph.BeatOutliers().batch([]) == []
@@ -0,0 +1,180 @@
+# coding=utf-8
+from __future__ import division
+
+import multiprocessing
+
+from . import ph, np
+
+__author__ = 'aleb'
+
+
+class Counting(ph.Mean):
+    calls = 0
+
+    @classmethod
+    def algorithm(cls, data, params):
+        Counting.calls += 1
+        return ph.Mean.algorithm(data, params)
+
+
+def test_cache_content_key():
+    ph.Cache.clear()
+    Counting.calls = 0
+    x = np.random.rand(1000)
+    s1 = ph.EvenlySignal(x, sampling_freq=10)
+    s2 = ph.EvenlySignal(x.copy(), sampling_freq=10)
+
+    assert Counting.run(s1, {}, use_cache=True) == np.mean(x)
+    assert Counting.run(s2, {}, use_cache=True) == np.mean(x)
+    assert Counting.calls == 1
+
+    # different metadata or content
+    Counting.run(ph.EvenlySignal(x, sampling_freq=20), {}, use_cache=True)
+    s2[3] += 1
+    assert Counting.run(s2, {}, use_cache=True) == np.mean(s2)
+    assert Counting.calls == 3
+
+
+def test_cache_array_params():
+    # arrays that share the truncated repr get different keys
+    a = np.zeros(10000)
+    b = a.copy()
+    b[5000] = 1
+    assert str(a) == str(b)
+    assert ph.PeakDetection.cache_key({'delta': a}) != ph.PeakDetection.cache_key({'delta': b})
+    assert ph.PeakDetection.cache_key({'delta': a}) == ph.PeakDetection.cache_key({'delta': a.copy()})
+
+
+def test_cache_identity_params():
+    # objects without a content representation: not cached, their id could be reused after they are collected
+    assert ph.Mean.cache_key({'f': lambda x: x}) is None
+    ph.Cache.clear()
+    Counting.calls = 0
+    s = ph.EvenlySignal(np.random.rand(100), sampling_freq=10)
+    for i in range(3):
+        Counting.run(s, {'f': object()}, use_cache=True)
+    assert Counting.calls == 3
+    assert ph.Cache.info()['entries'] == 0
+    with ph.Dedup():
+        Counting.run(s, {'f': object()})
+        Counting.run(s, {'f': object()})
+    assert Counting.calls == 5
+
+
+def test_cache_budget():
+    ph.Cache.clear()
+    ph.Cache.set_max_bytes(50000)
+    try:
+        signals = [ph.EvenlySignal(np.random.rand(1000), sampling_freq=10) for i in range(20)]
+        for s in signals:
+            ph.Diff.run(s, {'degree': 1}, use_cache=True)
+        info = ph.Cache.info()
+        assert 0 < info['entries'] < 20
+        assert info['bytes'] <= 50000
+
+        # least recently used are evicted first
+        Counting.calls = 0
+        Counting.run(signals[-1], {}, use_cache=True)
+        ph.Diff.run(signals[-1], {'degree': 1}, use_cache=True)
+        assert Counting.calls == 1
+    finally:
+        ph.Cache.set_max_bytes(256 * 1024 * 1024)
+        ph.Cache.clear()
+
+
+def test_cache_global():
+    ph.Cache.clear()
+    Counting.calls = 0
+    s = ph.EvenlySignal(np.random.rand(100), sampling_freq=10)
+    ph.Cache.enable()
+    try:
+        Counting()(s)
+        Counting()(s)
+        Counting.run(s, {}, use_cache=False)
+    finally:
+        ph.Cache.disable()
+    Counting()(s)
+    assert Counting.calls == 3
+    ph.Cache.clear()
+
+
+def test_disk_cache(tmpdir):
+    path = str(tmpdir.join('cache'))
+    eda = ph.EvenlySignal(np.cumsum(np.random.rand(2000) - .5) + 10, sampling_freq=8, signal_type='EDA')
+    ph.Cache.clear()
+    ph.DiskCache.enable(path)
+    try:
+        driver = ph.DriverEstim()(eda)
+        assert len(tmpdir.join('cache').listdir()) == 1
+
+        # a new process would start with an empty memory cache
+        ph.Cache.clear()
+        driver_disk = ph.DriverEstim()(eda)
+        np.testing.assert_array_equal(driver, driver_disk)
+        assert isinstance(driver_disk, ph.EvenlySignal)
+        assert driver_disk.get_sampling_freq() == 8
+        assert driver_disk.get_signal_type() == driver.get_signal_type()
+
+        # not persistent
+        ph.Cache.clear()
+        ph.Mean()(eda)
+        assert len(tmpdir.join('cache').listdir()) == 1
+
+        # the directory is not scanned by each store within the budget
+        scans = []
+        entries = ph.DiskCache._entries
+        ph.DiskCache._entries = staticmethod(lambda: scans.append(1) or entries())
+        try:
+            for t1 in [.5, .6, .7]:
+                ph.DriverEstim(t1=t1)(eda)
+        finally:
+            ph.DiskCache._entries = staticmethod(entries)
+        assert len(scans) == 0
+        assert len(tmpdir.join('cache').listdir()) == 4
+
+        # budget
+        ph.DiskCache.enable(path, max_bytes=0)
+        ph.DriverEstim(t1=.5)(eda)
+        assert len(tmpdir.join('cache').listdir()) == 0
+    finally:
+        ph.DiskCache.disable()
+        ph.DiskCache._max_bytes = 1024 * 1024 * 1024
+        ph.Cache.clear()
+
+
+def _disk_cache_worker(path, max_bytes):
+    ph.DiskCache.enable(path, max_bytes)
+    for r in range(2):
+        for i in range(10):
+            ph.DiskCache.store(('data%d' % i, 'params'), np.arange(1000) * i, [])
+
+
+def test_disk_cache_processes(tmpdir):
+    path = str(tmpdir.join('cache'))
+    size = 1000 * np.arange(1).itemsize
+    try:
+        for max_bytes in [1024 * 1024 * 1024, 5 * size]:
+            workers = [multiprocessing.Process(target=_disk_cache_worker, args=(path, max_bytes)) for w in range(2)]
+            for w in workers:
+                w.start()
+            for w in workers:
+                w.join()
+                assert w.exitcode == 0
+
+            ph.DiskCache.enable(path, max_bytes)
+            names = tmpdir.join('cache').listdir()
+            assert not [n for n in names if n.ext == '.tmp']
+            if max_bytes > 10 * size:
+                assert len(names) == 10
+            else:
+                # enabling scans the directory and enforces the budget
+                assert 0 < len(names) < 10
+                assert sum(n.size() for n in names) <= max_bytes
+            for n in names:
+                i = int(n.purebasename.split('-')[0][4:])
+                val, log = ph.DiskCache.load(('data%d' % i, 'params'))
+                np.testing.assert_array_equal(val, np.arange(1000) * i)
+            ph.DiskCache.clear()
+    finally:
+        ph.DiskCache.disable()
+        ph.DiskCache._max_bytes = 1024 * 1024 * 1024
@@ -0,0 +1,92 @@
+# coding=utf-8
+from __future__ import division
+
+from . import ph, np
+from scipy.signal import gaussian, firwin
+from pyphysio.tools.Convolution import convolve, choose_method
+from pyphysio.filters.Filters import _irf, _fir_taps
+
+__author__ = 'aleb'
+
+
+def test_convolve_methods():
+    np.random.seed(1234)
+    for n, m in [(1000, 8), (5000, 501), (20000, 64), (100, 300), (30, 30)]:
+        x = np.random.randn(n)
+        k = np.random.randn(m)
+        for mode in ['full', 'same', 'valid']:
+            ref = np.convolve(x, k, mode)
+            for method in ['auto', 'direct', 'fft', 'oa']:
+                out = convolve(x, k, mode, method)
+                assert out.shape == ref.shape
+                np.testing.assert_allclose(out, ref, rtol=1e-8, atol=1e-10 * np.max(np.abs(ref)))
+
+        # channels along axis 1
+        x2 = np.random.randn(n, 3)
+        for method in ['direct', 'fft', 'oa']:
+            out = convolve(x2, k, 'same', method)
+            ref = np.stack([np.convolve(x2[:, i], k, 'same') for i in range(3)], axis=1) if n >= m else None
+            if ref is not None:
+                np.testing.assert_allclose(out, ref, rtol=1e-8, atol=1e-10 * np.max(np.abs(ref)))
+
+    # non finite values only on the support of the kernel, as numpy.convolve
+    x = np.random.randn(200000)
+    x[[1000, 150000]] = np.nan
+    k = np.random.rand(2000)
+    assert choose_method(len(x), len(k)) != 'direct'
+    for mode in ['full', 'same', 'valid']:
+        ref = np.convolve(x, k, mode)
+        out = convolve(x, k, mode)
+        np.testing.assert_array_equal(np.isnan(out), np.isnan(ref))
+        np.testing.assert_allclose(out, ref, rtol=1e-8)
+    s = ph.EvenlySignal(x, sampling_freq=1000)
+    out = ph.ConvolutionalFilter(irftype='gauss', win_len=2)(s)
+    ref = np.convolve(np.r_[np.ones(2000) * x[0], x, np.ones(2000) * x[-1]], _irf('gauss', 2000, True), 'same')
+    np.testing.assert_array_equal(np.isnan(out.get_values()), np.isnan(ref[2000:-2000]))
+
+    assert choose_method(1000, 8) == 'direct'
+    assert choose_method(10 ** 6, 2048) in ['fft', 'oa']
+
+
+def test_convolutional_filter():
+    np.random.seed(1234)
+    s = ph.EvenlySignal(np.cumsum(np.random.randn(20000)), sampling_freq=100)
+    for irftype, win_len in [('gauss', 2), ('rect', 0.5), ('triang', 3), ('triang', 0.31), ('dgauss', 1)]:
+        n = int(win_len * 100)
+        if irftype == 'gauss':
+            irf = gaussian(n, np.floor(n / 8))
+        elif irftype == 'dgauss':
+            irf = np.diff(gaussian(n, np.round(n / 8)))
+        elif irftype == 'rect':
+            irf = np.ones(n)
+        else:
+            irf = np.r_[np.arange(n // 2), n // 2 - 1 - np.arange(n // 2)] if n % 2 == 0 else \
+                np.r_[np.arange(n // 2), n // 2, n // 2 - 1 - np.arange(n // 2)]
+        irf = irf / np.sum(irf)
+        padded = np.r_[np.ones(n) * s[0], s, np.ones(n) * s[-1]]
+        ref = np.convolve(padded, irf, mode='same')[n:-n]
+
+        out = ph.ConvolutionalFilter(irftype=irftype, win_len=win_len)(s)
+        np.testing.assert_allclose(out.get_values(), ref, rtol=1e-8, atol=1e-10 * np.max(np.abs(ref)))
+
+    # cached and read-only kernels
+    assert _irf('gauss', 200, True) is _irf('gauss', 200, True)
+    assert not _irf('gauss', 200, True).flags.writeable
+
+
+def test_fir_filter():
+    np.random.seed(1234)
+    s = ph.EvenlySignal(np.random.randn(20000), sampling_freq=100)
+    # same design as FIRFilter with the default loss and attenuation
+    d1, d2 = 10 ** (0.1 / 10), 10 ** (-40 / 10)
+    dsamp = 10 / 100
+    n = int(2 / 3 * np.log10(1 / (10 * d1 * d2)) * 100 / dsamp)
+    n += 1 if n % 2 == 0 else 0
+    b = firwin(n, 10 / 50, width=dsamp, window='hamming')
+    ref = np.convolve(s.get_values(), b, 'same')
+
+    hits = _fir_taps.cache_info().hits
+    for i in range(2):
+        out = ph.FIRFilter(fp=10, fs=20)(s)
+        np.testing.assert_allclose(out.get_values(), ref, rtol=1e-8, atol=1e-10 * np.max(np.abs(ref)))
+    assert _fir_taps.cache_info().hits > hits
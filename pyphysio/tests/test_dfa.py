@@ -0,0 +1,40 @@
+# coding=utf-8
+from __future__ import division
+
+from . import ph, np
+
+__author__ = 'aleb'
+
+
+def dfa_reference(x, l):
+    # box by box least squares
+    y = np.cumsum(x).astype(float)
+    y -= np.mean(x)
+    f = np.zeros(len(l))
+    for i in range(0, len(l)):
+        n = int(l[i])
+        for j in range(0, len(x), n):
+            if j + n < len(x):
+                c = np.vstack([range(j, j + n), np.ones(n)]).T
+                f[i] += np.linalg.lstsq(c, y[j:j + n], rcond=-1)[1]
+        f[i] /= ((len(x) / n) * n)
+    f = np.sqrt(f)
+    return f, np.linalg.lstsq(np.vstack([np.log(l), np.ones(len(l))]).T, np.log(f), rcond=-1)[0][0]
+
+
+def test_dfa():
+    np.random.seed(4321)
+    for n in [64, 100, 257, 1000]:
+        x = 0.8 + np.cumsum(np.random.randn(n)) * 0.005 + 0.03 * np.random.randn(n)
+        s = ph.UnevenlySignal(x, sampling_freq=10, x_values=np.cumsum(x), x_type='instants', signal_type='IBI')
+
+        l = np.arange(4, 65, 4)
+        f_ref, alpha_ref = dfa_reference(x, l)
+        np.testing.assert_allclose(ph.DFA(fluctuation=True)(s), f_ref, rtol=1e-9)
+        np.testing.assert_allclose(ph.DFA()(s), alpha_ref, rtol=1e-9)
+        np.testing.assert_allclose(ph.DFAShortTerm()(s), dfa_reference(x, np.arange(4, 17, 4))[1], rtol=1e-9)
+        np.testing.assert_allclose(ph.DFALongTerm()(s), dfa_reference(x, np.arange(16, 65, 4))[1], rtol=1e-9)
+
+    assert np.isnan(ph.DFALongTerm()(ph.EvenlySignal(np.random.randn(63), 10)))
+    assert np.isnan(ph.DFA(box_max=16)(ph.EvenlySignal(np.random.randn(15), 10)))
+    assert np.isnan(ph.DFA(box_max=16, fluctuation=True)(ph.EvenlySignal(np.random.randn(15), 10))).all()
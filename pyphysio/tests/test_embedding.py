@@ -0,0 +1,35 @@
+# coding=utf-8
+from __future__ import division
+
+from . import ph, np
+from pyphysio.tools.Tools import embed
+from pyphysio.tools.Rolling import _strided_window_view
+
+__author__ = 'aleb'
+
+
+def test_embed():
+    np.random.seed(1234)
+    x = np.random.randn(100)
+    for dimension in [1, 2, 3, 7]:
+        for delay in [1, 2, 5]:
+            emb = embed(x, dimension, delay)
+            num = len(x) - (dimension - 1) * delay
+            emb_ref = np.array([x[i:i + (dimension - 1) * delay + 1:delay] for i in range(num)])
+            np.testing.assert_array_equal(emb, emb_ref)
+            assert not emb.flags.writeable
+            assert np.shares_memory(emb, x)
+
+    assert embed(x[:4], 3, 2).shape == (0, 3)
+
+    # the fallback for numpy < 1.20 is read-only too: the rows overlap
+    windows = _strided_window_view(x, 5)
+    np.testing.assert_array_equal(windows, np.lib.stride_tricks.sliding_window_view(x, 5))
+    assert not windows.flags.writeable
+
+    s = ph.EvenlySignal(x, sampling_freq=10)
+    np.testing.assert_array_equal(ph.Embedding(dimension=3, delay=2)(s), embed(x, 3, 2))
+
+    # Poincare' plot on the pairs of consecutive samples
+    np.testing.assert_allclose(ph.PoincareSD1()(s), np.std((x[:-1] - x[1:]) / np.sqrt(2)))
+    np.testing.assert_allclose(ph.PoincareSD2()(s), np.std((x[:-1] + x[1:]) / np.sqrt(2)))
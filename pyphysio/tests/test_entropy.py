@@ -0,0 +1,46 @@
+# coding=utf-8
+from __future__ import division
+
+from . import ph, np
+from scipy.spatial.distance import cdist
+
+__author__ = 'aleb'
+
+
+def _embed(x, m):
+    return np.array([x[i:i + m] for i in range(len(x) - m + 1)])
+
+
+def apen_reference(x, radius, m=2):
+    r = radius * np.std(x)
+    c = [np.sum(cdist(_embed(x, d), _embed(x, d), 'chebyshev') <= r, axis=1) / (len(x) - d + 1) for d in [m, m + 1]]
+    return np.sum(np.log(c[0])) / len(c[0]) - np.sum(np.log(c[1])) / len(c[1])
+
+
+def sampen_reference(x, radius, m=2):
+    r = radius * np.nanstd(x)
+    cm = []
+    for d in [m, m + 1]:
+        n = len(x) - d + 1
+        counts = np.sum(cdist(_embed(x, d), _embed(x, d), 'chebyshev') <= r, axis=1)
+        cm.append(np.sum((counts - 1) / (n - 1)) / n)
+    return np.log(cm[0] / cm[1])
+
+
+def test_entropies():
+    np.random.seed(1234)
+    for n in [4, 10, 301]:
+        # rounded values: ties at the radius
+        x = np.round(0.8 + np.cumsum(np.random.randn(n)) * 0.01 + 0.05 * np.random.randn(n), 2)
+        s = ph.UnevenlySignal(x, sampling_freq=10, x_values=np.cumsum(x), x_type='instants', signal_type='IBI')
+        for radius in [0.2, 0.5, 1.0]:
+            for m in [1, 2, 3]:
+                apen = ph.ApproxEntropy(radius=radius, dimension=m)(s)
+                sampen = ph.SampleEntropy(radius=radius, dimension=m)(s)
+                if n < m + 2:
+                    continue
+                np.testing.assert_array_equal(apen, apen_reference(x, radius, m))
+                np.testing.assert_array_equal(sampen, sampen_reference(x, radius, m))
+
+    assert np.isnan(ph.SampleEntropy()(ph.EvenlySignal(np.random.randn(3), 10)))
+    assert np.isnan(ph.ApproxEntropy(dimension=5)(ph.EvenlySignal(np.random.randn(5), 10)))
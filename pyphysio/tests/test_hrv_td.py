@@ -0,0 +1,35 @@
+# coding=utf-8
+from __future__ import division
+
+from . import ph, np
+
+__author__ = 'aleb'
+
+
+def test_hrv_td_fused():
+    np.random.seed(1234)
+    ibi = 0.8 + np.cumsum(np.random.randn(2000)) * 0.002 + 0.03 * np.random.randn(2000)
+    s = ph.EvenlySignal(ibi, sampling_freq=4, signal_type='IBI')
+
+    # windows shorter than the DFA short term and long term boxes
+    for width in [3, 10, 30]:
+        segmenter = ph.FixedSegments(step=width / 2, width=width)
+        values, col_names = ph.fmap(segmenter(s), ph.preset_hrv_td())
+        values_fused, col_names_fused = ph.fmap(segmenter(s), ph.preset_hrv_td(fused=True))
+        np.testing.assert_array_equal(col_names_fused, col_names)
+        np.testing.assert_array_equal(values_fused[:, :3], values[:, :3])
+        np.testing.assert_allclose(values_fused[:, 3:].astype(float), values[:, 3:].astype(float), rtol=1e-12)
+
+        values_batch, col_names_batch = ph.fmap(segmenter(s), ph.preset_hrv_td(fused=True), batch=True)
+        np.testing.assert_array_equal(col_names_batch, col_names)
+        np.testing.assert_allclose(values_batch[:, 3:].astype(float), values[:, 3:].astype(float), rtol=1e-12)
+
+    hrv = ph.HRVTimeDomain()
+    assert hrv.get_output_names()[0] == 'RMSSD'
+    assert len(hrv(s)) == len(hrv.get_output_names())
+    assert ph.Mean().get_output_names() is None
+
+    # mixed with single output algorithms
+    values, col_names = ph.fmap(ph.FixedSegments(step=10, width=20)(s), [ph.Mean(name='m'), hrv, ph.Max(name='M')])
+    assert list(col_names) == ['begin', 'end', 'label', 'm'] + hrv.get_output_names() + ['M']
+    assert values.shape[1] == len(col_names)
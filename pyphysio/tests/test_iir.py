@@ -0,0 +1,34 @@
+# coding=utf-8
+from __future__ import division
+
+from . import ph, np
+from scipy.signal import iirdesign, filtfilt
+from pyphysio.filters.Filters import _iir_sos
+
+__author__ = 'aleb'
+
+
+def test_iir_sos():
+    np.random.seed(1234)
+    fsamp = 100
+    s = ph.EvenlySignal(np.cumsum(np.random.randn(20000)), sampling_freq=fsamp)
+
+    # same response of the 'ba' form, far from the edges (different padding)
+    for fp, fs, ftype in [(5, 10, 'butter'), (2, 1, 'cheby2'), ([5, 20], [2, 30], 'cheby1')]:
+        out = ph.IIRFilter(fp=fp, fs=fs, ftype=ftype)(s)
+        b, a = iirdesign(np.array(fp) / 50, np.array(fs) / 50, 0.1, 40, ftype=ftype)
+        ref = filtfilt(b, a, s.get_values())
+        np.testing.assert_allclose(out.get_values()[2000:-2000], ref[2000:-2000], rtol=1e-6,
+                                   atol=1e-6 * np.max(np.abs(ref)))
+
+    # narrow band: unstable or inaccurate in 'ba' form
+    out = ph.IIRFilter(fp=[0.1, 0.2], fs=[0.05, 0.3], att=80, ftype='ellip')(s)
+    assert np.all(np.isfinite(out.get_values()))
+    assert not np.allclose(out.get_values(), s.get_values())
+
+    # cached designs
+    hits = _iir_sos.cache_info().hits
+    ph.IIRFilter(fp=5, fs=10)(s)
+    ph.IIRFilter(fp=5., fs=10.)(s)
+    assert _iir_sos.cache_info().hits >= hits + 2
+    assert not _iir_sos(100., 5., 10., 0.1, 40, 'butter').flags.writeable
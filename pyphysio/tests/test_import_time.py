@@ -0,0 +1,71 @@
+# coding=utf-8
+from __future__ import division
+
+import os
+import subprocess
+import sys
+
+__author__ = 'aleb'
+
+# Seconds spent importing pyphysio on top of numpy, override with the environment variable PYPHYSIO_IMPORT_BUDGET.
+# 'import pyphysio' takes a few ms more than numpy, loading pyplot or scipy.signal eagerly takes > 0.1 s
+IMPORT_BUDGET = float(os.environ.get('PYPHYSIO_IMPORT_BUDGET', 0.1))
+
+_TIME_SCRIPT = """
+from timeit import default_timer as timer
+t0 = timer()
+import %s
+print('time:%%f' %% (timer() - t0))
+"""
+
+_SCRIPT = """
+import sys
+import pyphysio
+heavy = [m for m in ['matplotlib', 'scipy.signal', 'scipy.stats', 'scipy.interpolate', 'scipy.optimize',
+                     'pyphysio.interactive'] if m in sys.modules]
+print('heavy:' + ','.join(heavy))
+"""
+
+
+def _run(script):
+    # in a new interpreter: nothing imported before
+    path = os.path.join(os.path.dirname(__file__), '..', '..')
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([path, os.environ.get('PYTHONPATH', '')]))
+    return subprocess.check_output([sys.executable, '-c', script], env=env, universal_newlines=True)
+
+
+def _import_time(module, n=5):
+    # best of n to reduce the noise of cold caches and of the other processes
+    times = []
+    for i in range(n):
+        out = _run(_TIME_SCRIPT % module)
+        times.append(float([line[len('time:'):] for line in out.split('\n') if line.startswith('time:')][0]))
+    return min(times)
+
+
+def test_import_time():
+    t = _import_time('pyphysio') - _import_time('numpy')
+    assert t < IMPORT_BUDGET, "import pyphysio took %.3fs on top of numpy (budget %.3fs)" % (t, IMPORT_BUDGET)
+
+
+def test_import_heavy_modules():
+    out = _run(_SCRIPT)
+    heavy = [line[len('heavy:'):] for line in out.split('\n') if line.startswith('heavy:')][0]
+    heavy = [m for m in heavy.split(',') if m != '']
+    assert heavy == [], "Modules loaded by 'import pyphysio': %s" % heavy
+
+
+def test_lazy_names():
+    import pyphysio as ph
+    assert ph.Mean.__module__ == 'pyphysio.indicators.TimeDomain'
+    assert ph.PSD.__module__ == 'pyphysio.tools.Tools'
+    assert ph.Segment.__module__ == 'pyphysio.BaseSegmentation'
+    assert ph.Filters.__name__ == 'pyphysio.filters.Filters'
+    assert 'FixedSegments' in dir(ph)
+    # only the algorithm classes, not the helpers of their modules
+    assert not hasattr(ph, 'replay')
+    try:
+        ph.NotAnAlgorithm
+        assert False
+    except AttributeError:
+        pass
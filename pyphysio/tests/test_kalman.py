@@ -0,0 +1,64 @@
+# coding=utf-8
+from __future__ import division
+
+from . import ph, np
+
+__author__ = 'aleb'
+
+
+def signal_range_reference(signal, win_len, win_step, smooth=True):
+    fsamp = signal.get_sampling_freq()
+    idx_len = int(win_len * fsamp)
+    idx_step = int(win_step * fsamp)
+    windows = np.arange(0, len(signal) - idx_len + 1, idx_step)
+    deltas = np.zeros(len(signal))
+    curr_delta = 0
+    for start in windows:
+        portion_curr = signal[start: start + idx_len]
+        curr_delta = np.max(portion_curr) - np.min(portion_curr)
+        deltas[start:start + idx_len] = curr_delta
+    deltas[windows[-1] + idx_len:] = curr_delta
+    if smooth:
+        win_len = int(win_len * 2 * fsamp)
+        deltas = np.convolve(deltas, np.ones(win_len) / win_len, mode='same')
+    return deltas
+
+
+def kalman_reference(signal, R, ratio, win_len=1, win_step=0.5):
+    # per-sample update
+    Q = np.nanmedian(signal_range_reference(signal, win_len, win_step)) / ratio
+    P = 1
+    x_out = signal.get_values().copy()
+    for k in range(1, len(signal)):
+        x_ = x_out[k - 1]
+        P_ = P + Q
+        K = P_ / (P_ + R)
+        x_out[k] = x_ + K * (x_out[k] - x_)
+        P = (1 - K) * P_
+    return x_out
+
+
+def test_signal_range():
+    np.random.seed(1234)
+    for n in [301, 5003]:
+        s = ph.EvenlySignal(np.cumsum(np.random.randn(n)), sampling_freq=100)
+        for win_len, win_step in [(1, 0.5), (0.3, 0.7), (2, 2), (0.5, 0.13)]:
+            for smooth in [True, False]:
+                np.testing.assert_allclose(ph.SignalRange(win_len, win_step, smooth)(s),
+                                           signal_range_reference(s, win_len, win_step, smooth),
+                                           rtol=1e-10, atol=1e-12)
+
+
+def test_kalman_steady_state():
+    np.random.seed(1234)
+    x = np.sin(np.arange(20000) / 50.) + 0.3 * np.random.randn(20000)
+    s = ph.EvenlySignal(x, sampling_freq=100)
+    for R, ratio in [(1, 2), (100, 10), (0.01, 1.5), (1000, 1000)]:
+        out = ph.KalmanFilter(R=R, ratio=ratio)(s)
+        assert isinstance(out, ph.EvenlySignal)
+        np.testing.assert_allclose(out.get_values(), kalman_reference(s, R, ratio), rtol=1e-10, atol=1e-12)
+
+    # NaNs propagate as in the per-sample update
+    x[5000] = np.nan
+    s = ph.EvenlySignal(x, sampling_freq=100)
+    np.testing.assert_allclose(ph.KalmanFilter(R=1, ratio=2)(s).get_values(), kalman_reference(s, 1, 2))
@@ -0,0 +1,73 @@
+# coding=utf-8
+from __future__ import division
+
+from . import ph, np
+from pytest import raises
+
+__author__ = 'aleb'
+
+
+def _is_memmap_view(a):
+    while a is not None:
+        if isinstance(a, np.memmap):
+            return True
+        a = a.base
+    return False
+
+
+def test_memmap_evenly(tmpdir):
+    path = str(tmpdir.join('signal.dat'))
+    s = ph.EvenlySignal(np.random.rand(10000).astype('>f4'), sampling_freq=100, start_time=10, signal_type='EDA')
+    s.to_memmap(path, chunk_size=999)
+
+    m = ph.from_memmap(path)
+    assert isinstance(m, ph.EvenlySignal)
+    assert isinstance(m.base, np.memmap)
+    np.testing.assert_array_equal(m, s)
+    assert m.get_sampling_freq() == 100
+    assert m.get_start_time() == 10
+    assert m.get_signal_type() == 'EDA'
+
+    seg = m.segment_time(20, 30)
+    assert np.shares_memory(seg, m)
+    np.testing.assert_array_equal(seg, s.segment_time(20, 30))
+    assert seg.get_start_time() == 20
+
+    assert ph.Mean()(seg) == ph.Mean()(s.segment_time(20, 30))
+
+    # read only
+    with raises(ValueError):
+        m[0] = 5
+
+    # copy-on-write: the file is not changed
+    c = ph.from_memmap(path, mode='c')
+    c[0] = 5
+    assert ph.from_memmap(path)[0] == s[0]
+
+    # results go to another file
+    path_out = str(tmpdir.join('out.dat'))
+    c.to_memmap(path_out)
+    assert ph.from_memmap(path_out)[0] == 5
+
+
+def test_memmap_multi(tmpdir):
+    path = str(tmpdir.join('multi.dat'))
+    s = ph.MultiEvenly(np.random.rand(1000, 3), sampling_freq=10)
+    s.to_memmap(path)
+    m = ph.from_memmap(path)
+    assert isinstance(m, ph.MultiEvenly)
+    assert m.get_nchannels() == 3
+    np.testing.assert_array_equal(m, s)
+
+    seg = m.segment_time(10, 20)
+    assert isinstance(seg, ph.MultiEvenly)
+    assert np.shares_memory(seg, m)
+    assert _is_memmap_view(seg)
+    np.testing.assert_array_equal(seg, s.get_values()[100:200])
+    assert seg.get_start_time() == 10
+    assert seg.get_sampling_freq() == 10
+    assert seg.get_nchannels() == 3
+
+    seg = m.segment_idx(500, 600)
+    np.testing.assert_array_equal(seg, s.get_values()[500:600])
+    assert seg.get_start_time() == 50
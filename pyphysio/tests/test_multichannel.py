@@ -0,0 +1,87 @@
+# coding=utf-8
+from __future__ import division
+
+from . import ph, np
+
+__author__ = 'aleb'
+
+
+def _multi_signal(n_ch=4, n=5000, fsamp=100):
+    np.random.seed(1234)
+    t = np.arange(n) / fsamp
+    values = np.stack([np.sin(2 * np.pi * (i + 1) * 0.3 * t) + 0.2 * np.random.randn(n) + i
+                       for i in range(n_ch)], axis=1)
+    return ph.MultiEvenly(values, sampling_freq=fsamp, signal_type='test')
+
+
+def _loop(alg, signal):
+    # reference: the per-channel loop of Algorithm.run_uncached
+    return [alg.algorithm(ph.EvenlySignal(signal.get_values()[:, i], signal.get_sampling_freq(),
+                                          signal.get_start_time()), alg.get())
+            for i in range(signal.get_nchannels())]
+
+
+def test_multichannel_filters():
+    s = _multi_signal()
+    for alg in [ph.IIRFilter(fp=2, fs=5), ph.IIRFilter(fp=[0.5, 5], fs=[0.1, 8], ftype='ellip'),
+                ph.ConvolutionalFilter(irftype='gauss', win_len=0.5),
+                ph.Normalize('standard'), ph.Normalize('maxmin'), ph.Normalize('mean')]:
+        assert alg._axis_aware
+        out = alg.run(s, alg.get(), use_cache=False)
+        assert isinstance(out, ph.MultiEvenly)
+        assert out.shape == s.shape
+        assert out.get_sampling_freq() == s.get_sampling_freq()
+        ref = np.stack([x.get_values() for x in _loop(alg, s)], axis=1)
+        np.testing.assert_allclose(out.get_values(), ref, rtol=1e-8, atol=1e-10)
+
+
+def test_multichannel_psd():
+    s = _multi_signal()
+    for method in ['welch', 'fft', 'ar']:
+        alg = ph.PSD(method=method, nfft=1024)
+        out = alg.run(s, alg.get(), use_cache=False)
+        ref = _loop(alg, s)
+        assert len(out) == len(ref) == s.get_nchannels()
+        for (f, p), (f_ref, p_ref) in zip(out, ref):
+            np.testing.assert_allclose(f, f_ref)
+            np.testing.assert_allclose(p, p_ref, rtol=1e-8, atol=1e-12 * np.max(p_ref))
+
+
+def _assert_same(out, ref):
+    assert len(out) == len(ref)
+    for x, x_ref in zip(out, ref):
+        for a, a_ref in zip(x, x_ref):
+            np.testing.assert_array_equal(a, a_ref)
+
+
+def test_executor():
+    s = _multi_signal(n_ch=6)
+    alg = ph.PeakDetection(delta=0.5)
+    ref = alg.run(s, alg.get(), use_cache=False, executor=False)
+    assert len(ref) == s.get_nchannels()
+
+    for backend in ['thread', 'process']:
+        # scope
+        with ph.Executor(n_jobs=3, backend=backend) as executor:
+            assert ph.Executor.current() is executor
+            _assert_same(alg.run(s, alg.get(), use_cache=False), ref)
+        assert ph.Executor.current() is None
+
+        # single call
+        executor = ph.Executor(n_jobs=2, backend=backend)
+        try:
+            _assert_same(alg.run(s, alg.get(), use_cache=False, executor=executor), ref)
+        finally:
+            executor.close()
+
+    # global, the output signals are stacked in the order of the channels
+    executor = ph.Executor(n_jobs=4)
+    ph.Executor.set_default(executor)
+    try:
+        out = ph.Diff(degree=1).run(s, {'degree': 1}, use_cache=False)
+    finally:
+        ph.Executor.set_default(None)
+        executor.close()
+    ref = ph.Diff(degree=1).run(s, {'degree': 1}, use_cache=False, executor=False)
+    assert isinstance(out, ph.MultiEvenly)
+    np.testing.assert_array_equal(out.get_values(), ref.get_values())
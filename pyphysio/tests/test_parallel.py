@@ -0,0 +1,125 @@
+# coding=utf-8
+from __future__ import division
+
+from . import ph, np
+
+__author__ = 'aleb'
+
+
+def test_fmap_parallel():
+    np.random.seed(1234)
+    s = ph.EvenlySignal(np.cumsum(np.random.rand(5000) - .5) * 100, sampling_freq=50)
+    algorithms = [ph.Mean(), ph.StDev(), ph.Median(), ph.PNNx(threshold=5)]
+    segmenter = ph.FixedSegments(step=2, width=5)
+
+    values, col_names = ph.fmap(segmenter(s), algorithms)
+    for backend in ['thread', 'process']:
+        for chunksize in [None, 1, 7]:
+            values_par, col_names_par = ph.fmap(segmenter(s), algorithms, n_jobs=3, backend=backend,
+                                                chunksize=chunksize)
+            np.testing.assert_array_equal(values, values_par)
+            np.testing.assert_array_equal(col_names, col_names_par)
+
+
+def test_fmap_parallel_alt_signal():
+    np.random.seed(1234)
+    s = ph.EvenlySignal(np.random.rand(1000), sampling_freq=10)
+    alt = ph.EvenlySignal(np.random.rand(1000), sampling_freq=10)
+    segments = [x for x in ph.FixedSegments(step=5, width=10)(s)]
+
+    values, col_names = ph.fmap(segments, [ph.Mean(), ph.Max()], alt)
+    values_par, col_names_par = ph.fmap(segments, [ph.Mean(), ph.Max()], alt, n_jobs=2, backend='process')
+    np.testing.assert_array_equal(values, values_par)
+    assert values[0, 3] == np.mean(alt[:100])
+
+
+class LaggedSegment(ph.Segment):
+    # custom segment: the data starts 'lag' seconds later
+    def __init__(self, begin, end, label=None, signal=None, lag=0):
+        ph.Segment.__init__(self, begin, end, label, signal)
+        self.lag = lag
+
+    def __call__(self, data=None):
+        if data is None:
+            data = self._signal
+        return data.segment_time(self.get_begin_time() + self.lag, self.get_end_time() + self.lag)
+
+
+def test_fmap_custom_segments():
+    np.random.seed(1234)
+    s = ph.EvenlySignal(np.random.rand(1000), sampling_freq=10)
+    segments = [LaggedSegment(b, b + 10, signal=s, lag=5) for b in range(0, 80, 5)]
+    expected = [np.mean(s.segment_time(b + 5, b + 15)) for b in range(0, 80, 5)]
+    for n_jobs, backend in [(1, 'thread'), (2, 'thread'), (2, 'process')]:
+        values, col_names = ph.fmap(segments, [ph.Mean()], n_jobs=n_jobs, backend=backend)
+        np.testing.assert_array_equal(values[:, 0], range(0, 80, 5))
+        np.testing.assert_allclose(values[:, 3].astype(float), expected)
+    assert segments[0]._signal is s
+
+
+def test_fmap_dedup():
+    np.random.seed(1234)
+    t = np.arange(0, 300, 1 / 16)
+    s = ph.EvenlySignal(np.sin(t) ** 4 + 0.01 * np.random.randn(len(t)) + 2, sampling_freq=16)
+    algorithms = ph.preset_phasic(delta=0.1) + [ph.RMSSD(), ph.SDSD(), ph.NNx(threshold=0.1)]
+    segmenter = ph.FixedSegments(step=10, width=20)
+
+    values, col_names = ph.fmap(segmenter(s), algorithms)
+    for n_jobs, backend in [(1, 'thread'), (2, 'thread'), (2, 'process')]:
+        values_dedup, col_names_dedup, report = ph.fmap(segmenter(s), algorithms, n_jobs=n_jobs, backend=backend,
+                                                        dedup=True, report=True)
+        np.testing.assert_array_equal(values, values_dedup)
+
+        n = len(values)
+        # PeaksMax, PeaksMin, PeaksMean, PeaksNum, DurationMean, SlopeMean
+        assert report['PeakDetection']['calls'] == 6 * n
+        assert report['PeakDetection']['reused'] == 5 * n
+        # DurationMean, SlopeMean
+        assert report['PeakSelection']['reused'] == n
+        # RMSSD, SDSD, NNx (and Slopes)
+        assert report['Diff']['calls'] >= 3 * n
+        assert report['Diff']['reused'] == report['Diff']['calls'] - n
+        assert report['Mean']['reused'] == 0
+
+
+def test_dedup_scope():
+    s = ph.EvenlySignal(np.random.rand(100), sampling_freq=10)
+    with ph.Dedup() as scope:
+        d1 = ph.Diff()(s)
+        d2 = ph.Diff()(s)
+        d3 = ph.Diff(degree=2)(s)
+        d4 = ph.Diff().run(s, {'degree': 1}, use_cache=False)
+    assert d1 is d2 and d1 is not d4
+    assert scope.get_report()['Diff'] == {'calls': 3, 'reused': 1, 'time_saved': scope.get_report()['Diff']['time_saved']}
+    assert ph.Dedup.current() is None
+    assert ph.Diff()(s) is not d1
+
+
+def test_fmap_batch():
+    np.random.seed(1234)
+    x = np.cumsum(np.random.rand(20000) - .5)
+    x[[100, 5000, 5001]] = np.nan
+    s = ph.EvenlySignal(x, sampling_freq=100, start_time=10)
+    algorithms = [ph.Mean(), ph.StDev(), ph.Min(), ph.Max(), ph.Range(), ph.Median(), ph.Sum(), ph.AUC(),
+                  ph.RMSSD()]
+
+    for segmenter in [ph.FixedSegments(step=2, width=5), ph.FixedSegments(step=0.3, width=1.1),
+                      ph.FixedSegments(step=3, width=2, drop_cut=False)]:
+        values, col_names = ph.fmap(segmenter(s), algorithms)
+        values_batch, col_names_batch = ph.fmap(segmenter(s), algorithms, batch=True)
+        assert values.shape == values_batch.shape
+        np.testing.assert_array_equal(values[:, :3], values_batch[:, :3])
+        # NaNs do not compare equal in object arrays
+        np.testing.assert_array_equal(values[:, 3:].astype(float), values_batch[:, 3:].astype(float))
+        np.testing.assert_array_equal(col_names, col_names_batch)
+
+
+def test_window_matrix():
+    from ..tools.Rolling import window_matrix
+    x = np.arange(100.)
+    for begins in [[0, 10, 20, 30], [5, 7, 50]]:
+        chunks = list(window_matrix(x, begins, 10))
+        windows = np.concatenate([w for rows, w in chunks])
+        np.testing.assert_array_equal(windows, [x[b:b + 10] for b in begins])
+    rows, windows = next(window_matrix(x, [0, 10, 20, 30], 10))
+    assert np.shares_memory(windows, x)
@@ -0,0 +1,56 @@
+# coding=utf-8
+from __future__ import division
+
+from . import ph, np, TestData
+
+__author__ = 'aleb'
+
+
+def assert_same_peaks(signal, **kwargs):
+    res_numpy = ph.PeakDetection(engine='numpy', **kwargs)(signal)
+    res_loop = ph.PeakDetection(engine='loop', **kwargs)(signal)
+    for x_numpy, x_loop in zip(res_numpy, res_loop):
+        assert x_numpy.dtype == x_loop.dtype
+        np.testing.assert_array_equal(x_numpy, x_loop)
+
+
+def test_peak_detection_engines_random():
+    rng = np.random.RandomState(1234)
+    for i in range(100):
+        n = rng.randint(1, 3000)
+        x = np.cumsum(rng.randn(n)) if i % 2 else rng.randn(n)
+        if i % 5 == 0:
+            x = np.round(x)  # equal samples
+        s = ph.EvenlySignal(x, sampling_freq=rng.choice([1, 10, 100]))
+
+        delta = rng.rand() + 0.01 if i % 3 else rng.rand(n) + 0.01
+        refractory = rng.choice([0, 0.05, 0.5, 2])
+
+        assert_same_peaks(s, delta=delta, refractory=refractory, start_max=True)
+        assert_same_peaks(s, delta=delta, refractory=refractory, start_max=False)
+
+
+def test_peak_detection_engines_bvp():
+    bvp = ph.EvenlySignal(TestData.bvp(), sampling_freq=2048)
+    delta = 0.5 * ph.SignalRange(win_len=1, win_step=0.5, smooth=True)(bvp)
+
+    assert_same_peaks(bvp, delta=delta)
+    assert_same_peaks(bvp, delta=0.5 * np.mean(delta), refractory=0.3)
+
+
+def test_peak_detection_engines_edge_cases():
+    s = ph.EvenlySignal([1.], sampling_freq=1)
+    assert_same_peaks(s, delta=0.1)
+
+    s = ph.EvenlySignal(np.ones(100), sampling_freq=1)
+    assert_same_peaks(s, delta=0.1)
+
+    # integer samples
+    s = ph.EvenlySignal(np.array([0, 3, 0, 3, 0, 5, 1, 5, 0]), sampling_freq=1)
+    assert_same_peaks(s, delta=1)
+
+    # NaNs are handled by the loop engine
+    x = np.sin(np.arange(500) / 10.)
+    x[[20, 250]] = np.nan
+    s = ph.EvenlySignal(x, sampling_freq=10)
+    assert_same_peaks(s, delta=0.5)
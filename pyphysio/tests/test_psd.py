@@ -0,0 +1,45 @@
+# coding=utf-8
+from __future__ import division
+
+from . import ph, np
+from scipy.linalg import solve_toeplitz
+from scipy.signal import freqz
+
+__author__ = 'aleb'
+
+
+def psd_ar_reference(x, fsamp, min_order=10, max_order=30, nfft=2048):
+    # Yule-Walker solved order by order on the direct autocorrelation
+    x = x - np.mean(x)
+    n = len(x)
+    r = np.correlate(x, x, 'full')[n - 1:n + max_order] / n
+
+    aics = []
+    for order in range(min_order, max_order + 1):
+        coefs = solve_toeplitz(r[:order], r[1:order + 1])
+        p_err = r[0] - np.dot(coefs, r[1:order + 1])
+        aics.append(n * np.log(p_err) + 2 * (order + 1))
+    best_order = min_order + int(np.argmin(aics))
+
+    coefs = solve_toeplitz(r[:best_order], r[1:best_order + 1])
+    w, h = freqz(1, np.r_[1, -coefs], worN=nfft)
+    return 2 * np.abs(h) / fsamp
+
+
+def test_psd_ar_levinson():
+    np.random.seed(1234)
+    for n in [50, 300, 2000]:
+        x = np.convolve(np.random.randn(n), np.random.rand(5), 'same') + np.sin(np.arange(n) / 3.) + 5
+        s = ph.EvenlySignal(x, sampling_freq=4)
+
+        f, psd = ph.PSD(method='ar')(s)
+        psd_ref = psd_ar_reference(x, 4)
+
+        assert len(f) == len(psd) == 2048
+        np.testing.assert_allclose(psd, psd_ref, rtol=1e-8, atol=1e-12 * np.max(psd_ref))
+
+
+def test_psd_ar_too_short():
+    s = ph.EvenlySignal(np.random.rand(20), sampling_freq=4)
+    f, psd = ph.PSD(method='ar', max_order=30)(s)
+    assert len(f) == 0 and len(psd) == 0
@@ -0,0 +1,64 @@
+# coding=utf-8
+from __future__ import division
+
+from . import ph, np
+from pyphysio.tools.Rolling import rolling_max, rolling_min, rolling_argmax, rolling_argmin, moving_average
+
+__author__ = 'aleb'
+
+
+def maxima_windowing_reference(signal, win_len, win_step):
+    fsamp = signal.get_sampling_freq()
+    winlen = int(win_len * fsamp)
+    winstep = int(win_step * fsamp)
+    idx_maxs = [np.nan]
+    maxs = [np.nan]
+    idx_start = np.arange(0, len(signal) - winlen + 1, winstep) if winlen < len(signal) else [0]
+    for idx_st in idx_start:
+        idx_sp = min(idx_st + winlen, len(signal))
+        curr_win = signal[idx_st: idx_sp]
+        curr_idx_max = np.argmax(curr_win) + idx_st
+        if curr_idx_max != idx_maxs[-1] and curr_idx_max != idx_st and curr_idx_max != idx_sp - 1:
+            idx_maxs.append(curr_idx_max)
+            maxs.append(np.max(curr_win))
+    return np.array(idx_maxs[1:]), np.array(maxs[1:])
+
+
+def test_rolling_kernels():
+    np.random.seed(1234)
+    for n in [1, 17, 1003]:
+        # ties in the integer and rounded signals
+        for x in [np.random.randn(n), np.random.randint(0, 4, n), np.round(np.random.randn(n), 1)]:
+            for width in {1, 2, 7, max(1, n // 2), n}:
+                if width > n:
+                    continue
+                windows = np.lib.stride_tricks.as_strided(x, (n - width + 1, width), (x.strides[0], x.strides[0]))
+                starts = np.arange(n - width + 1)
+                np.testing.assert_array_equal(rolling_max(x, width), np.max(windows, axis=1))
+                np.testing.assert_array_equal(rolling_min(x, width), np.min(windows, axis=1))
+                np.testing.assert_array_equal(rolling_argmax(x, width), np.argmax(windows, axis=1) + starts)
+                np.testing.assert_array_equal(rolling_argmin(x, width), np.argmin(windows, axis=1) + starts)
+                np.testing.assert_allclose(moving_average(x, width), np.convolve(x, np.ones(width) / width, 'same'),
+                                           rtol=1e-10, atol=1e-12)
+
+    x = np.random.randn(50)
+    x[[3, 20, 21]] = np.nan
+    windows = np.lib.stride_tricks.as_strided(x, (46, 5), (x.strides[0], x.strides[0]))
+    np.testing.assert_array_equal(rolling_max(x, 5), np.max(windows, axis=1))
+    np.testing.assert_array_equal(rolling_argmax(x, 5), np.argmax(windows, axis=1) + np.arange(46))
+
+
+def test_maxima_minima_windowing():
+    np.random.seed(1234)
+    s = ph.EvenlySignal(np.round(np.cumsum(np.random.randn(5000)), 0), sampling_freq=100)
+    for win_len, win_step in [(1, 0.5), (0.3, 0.7), (2, 0.01), (60, 1)]:
+        idx, vals = ph.Maxima(method='windowing', win_len=win_len, win_step=win_step)(s)
+        idx_ref, vals_ref = maxima_windowing_reference(s, win_len, win_step)
+        np.testing.assert_array_equal(idx, idx_ref)
+        np.testing.assert_array_equal(vals, vals_ref)
+
+        idx, vals = ph.Minima(method='windowing', win_len=win_len, win_step=win_step)(s)
+        idx_ref, vals_ref = maxima_windowing_reference(-s, win_len, win_step)
+        np.testing.assert_array_equal(idx, idx_ref)
+        np.testing.assert_array_equal(vals, -vals_ref)
+
@@ -0,0 +1,61 @@
+# coding=utf-8
+from __future__ import division
+
+from . import ph, np
+
+__author__ = 'aleb'
+
+
+def test_evenly_segment_view():
+    s = ph.EvenlySignal(np.random.rand(1000), sampling_freq=10, start_time=5, signal_type='EDA')
+    seg = s.segment_time(20, 30.5)
+
+    assert isinstance(seg, ph.EvenlySignal)
+    np.testing.assert_array_equal(seg, s[150:255])
+    assert np.shares_memory(seg, s)
+    assert seg.get_start_time() == 20
+    assert seg.get_sampling_freq() == 10
+    assert seg.get_signal_type() == 'EDA'
+
+    # metadata are not shared
+    seg.set_start_time(0)
+    assert s.get_start_time() == 5
+
+
+def test_unevenly_segment_view():
+    x = np.cumsum(np.random.randint(5, 15, 500))
+    s = ph.UnevenlySignal(np.random.rand(500), sampling_freq=10, start_time=3, signal_type='IBI', x_values=x,
+                          x_type='indices')
+
+    for t_start, t_stop in [(20, 100), (3, None), (50.55, 51.1)]:
+        seg = s.segment_time(t_start, t_stop)
+        idx_start = s.get_idx(t_start)
+        idx_stop = s.get_idx(t_stop) if t_stop is not None else x[-1]
+        iib = s.get_iidx_from_idx(idx_start)
+        iie = s.get_iidx_from_idx(idx_stop)
+        iib = iib if iib is not None else 0
+        iie = iie if iie is not None else -1
+
+        ref = ph.UnevenlySignal(s.get_values()[iib:iie], sampling_freq=10, start_time=s.get_time(idx_start),
+                                signal_type='IBI', x_values=x[iib:iie] - idx_start, x_type='indices',
+                                duration=(idx_stop - idx_start) / 10)
+
+        assert isinstance(seg, ph.UnevenlySignal)
+        assert np.shares_memory(seg, s) or len(seg) == 0
+        np.testing.assert_array_equal(seg, ref)
+        # x_values computed on access
+        np.testing.assert_array_equal(seg.get_indices(), ref.get_indices())
+        np.testing.assert_array_equal(seg.get_times(), ref.get_times())
+        assert seg.get_start_time() == ref.get_start_time()
+        assert seg.get_duration() == ref.get_duration()
+
+    # before the first sample
+    seg = s.segment_time(0, 2)
+    assert len(seg) == 0 and len(seg.get_indices()) == 0
+
+    seg = s.segment_iidx(10, 20)
+    np.testing.assert_array_equal(seg.get_indices(), x[10:20] - x[10])
+    assert seg.get_start_time() == s.get_time_from_iidx(10)
+    seg_seg = seg.segment_iidx(2, 5)
+    np.testing.assert_array_equal(seg_seg.get_indices(), x[12:15] - x[12])
+    np.testing.assert_allclose(seg_seg.get_times(), s.get_times()[12:15])
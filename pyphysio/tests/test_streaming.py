@@ -0,0 +1,77 @@
+# coding=utf-8
+from __future__ import division
+
+from . import ph, np
+from scipy.signal import sosfilt, sosfilt_zi, iirdesign
+from pytest import raises
+
+__author__ = 'aleb'
+
+
+def _chunks(x, sizes):
+    i = 0
+    for size in sizes:
+        yield x[i:i + size]
+        i += size
+
+
+def test_streaming_iir():
+    np.random.seed(1234)
+    fsamp = 100
+    x = np.cumsum(np.random.randn(5000)) + 10
+    sizes = list(np.random.randint(0, 200, 60))
+    sizes.append(len(x) - sum(sizes))
+
+    for init in ['steady', 'zeros']:
+        f = ph.StreamingIIRFilter(fsamp, fp=5, fs=10, init=init)
+        out = np.concatenate([f(c) for c in _chunks(x, sizes)])
+
+        sos = iirdesign(5 / 50, 10 / 50, 0.1, 40, ftype='butter', output='sos')
+        zi = sosfilt_zi(sos) * (x[0] if init == 'steady' else 0)
+        ref = sosfilt(sos, x, zi=zi)[0]
+        np.testing.assert_allclose(out, ref, rtol=1e-10, atol=1e-10)
+        np.testing.assert_allclose(f.filter(x), ref, rtol=1e-10, atol=1e-10)
+
+    # signals and channels
+    f = ph.StreamingIIRFilter(fsamp, fp=[1, 5], fs=[0.5, 8], ftype='cheby1')
+    x2 = np.stack([x, -x, 2 * x], axis=1)
+    ref = f.filter(ph.MultiEvenly(x2, fsamp))
+    out = [f(ph.MultiEvenly(c, fsamp, start_time=i)) for i, c in enumerate(_chunks(x2, [1000, 3000, 1000]))]
+    assert isinstance(out[1], ph.MultiEvenly) and out[1].get_start_time() == 1
+    np.testing.assert_allclose(np.concatenate([c.get_values() for c in out]), ref.get_values(), rtol=1e-10,
+                               atol=1e-10)
+
+
+def test_streaming_convolutional():
+    np.random.seed(1234)
+    fsamp = 100
+    x = np.cumsum(np.random.randn(5000))
+    sizes = [1, 0, 7, 300, 2000, 3, 1000]
+    sizes.append(len(x) - sum(sizes))
+
+    for irftype, win_len in [('gauss', 1), ('rect', 0.05), ('triang', 3)]:
+        f = ph.StreamingConvolutionalFilter(irftype, fsamp=fsamp, win_len=win_len)
+        out = np.concatenate([f(c) for c in _chunks(x, sizes)])
+
+        # the causal version of ConvolutionalFilter, delayed by get_delay samples
+        n = int(win_len * fsamp)
+        ref = ph.ConvolutionalFilter(irftype=irftype, win_len=win_len)(ph.EvenlySignal(x, fsamp)).get_values()
+        delay = f.get_delay()
+        if n % 2 == 1:
+            np.testing.assert_allclose(out[n:], ref[n - delay:len(x) - delay], rtol=1e-8, atol=1e-8)
+        np.testing.assert_allclose(out, f.filter(x), rtol=1e-8, atol=1e-8)
+
+    f = ph.StreamingConvolutionalFilter('custom', irf=[1, 2, 3], normalize=False)
+    out = np.concatenate([f(c) for c in _chunks(x, sizes)])
+    np.testing.assert_allclose(out, np.convolve(np.r_[x[0], x[0], x], [1, 2, 3], 'valid'))
+
+
+def test_streaming_abstract():
+    from pyphysio.filters.Streaming import _StreamingFilter
+
+    class NoProcess(_StreamingFilter):
+        def _init_state(self, values):
+            return None
+
+    with raises(TypeError):
+        NoProcess()
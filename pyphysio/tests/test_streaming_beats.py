@@ -0,0 +1,41 @@
+# coding=utf-8
+from __future__ import division
+
+from . import ph, np, TestData
+from pyphysio.estimators.Streaming import replay
+
+__author__ = 'aleb'
+
+FSAMP = 2048
+
+
+def test_streaming_beats():
+    ecg = ph.EvenlySignal(TestData.ecg(), sampling_freq=FSAMP, signal_type='ECG')
+    ibi = ph.BeatFromECG()(ecg)
+    idx_ref = ibi.get_indices()
+
+    stream = ph.StreamingBeatFromECG(FSAMP)
+    for chunk_len in [0.01, 0.25, 3.3]:
+        idx, ibis, latency, times = replay(stream, ecg, chunk_len)
+        np.testing.assert_array_equal(idx, idx_ref)
+        np.testing.assert_allclose(ibis, ibi.get_values())
+        # documented worst case, with a margin for the R-S descent
+        assert np.all(latency[:-1] >= 0)
+        assert np.max(latency[1:-2]) <= chunk_len + stream.get_lookahead() + 0.2
+
+    # random chunks
+    np.random.seed(1234)
+    stream.reset()
+    values = ecg.get_values()
+    bounds = np.r_[0, np.sort(np.random.randint(0, len(values), 300)), len(values)]
+    out = [stream(values[b:e]) for b, e in zip(bounds[:-1], bounds[1:])] + [stream.flush()]
+    np.testing.assert_array_equal(np.concatenate([o[0] for o in out]), idx_ref)
+
+
+def test_streaming_beats_fixed_delta():
+    ecg = ph.EvenlySignal(TestData.ecg()[:100000], sampling_freq=FSAMP, signal_type='ECG')
+    maxp = ph.PeakDetection(delta=0.5, refractory=0.5, start_max=True)(ecg)[0]
+    maxp = maxp[1:] if maxp[0] == 0 else maxp
+
+    idx, ibis, latency, times = replay(ph.StreamingBeatFromECG(FSAMP, delta=0.5), ecg, 0.1)
+    np.testing.assert_array_equal(idx, maxp)
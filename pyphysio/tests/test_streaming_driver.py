@@ -0,0 +1,29 @@
+# coding=utf-8
+from __future__ import division
+
+from . import ph, np
+from pyphysio.estimators.Estimators import DriverEstim
+
+__author__ = 'aleb'
+
+
+def test_streaming_driver():
+    np.random.seed(1234)
+    fsamp = 32
+    n = fsamp * 900
+    # phasic responses on a tonic level
+    impulses = np.zeros(n)
+    impulses[np.random.randint(0, n, 200)] = 3 * np.random.rand(200)
+    bateman = DriverEstim._gen_bateman(fsamp, [0.75, 2])
+    x = 2 + np.convolve(impulses, bateman / np.sum(bateman))[:n] + 0.001 * np.random.randn(n)
+    ref = ph.DriverEstim()(ph.EvenlySignal(x, sampling_freq=fsamp)).get_values()
+
+    edge = 3 * len(bateman)
+    for block_len, chunk in [(None, 101), (5, 7), (60, 5000)]:
+        stream = ph.StreamingDriverEstim(fsamp, block_len=block_len)
+        out = [stream(x[i:i + chunk]) for i in range(0, n, chunk)] + [stream.flush()]
+        # bounded state
+        assert len(stream._context) <= edge
+        driver = np.concatenate(out)
+        assert len(driver) == len(ref)
+        np.testing.assert_allclose(driver[edge:-edge], ref[edge:-edge], atol=1e-4 * np.max(ref))
@@ -0,0 +1,101 @@
+# coding=utf-8
+"""
+Convolution engine: direct, FFT or overlap-add, chosen per call with a cost model.
+"""
+from __future__ import division
+import numpy as _np
+
+__author__ = 'AleB'
+
+# Relative costs (in units of a direct multiply-add) measured with numpy.convolve, scipy.signal.fftconvolve and
+# scipy.signal.oaconvolve: FFT cost per L*log2(L) sample of the padded length, fixed overhead of the FFT calls
+_FFT_COST = 10
+_OA_COST = 12
+_FFT_OVERHEAD = 3e5
+_OA_OVERHEAD = 4e5
+
+
+def choose_method(n, m):
+    """
+    Cheapest method to convolve a signal of n samples with a kernel of m samples.
+
+    Parameters
+    ----------
+    n : int
+        Number of samples of the signal
+    m : int
+        Number of samples of the kernel
+
+    Returns
+    -------
+    method : str
+        'direct', 'fft' or 'oa' (overlap-add)
+    """
+    from scipy.fftpack import next_fast_len as _next_fast_len
+    if min(n, m) <= 1:
+        return 'direct'
+    n_full = _next_fast_len(n + m - 1)
+    costs = {
+        'direct': n * m,
+        'fft': _FFT_COST * n_full * _np.log2(n_full) + _FFT_OVERHEAD,
+        'oa': _OA_COST * (n + m) * _np.log2(2 * m) + _OA_OVERHEAD,
+    }
+    return min(costs, key=costs.get)
+
+
+def convolve(x, kernel, mode='same', method='auto'):
+    """
+    Same as numpy.convolve(x, kernel, mode) for 1D signals. 2D signals are convolved along axis 0 (one channel per
+    column) with the same 1D kernel.
+
+    Parameters
+    ----------
+    x : numpy.array
+        The signal, 1D or 2D (samples x channels)
+    kernel : numpy.array
+        1D kernel
+
+    Optional parameters
+    -------------------
+    mode : 'full', 'same' or 'valid', default='same'
+        As in numpy.convolve
+    method : 'auto', 'direct', 'fft' or 'oa', default='auto'
+        'auto' chooses the cheapest method (see choose_method), 'direct' if x has non finite values. 'fft' and 'oa'
+        (overlap-add) differ from the direct convolution by the floating point rounding and spread the non finite
+        values on whole blocks of the output
+
+    Returns
+    -------
+    convolved : numpy.array
+        The result of the convolution
+    """
+    from scipy.signal import fftconvolve as _fftconvolve, convolve as _convolve
+    try:
+        from scipy.signal import oaconvolve as _oaconvolve
+    except ImportError:  # scipy < 1.4
+        _oaconvolve = _fftconvolve
+    assert method in ['auto', 'direct', 'fft', 'oa'], "method should be in ['auto', 'direct', 'fft', 'oa']"
+    assert mode in ['full', 'same', 'valid'], "mode should be in ['full', 'same', 'valid']"
+    x = _np.asarray(x)
+    kernel = _np.asarray(kernel)
+    assert kernel.ndim == 1, "kernel should be 1-dimensional"
+    n, m = len(x), len(kernel)
+
+    if x.ndim == 1 and (n < m or m == 0):
+        # numpy swaps the inputs: the output of 'same' has the length of the kernel
+        return _np.convolve(x, kernel, mode)
+
+    if method == 'auto':
+        # a non finite sample spreads on a whole block with 'fft' and 'oa', on len(kernel) samples with 'direct'
+        method = choose_method(n, m) if _np.all(_np.isfinite(x)) else 'direct'
+
+    if x.ndim == 1 and method == 'direct':
+        return _np.convolve(x, kernel, mode)
+
+    if x.ndim > 1:
+        kernel = kernel.reshape((m,) + (1,) * (x.ndim - 1))
+    if method == 'direct':
+        return _convolve(x, kernel, mode, method='direct')
+    if method == 'oa':
+        return _oaconvolve(x, kernel, mode, axes=0)
+    return _fftconvolve(x, kernel, mode, axes=0)
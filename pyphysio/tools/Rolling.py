@@ -0,0 +1,200 @@
+# coding=utf-8
+"""
+Rolling window kernels in O(n), independent of the window width.
+The extrema use the van Herk/Gil-Werman algorithm: the signal is split in blocks of the window width, the window
+starting at i is covered by the suffix of its block (i..end of block) and by the prefix of the next block (start of
+block..i + width - 1), so its extremum is that of the two running extrema.
+The window matrices (window_matrix) are strided views of the signal, used by the kernels without an O(n) form and by
+the batched evaluation of the indicators.
+"""
+from __future__ import division
+import numpy as _np
+from numpy.lib.stride_tricks import as_strided as _as_strided
+
+
+def _strided_window_view(x, width):
+    # read-only as sliding_window_view: the rows overlap, a write would change the other rows and x
+    return _as_strided(x, (len(x) - width + 1, width), (x.strides[0], x.strides[0]), writeable=False)
+
+
+try:
+    from numpy.lib.stride_tricks import sliding_window_view as _sliding_window_view
+except ImportError:  # numpy < 1.20
+    _sliding_window_view = _strided_window_view
+
+__author__ = 'AleB'
+
+# Maximum number of samples of the window matrices passed at once to the indicators (bounds the temporaries)
+_MAX_CHUNK = 1 << 20
+
+
+def window_matrix(values, begins, width):
+    """
+    Generates the 2D matrices (window x sample) of the windows values[b:b + width] for b in begins, in chunks.
+    Regularly spaced windows are strided views of the signal buffer (no copy).
+
+    Parameters
+    ----------
+    values : numpy.array
+        1D array of the values of the signal
+    begins : numpy.array
+        Start index of each window, the windows must be inside the signal
+    width : int, >0
+        Number of samples of the windows
+
+    Returns
+    -------
+    chunks : generator
+        Pairs (slice of the windows, 2D matrix of the values)
+    """
+    begins = _np.asarray(begins, dtype=int)
+    view = _sliding_window_view(values, width)
+    n = len(begins)
+    chunk = max(1, _MAX_CHUNK // width)
+
+    steps = _np.diff(begins)
+    regular = n > 1 and steps[0] > 0 and _np.all(steps == steps[0])
+
+    for i in range(0, n, chunk):
+        rows = slice(i, min(i + chunk, n))
+        if regular:
+            yield rows, view[begins[i]:begins[rows.stop - 1] + 1:steps[0]]
+        else:
+            yield rows, view[begins[rows]]
+
+
+def _blocks(x, width):
+    n = len(x)
+    n_blocks = -(-n // width)
+    # the padding is never part of a window
+    padded = _np.concatenate([x, _np.repeat(x[-1:], n_blocks * width - n)])
+    return padded.reshape(n_blocks, width)
+
+
+def _rolling(x, width, ufunc):
+    x = _np.asarray(x)
+    assert x.ndim == 1, "x should be 1-dimensional"
+    assert 0 < width <= len(x), "width should be in (0, len(x)]"
+    blocks = _blocks(x, width)
+    prefix = ufunc.accumulate(blocks, axis=1).ravel()
+    suffix = ufunc.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].ravel()
+    n_out = len(x) - width + 1
+    return ufunc(suffix[:n_out], prefix[width - 1:width - 1 + n_out])
+
+
+def rolling_max(x, width):
+    """
+    Maximum of each window x[i:i + width], i = 0..len(x) - width. Same as numpy.max on each window (NaN propagates).
+
+    Parameters
+    ----------
+    x : numpy.array
+        1D array
+    width : int, >0
+        Number of samples of the windows
+
+    Returns
+    -------
+    maxs : numpy.array
+        Array of len(x) - width + 1 values
+    """
+    return _rolling(x, width, _np.maximum)
+
+
+def rolling_min(x, width):
+    """
+    Minimum of each window x[i:i + width], i = 0..len(x) - width. See rolling_max.
+    """
+    return _rolling(x, width, _np.minimum)
+
+
+def _rolling_arg(x, width, greater, ufunc):
+    x = _np.asarray(x)
+    assert x.ndim == 1, "x should be 1-dimensional"
+    assert 0 < width <= len(x), "width should be in (0, len(x)]"
+    n_out = len(x) - width + 1
+
+    if _np.issubdtype(x.dtype, _np.floating) and _np.isnan(x).any():
+        # the first NaN is the result of numpy.argmax, as in the windows
+        out = _np.empty(n_out, dtype=int)
+        for rows, windows in window_matrix(x, _np.arange(n_out), width):
+            arg = _np.argmax(windows, axis=1) if ufunc is _np.maximum else _np.argmin(windows, axis=1)
+            out[rows] = arg + _np.arange(rows.start, rows.stop)
+        return out
+
+    blocks = _blocks(x, width)
+    n_blocks = blocks.shape[0]
+    col = _np.arange(width)
+
+    # prefix: the last position where the running extremum changes is its first occurrence
+    prefix = ufunc.accumulate(blocks, axis=1)
+    changed = _np.ones(blocks.shape, dtype=bool)
+    changed[:, 1:] = greater(blocks[:, 1:], prefix[:, :-1])
+    i_prefix = _np.maximum.accumulate(_np.where(changed, col, 0), axis=1)
+
+    # suffix (from the right): ties move the position to the left
+    suffix = ufunc.accumulate(blocks[:, ::-1], axis=1)[:, ::-1]
+    changed = _np.ones(blocks.shape, dtype=bool)
+    changed[:, :-1] = ~greater(suffix[:, 1:], blocks[:, :-1])
+    i_suffix = _np.minimum.accumulate(_np.where(changed, col, width)[:, ::-1], axis=1)[:, ::-1]
+
+    offsets = (_np.arange(n_blocks) * width)[:, None]
+    ends = slice(width - 1, width - 1 + n_out)
+    prefix, i_prefix = prefix.ravel()[ends], (i_prefix + offsets).ravel()[ends]
+    suffix, i_suffix = suffix.ravel()[:n_out], (i_suffix + offsets).ravel()[:n_out]
+    # the suffix is on the left: it wins the ties
+    return _np.where(greater(prefix, suffix), i_prefix, i_suffix)
+
+
+def rolling_argmax(x, width):
+    """
+    Index of the maximum of each window x[i:i + width], i = 0..len(x) - width.
+    Same as numpy.argmax on each window (first occurrence, first NaN).
+
+    Parameters
+    ----------
+    x : numpy.array
+        1D array
+    width : int, >0
+        Number of samples of the windows
+
+    Returns
+    -------
+    idx_maxs : numpy.array
+        Array of len(x) - width + 1 indexes, relative to x (not to the window start)
+    """
+    return _rolling_arg(x, width, _np.greater, _np.maximum)
+
+
+def rolling_argmin(x, width):
+    """
+    Index of the minimum of each window x[i:i + width], i = 0..len(x) - width. See rolling_argmax.
+    """
+    return _rolling_arg(x, width, _np.less, _np.minimum)
+
+
+def moving_average(x, width):
+    """
+    Same as numpy.convolve(x, numpy.ones(width) / width, mode='same'), in O(n) with the cumulative sum.
+    Falls back to numpy.convolve for signals shorter than the window or with non finite values.
+
+    Parameters
+    ----------
+    x : numpy.array
+        1D array
+    width : int, >0
+        Number of samples of the boxcar window
+
+    Returns
+    -------
+    smoothed : numpy.array
+        The smoothed array
+    """
+    n = len(x)
+    if width < 1 or n < width or not _np.all(_np.isfinite(x)):
+        return _np.convolve(x, _np.ones(width) / width, mode='same')
+    c = _np.r_[0, _np.cumsum(x)]
+    # index of the 'full' convolution for each output sample
+    i_full = _np.arange((width - 1) // 2, (width - 1) // 2 + n)
+    return (c[_np.minimum(i_full + 1, n)] - c[_np.maximum(i_full - width + 1, 0)]) / width
+
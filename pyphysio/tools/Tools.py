@@ -1,13 +1,11 @@
 # coding=utf-8
 from __future__ import division
 import numpy as _np
-from scipy.signal import welch as _welch, periodogram as _periodogram, freqz as _freqz
-import scipy.optimize as _opt
-from scipy import linalg as _linalg
-
-import itertools as _itertools
+from heapq import heapify as _heapify, heappush as _heappush, heappop as _heappop
 from ..BaseTool import Tool as _Tool
 from ..Signal import UnevenlySignal as _UnevenlySignal, EvenlySignal as _EvenlySignal
+from .Rolling import rolling_max as _rolling_max, rolling_min as _rolling_min, rolling_argmax as _rolling_argmax, \
+    moving_average as _moving_average, _sliding_window_view
 
 
 class Diff(_Tool):
@@ -46,6 +44,171 @@ class Diff(_Tool):
                             start_time=signal.get_start_time() + degree / signal.get_sampling_freq())
 
         return out
+
+
+def embed(x, dimension, delay=1):
+    """
+    Time-delay embedding: the vectors (x[i], x[i + delay], ..., x[i + (dimension - 1) * delay]) as the rows of a
+    read-only strided view of x (no copy).
+
+    Parameters
+    ----------
+    x : numpy.array
+        1D array
+    dimension : int, >0
+        Number of samples of the vectors
+    delay : int, >0, default=1
+        Samples between the consecutive elements of the vectors
+
+    Returns
+    -------
+    emb : numpy.array
+        Read-only array of shape (len(x) - (dimension - 1) * delay, dimension), empty if x is shorter than a vector
+    """
+    x = _np.asarray(x)
+    assert x.ndim == 1, "x should be 1-dimensional"
+    assert dimension > 0, "dimension should be > 0"
+    assert delay > 0, "delay should be > 0"
+    span = (dimension - 1) * delay + 1
+    num = len(x) - span + 1
+    if num <= 0:
+        return _np.empty((0, dimension), dtype=x.dtype)
+    return _sliding_window_view(x, span)[:, ::delay]
+
+
+class Embedding(_Tool):
+    """
+    Time-delay embedding of the signal: the vectors of 'dimension' samples, 'delay' samples apart, starting at each
+    sample. The vectors are a read-only view of the values of the signal (see embed).
+
+    Parameters
+    ----------
+    dimension : int, >0
+        Number of samples of the vectors
+
+    Optional parameters
+    -------------------
+    delay : int, >0, default = 1
+        Samples between the consecutive elements of the vectors
+
+    Returns
+    -------
+    emb : numpy.array
+        Array of shape (len(signal) - (dimension - 1) * delay, dimension)
+    """
+
+    def __init__(self, dimension, delay=1):
+        assert dimension > 0, "The dimension value should be positive"
+        assert delay > 0, "The delay value should be positive"
+        _Tool.__init__(self, dimension=dimension, delay=delay)
+
+    @classmethod
+    def algorithm(cls, signal, params):
+        return embed(signal.get_values(), params['dimension'], params['delay'])
+
+
+def _peaks_init(first_value, look_for_max):
+    """
+    Initial state of the PeakDetection state machine, as set by the first sample of the signal.
+    """
+    return {'look_for_max': look_for_max,
+            'mx': first_value, 'mx_pos': 0,
+            'mn': first_value, 'mn_pos': 0,
+            'act_max': 0, 'act_min': 0,
+            'win': 64}
+
+
+def _peaks_scan(values, delta, refractory, state, offset, maxp, minp, maxv, minv):
+    """
+    Advances the PeakDetection state machine over a chunk of samples, without a per-sample python loop.
+
+    Each phase (looking for a maximum or for a minimum) is solved on growing windows with a running
+    extremum (numpy.maximum/minimum.accumulate): the phase ends at the first sample that is below (above)
+    the running extremum by more than delta. The state is carried between calls, so that a signal can be
+    processed in consecutive chunks. Signals containing NaNs are not supported (see PeakDetection).
+
+    Parameters
+    ----------
+    values : numpy.array
+        Samples of the chunk, values[k] is the sample offset + k of the signal
+    delta : float or numpy.array
+        Threshold, scalar or one value for each sample of the chunk
+    refractory : float
+        Refractory period in samples
+    state : dict
+        State of the detector (see _peaks_init), updated in place
+    offset : int
+        Index of values[0] in the signal
+    maxp, minp, maxv, minv : list
+        Lists where the detected peaks are appended
+    """
+    scalar = _np.ndim(delta) == 0
+    n = len(values)
+    p = 0
+    while p < n:
+        w = state['win']
+        stop = min(p + w, n)
+        seg = values[p:stop]
+        d = delta if scalar else delta[p:stop]
+        look_for_max = state['look_for_max']
+
+        if look_for_max:
+            running = _np.maximum(_np.maximum.accumulate(seg), state['mx'])
+            found = seg < running - d
+            act = state['act_max']
+        else:
+            running = _np.minimum(_np.minimum.accumulate(seg), state['mn'])
+            found = seg > running + d
+            act = state['act_min']
+
+        # samples before the end of the refractory period cannot end the phase
+        n_skip = int(_np.ceil(act)) - offset - p
+        if n_skip > 0:
+            found[:n_skip] = False
+
+        k = int(_np.argmax(found))
+        if not found[k]:
+            # no detection in this window: carry the candidate and enlarge the window
+            k = len(seg) - 1
+            pending = True
+        else:
+            pending = False
+
+        # candidate at the end of seg[:k + 1]: updated only if strictly exceeded (first occurrence)
+        if look_for_max:
+            k_best = int(_np.argmax(seg[:k + 1]))
+            if seg[k_best] > state['mx']:
+                state['mx'] = seg[k_best]
+                state['mx_pos'] = offset + p + k_best
+        else:
+            k_best = int(_np.argmin(seg[:k + 1]))
+            if seg[k_best] < state['mn']:
+                state['mn'] = seg[k_best]
+                state['mn_pos'] = offset + p + k_best
+
+        if pending:
+            state['win'] = 2 * w
+            p = stop
+            continue
+
+        i = offset + p + k
+        if look_for_max:  # new max
+            maxp.append(state['mx_pos'])
+            maxv.append(state['mx'])
+            state['act_max'] = i + refractory
+            state['mn'] = seg[k]
+            state['mn_pos'] = i
+        else:  # new min
+            minp.append(state['mn_pos'])
+            minv.append(state['mn'])
+            state['act_min'] = i + refractory
+            state['mx'] = seg[k]
+            state['mx_pos'] = i
+        state['look_for_max'] = not look_for_max
+        state['win'] = max(64, 2 * (k + 1))
+        p = p + k + 1
+
+
 class PeakDetection(_Tool):
     """
     Estimate the maxima and the minima in the signal (in particular for periodic signals).
@@ -61,6 +224,9 @@ class PeakDetection(_Tool):
         Seconds to skip after a detected paek to look for new peaks.
     start_max : boolean, default = True
         Whether to start looking for a maximum or (False) for a minimum.
+    engine : str, default = 'numpy'
+        Detection engine: 'numpy' (vectorized) or 'loop' (sample by sample). Both give the same peaks;
+        signals containing NaNs are always processed by the 'loop' engine.
 
     Returns
     -------
@@ -74,12 +240,13 @@ class PeakDetection(_Tool):
         Array containing values of the minima
     """
 
-    def __init__(self, delta, refractory=0, start_max=True):
+    def __init__(self, delta, refractory=0, start_max=True, engine='numpy'):
         delta = _np.array(delta)
         assert delta.ndim <= 1, "Delta value should be 1 or 0-dimensional"
         assert delta.all() > 0, "Delta value/s should be positive"
         assert refractory >= 0, "Refractory value should be non negative"
-        _Tool.__init__(self, delta=delta, refractory=refractory, start_max=start_max)
+        assert engine in ['numpy', 'loop'], "Parameter engine should be in ['numpy', 'loop']"
+        _Tool.__init__(self, delta=delta, refractory=refractory, start_max=start_max, engine=engine)
 
     @classmethod
     def algorithm(cls, signal, params):
@@ -89,7 +256,8 @@ class PeakDetection(_Tool):
         else:  # else transform the refractory from seconds to samples
             refractory = refractory * signal.get_sampling_freq()
         look_for_max = params['start_max']
-        delta = params['delta']
+        delta = _np.asarray(params['delta'])
+        engine = params.get('engine', 'numpy')
 
         minp = []
         maxp = []
@@ -98,54 +266,65 @@ class PeakDetection(_Tool):
         maxv = []
 
         scalar = delta.ndim == 0
-        if scalar:
-            d = delta
 
         if len(signal) < 1:
             cls.warn("Empty signal (len < 1), returning empty.")
         elif not scalar and len(delta) != len(signal):
             cls.error("delta vector's length differs from signal's one, returning empty.")
         else:
-            mn_pos_candidate = mx_pos_candidate = 0
-            mn_candidate = mx_candidate = signal[0]
+            values = _np.asarray(signal)
+            if engine == 'numpy' and not (_np.isnan(values).any() or _np.isnan(delta).any()):
+                state = _peaks_init(values[0], look_for_max)
+                _peaks_scan(values[1:], delta if scalar else delta[1:], refractory, state, 1, maxp, minp, maxv, minv)
+            else:
+                cls._algorithm_loop(values, delta, refractory, look_for_max, maxp, minp, maxv, minv)
 
-            i_activation_min = 0
-            i_activation_max = 0
+        return _np.array(maxp), _np.array(minp), _np.array(maxv), _np.array(minv)
 
-            for i in range(1, len(signal)):
-                sample = signal[i]
-                if not scalar:
-                    d = delta[i]
+    @staticmethod
+    def _algorithm_loop(signal, delta, refractory, look_for_max, maxp, minp, maxv, minv):
+        scalar = delta.ndim == 0
+        if scalar:
+            d = delta
 
-                if sample > mx_candidate:
-                    mx_candidate = sample
-                    mx_pos_candidate = i
-                if sample < mn_candidate:
-                    mn_candidate = sample
-                    mn_pos_candidate = i
+        mn_pos_candidate = mx_pos_candidate = 0
+        mn_candidate = mx_candidate = signal[0]
 
-                if look_for_max:
-                    if i >= i_activation_max and sample < mx_candidate - d:  # new max
-                        maxp.append(mx_pos_candidate)
-                        maxv.append(mx_candidate)
-                        i_activation_max = i + refractory
+        i_activation_min = 0
+        i_activation_max = 0
 
-                        mn_candidate = sample
-                        mn_pos_candidate = i
+        for i in range(1, len(signal)):
+            sample = signal[i]
+            if not scalar:
+                d = delta[i]
 
-                        look_for_max = False
-                else:
-                    if i >= i_activation_min and sample > mn_candidate + d:  # new min
-                        minp.append(mn_pos_candidate)
-                        minv.append(mn_candidate)
-                        i_activation_min = i + refractory
+            if sample > mx_candidate:
+                mx_candidate = sample
+                mx_pos_candidate = i
+            if sample < mn_candidate:
+                mn_candidate = sample
+                mn_pos_candidate = i
 
-                        mx_candidate = sample
-                        mx_pos_candidate = i
+            if look_for_max:
+                if i >= i_activation_max and sample < mx_candidate - d:  # new max
+                    maxp.append(mx_pos_candidate)
+                    maxv.append(mx_candidate)
+                    i_activation_max = i + refractory
 
-                        look_for_max = True
+                    mn_candidate = sample
+                    mn_pos_candidate = i
 
-        return _np.array(maxp), _np.array(minp), _np.array(maxv), _np.array(minv)
+                    look_for_max = False
+            else:
+                if i >= i_activation_min and sample > mn_candidate + d:  # new min
+                    minp.append(mn_pos_candidate)
+                    minv.append(mn_candidate)
+                    i_activation_min = i + refractory
+
+                    mx_candidate = sample
+                    mx_pos_candidate = i
+
+                    look_for_max = True
 
 
 class PeakSelection(_Tool):
@@ -227,6 +406,33 @@ class PeakSelection(_Tool):
         return i_start, i_stop
 
 
+def _signal_range(values, fsamp, win_len, win_step, smooth=True):
+    """
+    Local range of the values (see SignalRange) in O(n): max - min of the windows from the rolling extrema.
+    :return: The range of each sample, the range of the whole values if shorter than the window
+    """
+    idx_len = int(win_len * fsamp)
+    idx_step = int(win_step * fsamp)
+    n = len(values)
+    if n < idx_len:
+        return _np.max(values) - _np.min(values)
+
+    windows = _np.arange(0, n - idx_len + 1, idx_step)
+    ranges = (_rolling_max(values, idx_len) - _rolling_min(values, idx_len))[windows]
+
+    # each sample takes the range of the last window containing it (0 if none), the tail the last one
+    if idx_step <= idx_len:
+        deltas = _np.repeat(ranges, _np.diff(_np.r_[windows, n]))
+    else:
+        i_win = _np.minimum(_np.arange(n) // idx_step, len(windows) - 1)
+        deltas = ranges[i_win]
+        deltas[(_np.arange(n) - windows[i_win] >= idx_len) & (i_win < len(windows) - 1)] = 0
+
+    if smooth:
+        deltas = _moving_average(deltas, int(win_len * 2 * fsamp))
+    return deltas
+
+
 class SignalRange(_Tool):
     """
     Estimate the local range of the signal by sliding windowing
@@ -260,30 +466,51 @@ class SignalRange(_Tool):
         win_step = params['win_step']
         smooth = params['smooth']
 
-        fsamp = signal.get_sampling_freq()
-        idx_len = int(win_len * fsamp)
-        idx_step = int(win_step * fsamp)
-
-        if len(signal) < idx_len:
+        if len(signal) < int(win_len * signal.get_sampling_freq()):
             cls.warn("Input signal is shorter than the window length.")
-            return _np.max(signal) - _np.min(signal)
-        else:
-            windows = _np.arange(0, len(signal) - idx_len + 1, idx_step)
-            deltas = _np.zeros(len(signal))
+        return _signal_range(signal.get_values(), signal.get_sampling_freq(), win_len, win_step, smooth)
 
-            curr_delta = 0
-            for start in windows:
-                portion_curr = signal[start: start + idx_len]
-                curr_delta = _np.max(portion_curr) - _np.min(portion_curr)
-                deltas[start:start + idx_len] = curr_delta
 
-            deltas[windows[-1] + idx_len:] = curr_delta
 
-            if smooth:
-                win_len = int(win_len*2*fsamp)
-                deltas = _np.convolve(deltas, _np.ones(win_len)/win_len, mode='same')
+def _autocorrelation(x, max_lag):
+    """
+    Computes the (biased, not normalized) autocorrelation sum(x[n] * x[n + k]) for k = 0..max_lag using the FFT.
+    """
+    from scipy.fftpack import next_fast_len as _next_fast_len
+    n = len(x)
+    nfft = _next_fast_len(2 * n - 1)
+    fx = _np.fft.rfft(x, nfft)
+    return _np.fft.irfft(fx * _np.conj(fx), nfft)[:max_lag + 1]
 
-            return deltas
+
+def _levinson_durbin(r, order):
+    """
+    Solves the Yule-Walker equations of all the orders up to 'order' with the Levinson-Durbin recursion.
+
+    Parameters
+    ----------
+    r : numpy.array
+        Autocorrelation at lags 0..order
+    order : int
+        Maximum order of the AR model
+
+    Returns
+    -------
+    p_err : numpy.array
+        Prediction error power of each order (p_err[0] = r[0])
+    coefs : list
+        coefs[k] are the coefficients a_1..a_k of the prediction polynomial 1 + sum(a_i z^-i) of order k
+    """
+    p_err = _np.empty(order + 1)
+    p_err[0] = r[0]
+    a = _np.zeros(0)
+    coefs = [a]
+    for k in range(order):
+        k_refl = -(r[k + 1] + _np.dot(a, r[k:0:-1])) / p_err[k]
+        a = _np.r_[a + k_refl * a[::-1], k_refl]
+        p_err[k + 1] = p_err[k] * (1. - k_refl ** 2)
+        coefs.append(a)
+    return p_err, coefs
 
 
 class PSD(_Tool):
@@ -319,6 +546,9 @@ class PSD(_Tool):
         Power Spectrum Density
     """
 
+    _persistent = True
+    _axis_aware = True
+
     def __init__(self, method, nfft=2048, window='hamming', min_order=10, max_order=30, normalize=False,
                  remove_mean=True, **kwargs):
         
@@ -343,6 +573,7 @@ class PSD(_Tool):
 
     @classmethod
     def algorithm(cls, signal, params):
+        from scipy.signal import welch as _welch, periodogram as _periodogram, freqz as _freqz
         method = params['method']
         nfft = params['nfft'] if "nfft" in params else None
         window = params['window']
@@ -353,6 +584,9 @@ class PSD(_Tool):
 
         fsamp = signal.get_sampling_freq()
 
+        if signal.ndim > 1:
+            return cls._algorithm_channels(signal, params)
+
         if remove_mean:
             signal = signal - _np.mean(signal)
 
@@ -364,59 +598,6 @@ class PSD(_Tool):
 
         elif method == 'ar':
             cls.warn("Using AR method: results might not be comparable with other methods")
-            #methods derived from: https://github.com/mpastell/pyageng
-            def autocorr(x, lag=30):
-                c = _np.correlate(x, x, 'full')
-                mid = len(c)//2
-                acov = c[mid:mid+lag]
-                acor = acov/acov[0]
-                return(acor)
-                
-            def aryw(x, order=30):
-                x = x - _np.mean(x)
-                ac = autocorr(x, order+1)
-                R = _linalg.toeplitz(ac[:order])
-                r = ac[1:order+1]
-                params = _np.linalg.inv(R).dot(r)
-                return(params)
-                
-            def AIC_yule(signal, order):
-                #this is from library spectrum: https://github.com/cokelaer/spectrum
-                N = len(signal)
-                assert N>=order, "The number of samples in the signal should be >= to the model order"
-                
-                C = _np.correlate(signal, signal, mode='full')/N
-                r = C[N-1:]
-                
-                T0  = r[0]
-                T = r[1:]
-                
-                A = _np.zeros(order, dtype=float)
-                P = T0
-                
-                for k in range(0, order):
-                    save = T[k]
-                    if k == 0:
-                        temp = -save / P
-                    else:
-                        for j in range(0, k):
-                            save = save + A[j] * T[k-j-1]
-                        temp = -save / P
-                    
-                    P = P * (1. - temp**2.)
-                    A[k] = temp
-                
-                    khalf = (k+1)//2
-                    for j in range(0, khalf):
-                        kj = k-j-1
-                        save = A[j]
-                        A[j] = save + temp * A[kj]
-                        if j != kj:
-                            A[kj] += temp*save
-                
-                res = N * _np.log(P) + 2*(order + 1)
-                return(res)
-            
             min_order = params['min_order']
             max_order = params['max_order']
 
@@ -424,12 +605,20 @@ class PSD(_Tool):
                 cls.warn("Input signal too short: try another 'method', a lower 'max_order', or a longer signal")
                 return [], []
 
+            # Akaike criterion for every order from a single Levinson-Durbin recursion
+            x = _np.asarray(signal, dtype=float)
+            n = len(x)
+            p_err, coefs = _levinson_durbin(_autocorrelation(x, max_order) / n, max_order)
+
             orders = _np.arange(min_order, max_order + 1)
-            aics = [AIC_yule(signal, x) for x in orders]
+            aics = n * _np.log(p_err[orders]) + 2 * (orders + 1)
             best_order = orders[_np.argmin(aics)]
 
-            params = aryw(signal, best_order)
-            a = _np.concatenate([_np.ones(1), -params])
+            # Yule-Walker coefficients of the best order (on the zero-mean signal)
+            if not remove_mean:
+                x = x - _np.mean(x)
+                p_err, coefs = _levinson_durbin(_autocorrelation(x, best_order), best_order)
+            a = _np.concatenate([_np.ones(1), coefs[best_order]])
             w, P = _freqz(1, a, whole = False, worN = nfft)
             
             psd = 2*_np.abs(P)/fsamp
@@ -445,6 +634,38 @@ class PSD(_Tool):
             psd /= _np.sum(psd)
         return freqs, psd
 
+    @classmethod
+    def _algorithm_channels(cls, signal, params):
+        """
+        PSD of each channel (along axis 1), as a list of (freqs, psd) tuples. The 'fft' and 'welch' methods process
+        all the channels in a single call.
+        """
+        from scipy.signal import welch as _welch, periodogram as _periodogram
+        method = params['method']
+        nfft = params['nfft'] if "nfft" in params else None
+        window = params['window']
+        fsamp = signal.get_sampling_freq()
+        values = signal.get_values()
+
+        if method not in ['fft', 'welch']:
+            return [cls.algorithm(_EvenlySignal(values[:, i_ch], fsamp, signal.get_start_time()), params)
+                    for i_ch in range(values.shape[1])]
+
+        if params['remove_mean']:
+            values = values - _np.mean(values, axis=0)
+
+        if method == 'fft':
+            freqs, psd = _periodogram(values, fs=fsamp, window=window, nfft=nfft, return_onesided=True, axis=0)
+        else:
+            freqs, psd = _welch(values, fsamp, window=window, return_onesided=True, nfft=nfft, axis=0)
+
+        freqs = _np.linspace(start=0, stop=fsamp / 2, num=len(psd))
+
+        # NORMALIZE
+        if params['normalize']:
+            psd /= _np.sum(psd, axis=0)
+        return [(freqs, psd[:, i_ch]) for i_ch in range(psd.shape[1])]
+
 
 class Maxima(_Tool):
     """
@@ -519,29 +740,22 @@ class Maxima(_Tool):
             # TODO (Andrea): check that winlen > 2
             # TODO (Andrea): check that winstep >= 1
 
-            idx_maxs = [_np.nan]
-            maxs = [_np.nan]
+            values = signal.get_values()
 
             if winlen < len(signal):
                 idx_start = _np.arange(0, len(signal) - winlen + 1, winstep)
+                idx_max = _rolling_argmax(values, winlen)[idx_start]
+                idx_stop = idx_start + winlen
             else:
-                idx_start = [0]
-
-            for idx_st in idx_start:
-                idx_sp = idx_st + winlen
-                if idx_sp > len(signal):
-                    idx_sp = len(signal)
-                curr_win = signal[idx_st: idx_sp]
-                curr_idx_max = _np.argmax(curr_win) + idx_st
-                curr_max = _np.max(curr_win)
+                idx_start = _np.array([0])
+                idx_max = _np.array([_np.argmax(values)])
+                idx_stop = _np.array([len(signal)])
 
-                # peak not already detected & peak not at the beginnig/end of the window:
-                if curr_idx_max != idx_maxs[-1] and curr_idx_max != idx_st and curr_idx_max != idx_sp - 1:
-                    idx_maxs.append(curr_idx_max)
-                    maxs.append(curr_max)
-            idx_maxs = idx_maxs[1:]
-            maxs = maxs[1:]
-            return _np.array(idx_maxs), _np.array(maxs)
+            # peak not at the beginnig/end of the window
+            idx_max = idx_max[(idx_max != idx_start) & (idx_max != idx_stop - 1)]
+            # peak not already detected (the maxima of the windows are not decreasing)
+            idx_maxs = idx_max[_np.r_[True, _np.diff(idx_max) != 0]] if len(idx_max) > 0 else idx_max
+            return idx_maxs, values[idx_maxs]
 
 
 class Minima(_Tool):
@@ -826,36 +1040,204 @@ class BeatOutliers(_Tool):
         else:
             ibi_expected = float(ibi_median)
 
-        id_bad_ibi = []
-        ibi_cache = _np.repeat(ibi_expected, cache)
-        counter_bad = 0
+        return _beat_outliers(signal.get_values(), ibi_expected, cache, sensitivity)
 
-        # missings = []
-        idx_ibi = signal.get_indices()
-        ibi = signal.get_values()
-        for i in range(1, len(idx_ibi)):
-            curr_median = _np.median(ibi_cache)
+    def batch(self, signals, fix=False):
+        """
+        Detects the outliers of many IBI signals at once, scanning all the signals in lockstep. Same results as
+        calling the tool on each signal.
 
-            curr_ibi = ibi[i]
+        Parameters
+        ----------
+        signals : list
+            The IBI signals
 
-            if curr_ibi > curr_median * (1 + sensitivity):  # abnormal peak:
-                id_bad_ibi.append(i)  # append ibi id to the list of bad ibi
-                counter_bad += 1
-            # missings.append([idx_ibi[i-1],idx_ibi[i]])
+        Optional parameters
+        -------------------
+        fix : boolean, default=False
+            Whether to return the IBI signals corrected with FixIBI instead of the identifiers of the wrong beats
 
-            elif curr_ibi < curr_median * (1 - sensitivity):  # abnormal peak:
-                id_bad_ibi.append(i)  # append ibi id to the list of bad ibi
-                counter_bad += 1
-            else:
-                ibi_cache = _np.r_[ibi_cache[1:], curr_ibi]
-                counter_bad = 0
-            if counter_bad == cache:  # ibi cache probably corrupted, reinitialize
-                ibi_cache = _np.repeat(ibi_expected, cache)
-                counter_bad = 0
+        Returns
+        -------
+        results : list
+            The identifiers of the wrong beats of each signal, or the corrected signals if fix is True
+        """
+        cache, sensitivity, ibi_median = self._params["cache"], self._params["sensitivity"], \
+            self._params["ibi_median"]
+        if len(signals) == 0:
+            return []
+        ibis = [_np.asarray(x.get_values(), dtype=float) for x in signals]
+        if ibi_median == 0:
+            ibi_expected = [float(_np.median(x)) for x in ibis]
+        else:
+            ibi_expected = [float(ibi_median)] * len(ibis)
 
+        bad = _beat_outliers_batch(ibis, ibi_expected, cache, sensitivity)
+        id_bad_ibi = [_np.where(bad[k, :len(x)])[0].tolist() for k, x in enumerate(ibis)]
+        if fix:
+            return [FixIBI(ids)(x) for x, ids in zip(signals, id_bad_ibi)]
         return id_bad_ibi
 
 
+class _RunningMedian(object):
+    """
+    Median of the last 'size' values in O(log size) per value: ring buffer of the values in order of arrival and two
+    heaps (max-heap of the lower half, min-heap of the upper half) without the NaNs. The values leaving the window are
+    removed lazily, when they reach the top of their heap. The median is NaN while a NaN is in the buffer, as
+    numpy.median.
+    """
+
+    def __init__(self, size, value):
+        self._size = size
+        self.reset(value)
+
+    def reset(self, value):
+        """
+        Fills the buffer with the value.
+        """
+        self._ring = [None] * self._size  # ids of the values, None for NaN
+        self._pos = 0
+        self._n_nan = self._size
+        self._side = {}  # heap of the id of each value in the heaps: 0 lower half, 1 upper half
+        self._heaps = ([], [])  # lower half (-value, id), upper half (value, id)
+        self._n = [0, 0]
+        self._next_id = 0
+        for i in range(self._size):
+            self.push(value)
+
+    def push(self, value):
+        """
+        Replaces the oldest value with the new one.
+        """
+        side = self._side.pop(self._ring[self._pos], None)
+        if side is None:
+            self._n_nan -= 1
+        else:
+            self._n[side] -= 1
+
+        if value != value:
+            self._ring[self._pos] = None
+            self._n_nan += 1
+        else:
+            i = self._next_id
+            self._next_id += 1
+            self._ring[self._pos] = i
+            if self._n[0] > 0:
+                self._prune(0)
+                side = 0 if value <= -self._heaps[0][0][0] else 1
+            else:
+                self._prune(1)
+                side = 0 if self._n[1] == 0 or value <= self._heaps[1][0][0] else 1
+            self._push(side, (-value, i) if side == 0 else (value, i))
+        self._pos = (self._pos + 1) % self._size
+
+        # the lower half has as many values as the upper half or one more
+        if self._n[0] > self._n[1] + 1:
+            self._move(0)
+        elif self._n[0] < self._n[1]:
+            self._move(1)
+
+    def _move(self, side):
+        self._prune(side)
+        value, i = _heappop(self._heaps[side])
+        self._n[side] -= 1
+        self._push(1 - side, (-value, i))
+
+    def _push(self, side, entry):
+        heap = self._heaps[side]
+        _heappush(heap, entry)
+        self._side[entry[1]] = side
+        self._n[side] += 1
+        if len(heap) > 2 * self._size:
+            # the removed values are the majority: drops them all (amortized O(1))
+            heap[:] = [e for e in heap if self._side.get(e[1]) == side]
+            _heapify(heap)
+
+    def _prune(self, side):
+        # drops the removed values from the top
+        heap = self._heaps[side]
+        while heap and self._side.get(heap[0][1]) != side:
+            _heappop(heap)
+
+    def median(self):
+        if self._n_nan > 0:
+            return _np.nan
+        self._prune(0)
+        if self._size % 2 == 1:
+            return -self._heaps[0][0][0]
+        self._prune(1)
+        return (-self._heaps[0][0][0] + self._heaps[1][0][0]) / 2
+
+
+def _beat_outliers(ibi, ibi_expected, cache, sensitivity):
+    """
+    Scan of BeatOutliers: the IBIs (after the first) out of the accepted interval around the median of the cache of
+    the last accepted IBIs.
+    """
+    id_bad_ibi = []
+    ibi_cache = _RunningMedian(cache, float(ibi_expected))
+    counter_bad = 0
+    ibi = _np.asarray(ibi, dtype=float).tolist()
+
+    for i in range(1, len(ibi)):
+        curr_median = ibi_cache.median()
+
+        curr_ibi = ibi[i]
+
+        if curr_ibi > curr_median * (1 + sensitivity):  # abnormal peak:
+            id_bad_ibi.append(i)  # append ibi id to the list of bad ibi
+            counter_bad += 1
+
+        elif curr_ibi < curr_median * (1 - sensitivity):  # abnormal peak:
+            id_bad_ibi.append(i)  # append ibi id to the list of bad ibi
+            counter_bad += 1
+        else:
+            ibi_cache.push(curr_ibi)
+            counter_bad = 0
+        if counter_bad == cache:  # ibi cache probably corrupted, reinitialize
+            ibi_cache.reset(float(ibi_expected))
+            counter_bad = 0
+
+    return id_bad_ibi
+
+
+def _beat_outliers_batch(ibis, ibi_expected, cache, sensitivity):
+    """
+    Scan of BeatOutliers on many IBI series in lockstep: one step for the i-th IBI of all the series.
+
+    :return: Boolean matrix (series x longest series) of the bad IBIs
+    """
+    lengths = _np.array([len(x) for x in ibis])
+    values = _np.full((len(ibis), max(lengths.max(), 1)), _np.nan)
+    for k, x in enumerate(ibis):
+        values[k, :len(x)] = x
+    ibi_expected = _np.asarray(ibi_expected, dtype=float)
+
+    caches = _np.repeat(ibi_expected[:, None], cache, axis=1)
+    pos = _np.zeros(len(ibis), dtype=int)
+    counter_bad = _np.zeros(len(ibis), dtype=int)
+    bad = _np.zeros(values.shape, dtype=bool)
+    for i in range(1, values.shape[1]):
+        active = i < lengths
+        curr_median = _np.median(caches, axis=1)
+        curr_ibi = values[:, i]
+
+        out = (curr_ibi > curr_median * (1 + sensitivity)) | (curr_ibi < curr_median * (1 - sensitivity))
+        bad[:, i] = out & active
+        counter_bad[bad[:, i]] += 1
+
+        ok = ~out & active
+        caches[ok, pos[ok]] = curr_ibi[ok]
+        pos[ok] = (pos[ok] + 1) % cache
+        counter_bad[ok] = 0
+
+        reset = counter_bad == cache
+        caches[reset] = ibi_expected[reset, None]
+        pos[reset] = 0
+        counter_bad[reset] = 0
+    return bad
+
+
 class FixIBI(_Tool):
     """
     Corrects the IBI series removing abnormal IBI
@@ -873,7 +1255,7 @@ class FixIBI(_Tool):
     """
 
     def __init__(self, idx_bad_ibi):
-        idx_bad_ibi = _np.array(idx_bad_ibi)
+        idx_bad_ibi = _np.array(idx_bad_ibi, dtype=int)
         assert idx_bad_ibi.ndim == 1
         _Tool.__init__(self, id_bad_ibi=idx_bad_ibi)
 
@@ -903,6 +1285,10 @@ class FixIBI(_Tool):
 class BeatOptimizer(_Tool):
     """
     Optimize detection of errors in IBI estimation.
+
+    The outliers are removed scanning the beats forward and backward (see BeatOutliers); where the two corrections
+    disagree each beat takes the forward or the backward position, choosing the sequence with the minimum sum of the
+    absolute second differences of the beat positions (exact dynamic programming, linear in the number of beats).
     
     Optional parameters
     -------------------
@@ -941,139 +1327,35 @@ class BeatOptimizer(_Tool):
 
     @classmethod
     def algorithm(cls, signal, params):
-        cls.error('Not implemented')
-        return signal
-
         b, cache, sensitivity, ibi_median = params["B"], params["cache"], params["sensitivity"], params["ibi_median"]
 
         fsamp = signal.get_sampling_freq()
+        idx_ibi = _np.asarray(signal.get_indices()).astype(int)
+        if len(idx_ibi) < 3:
+            return signal
 
-        # FORWARD
-        id_bad_ibi_F = BeatOutliers(ibi_median=ibi_median, cache=cache, sensitivity=sensitivity)(signal)
+        idx_st = idx_ibi[0]
+        idx_ibi = idx_ibi - idx_st
 
-        # BACKWARD
-        # reverse the signal
-        idx_reverse = signal.get_indices()
+        if ibi_median == 0:
+            ibi_expected = float(_np.median(signal))
+        else:
+            ibi_expected = float(ibi_median)
 
-        idx_reverse = -1 * (idx_reverse - idx_reverse[-1])[::-1]
-        ibi_reverse = _np.diff(idx_reverse)
+        # FORWARD: beats without the outliers
+        id_bad_ibi_f = _beat_outliers(signal.get_values(), ibi_expected, cache, sensitivity)
+        idx_1 = _np.delete(idx_ibi, id_bad_ibi_f)
+
+        # BACKWARD: the same on the reversed beats
+        idx_reverse = (idx_ibi[-1] - idx_ibi)[::-1]
+        ibi_reverse = _np.diff(idx_reverse) / fsamp
         ibi_reverse = _np.r_[ibi_reverse[0], ibi_reverse]
+        id_bad_ibi_b = _beat_outliers(ibi_reverse, ibi_expected, cache, sensitivity)
+        idx_2 = _np.delete(idx_ibi, len(idx_ibi) - 1 - _np.array(id_bad_ibi_b, dtype=int))
+
+        pairs = _beat_pairs(idx_1, idx_2, b * fsamp)
+        idx_out = _beats_dp(pairs) + idx_st
 
-        ibi_reverse = _UnevenlySignal(ibi_reverse / fsamp, x_values=idx_reverse, x_type='indices',
-                                      duration=signal.get_duration())
-
-        id_bad_ibi_b = BeatOutliers(ibi_median=ibi_median, cache=cache, sensitivity=sensitivity)(ibi_reverse)
-
-        id_bad_ibi_B = -1 * (_np.array(id_bad_ibi_b) - len(ibi_reverse))[::-1]
-
-        # idx_1
-        ###
-        # add indexes of idx_ibi_2 which are not in idx_ibi_1 but close enough
-        b = b * fsamp
-        for i_2 in range(1, len(idx_2)):
-            curr_idx_2 = idx_2[i_2]
-            if not (curr_idx_2 in idx_1):
-                i_1 = _np.where((idx_1 >= curr_idx_2 - b) & (idx_1 <= curr_idx_2 + b))[0]
-                if not len(i_1) > 0:
-                    idx_1 = _np.r_[idx_1, curr_idx_2]
-        idx_1 = _np.sort(idx_1)
-
-        ###
-        # create pairs for each beat
-        pairs = [[0, 0]]
-        for i_1 in range(1, len(idx_1)):
-            curr_idx_1 = idx_1[i_1]
-            if curr_idx_1 in idx_2:
-                pairs.append([curr_idx_1, curr_idx_1])
-            else:
-                i_2 = _np.where((idx_2 >= curr_idx_1 - b) & (idx_2 <= curr_idx_1 + b))[0]
-                if len(i_2) > 0:
-                    i_2 = i_2[0]
-                    pairs.append([curr_idx_1, idx_2[i_2]])
-                else:
-                    pairs.append([curr_idx_1, curr_idx_1])
-        pairs = _np.array(pairs)
-
-        ########################################
-        # define zones where there are different values
-        diff_idxs = pairs[:, 0] - pairs[:, 1]
-        diff_idxs[diff_idxs != 0] = 1
-        diff_idxs = _np.diff(diff_idxs)
-
-        starts = _np.where(diff_idxs > 0)[0]
-        stops = _np.where(diff_idxs < 0)[0]
-
-        if len(starts) == 0:  # no differences
-            # keep the 'outliers removed' version
-            idx_1 = idx_1 + idx_st
-            return _UnevenlySignal(ibi_1 / fsamp, sampling_freq=fsamp, signal_type="IBI",
-                                   start_time=signal.get_start_time(), x_values=idx_1, x_type='indices',
-                                   duration=signal.get_duration())
-
-        if len(stops) == 0:
-            stops = _np.array([starts[-1] + 1])
-
-        if starts[0] >= stops[0]:
-            stops = stops[1:]
-
-        stops += 1
-
-        if len(starts) > len(stops):
-            stops = _np.r_[stops, starts[-1] + 1]
-
-        # split long sequences
-        new_starts = _np.copy(starts)
-        new_stops = _np.copy(stops)
-
-        add_index = 0
-        lens = stops - starts
-        for i in range(len(starts)):
-            l = lens[i]
-            if l > 10:
-                curr_st = starts[i]
-                curr_sp = stops[i]
-                new_st = _np.arange(curr_st, curr_sp, 4)
-                new_sp = new_st + 4
-                new_sp[-1] = curr_sp
-                new_starts = _np.delete(new_starts, i + add_index)
-                new_stops = _np.delete(new_stops, i + add_index)
-                new_starts = _np.insert(new_starts, i + add_index, new_st)
-                new_stops = _np.insert(new_stops, i + add_index, new_sp)
-                add_index = add_index + len(new_st) - 1
-
-        starts = new_starts
-        stops = new_stops
-
-        ########################################
-        # find best combination
-        idx_out = _np.copy(pairs[:, 0])
-        for i in range(len(starts)):
-            i_st = starts[i]
-            i_sp = stops[i]
-
-            if i_sp > len(idx_out) - 1:
-                i_sp = len(idx_out) - 1
-
-            curr_portion = _np.copy(pairs[i_st - 1: i_sp + 1, :])
-
-            best_portion = None
-            best_error = _np.Inf
-
-            combinations = list(_itertools.product([0, 1], repeat=i_sp - i_st - 1))
-            for comb in combinations:
-                cand_portion = _np.copy(curr_portion[:, 0])
-                for k in range(len(comb)):
-                    bit = comb[k]
-                    cand_portion[k + 2] = curr_portion[k + 2, bit]
-                cand_error = sum(abs(_np.diff(_np.diff(cand_portion))))
-                if cand_error < best_error:
-                    best_portion = cand_portion
-                    best_error = cand_error
-            idx_out[i_st - 1: i_sp + 1] = best_portion
-
-        ###
-        # finalize arrays
-        idx_out = _np.array(idx_out) + idx_st
         ibi_out = _np.diff(idx_out)
         ibi_out = _np.r_[signal.get_values()[0], ibi_out / fsamp]
 
@@ -1082,6 +1364,69 @@ class BeatOptimizer(_Tool):
                                duration=signal.get_duration())
 
 
+def _beat_pairs(idx_1, idx_2, b):
+    """
+    Pairs each forward beat with a backward beat: the same beat if both have it, else the first backward beat within
+    b samples, else itself. The backward beats farther than b samples from all the forward beats are added to the
+    forward ones (paired with themselves).
+
+    :return: Array (beats x 2) of the forward and backward positions of each beat
+    """
+    # backward beats not within b from the forward ones, nor from the last one added
+    near = _np.searchsorted(idx_1, idx_2 - b)
+    alone = (near == len(idx_1)) | (idx_1[_np.minimum(near, len(idx_1) - 1)] > idx_2 + b)
+    added = []
+    for curr in idx_2[1:][alone[1:]]:
+        if len(added) == 0 or curr > added[-1] + b:
+            added.append(curr)
+    beats = _np.sort(_np.r_[idx_1, _np.array(added, dtype=idx_1.dtype)])
+
+    # first backward beat within b
+    first = _np.searchsorted(idx_2, beats - b)
+    partner = idx_2[_np.minimum(first, len(idx_2) - 1)]
+    partner = _np.where((first < len(idx_2)) & (partner <= beats + b), partner, beats)
+    # the same beat if both have it
+    same = _np.isin(beats, idx_2)
+    partner[same] = beats[same]
+    partner[0] = beats[0]
+    return _np.column_stack([beats, partner])
+
+
+def _beats_dp(pairs):
+    """
+    Reverse optimization of DBD-RCO: the sequence of beats, choosing for each beat the forward or backward position
+    (pairs[:, 0] or pairs[:, 1]), with the minimum sum of the absolute second differences. Viterbi algorithm on the
+    states (choice for the previous beat, choice for the current beat): linear time. On ties the forward positions are
+    preferred.
+
+    :return: The optimal positions of the beats
+    """
+    n = len(pairs)
+    if n < 3 or _np.all(pairs[:, 0] == pairs[:, 1]):
+        return pairs[:, 0].copy()
+    p = pairs.astype(float)
+
+    # cost of each (beat k - 2, beat k - 1, beat k) choice for k >= 2
+    cost = _np.abs(p[2:, None, None, :] - 2 * p[1:-1, None, :, None] + p[:-2, :, None, None])
+    # the beats must stay in order
+    cost[_np.broadcast_to(p[2:, None, None, :] <= p[1:-1, None, :, None], cost.shape)] = _np.inf
+    cost[_np.broadcast_to(p[1:-1, None, :, None] <= p[:-2, :, None, None], cost.shape)] = _np.inf
+
+    # total cost of the best sequence ending with the choices (beat k - 1, beat k)
+    total = _np.zeros((2, 2))
+    back = _np.empty((n - 2, 2, 2), dtype=int)
+    for k in range(n - 2):
+        candidates = total[:, :, None] + cost[k]
+        back[k] = _np.argmin(candidates, axis=0)
+        total = _np.min(candidates, axis=0)
+
+    choice = _np.empty(n, dtype=int)
+    choice[-2], choice[-1] = _np.unravel_index(_np.argmin(total), total.shape)
+    for k in range(n - 3, -1, -1):
+        choice[k] = back[k, choice[k + 1], choice[k + 2]]
+    return pairs[_np.arange(n), choice]
+
+
 # EDA Tools
 class OptimizeBateman(_Tool):
     """
@@ -1122,6 +1467,8 @@ class OptimizeBateman(_Tool):
     
     """
 
+    _persistent = True
+
     # TODO (Feature): add **kwargs parameters for internal minimization
     def __init__(self, delta, loss_func='all', opt_method='bsh', complete=False, par_ranges=None,
                  maxiter=99999, n_step_1=10, n_step_2=10, **kwargs):
@@ -1143,6 +1490,7 @@ class OptimizeBateman(_Tool):
 
     @classmethod
     def algorithm(cls, signal, params):
+        import scipy.optimize as _opt
         delta = params['delta']
         opt_method = params['opt_method']
         complete = params['complete']